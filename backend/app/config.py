@@ -1,14 +1,95 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Literal
 
 
 class Settings(BaseSettings):
     openai_api_key: str
-    supabase_url: str
-    supabase_anon_key: str
+    supabase_url: str = ""
+    supabase_anon_key: str = ""
     models_dir: str = "./models"
     frontend_url: str = "http://localhost:3000"
 
+    # ── Copilot agent ─────────────────────────────────────────────────────────
+    openai_base_url: str = ""            # empty → api.openai.com; set for proxies / local mocks
+    agent_tool_timeout_s: float = 10.0   # per tool call inside one agent turn
+    agent_fast_path: bool = True         # answer clear-cut nominal analyses locally
+    agent_rules_margin_c: float = 0.5    # readings this close to 8/15 °C go to the LLM
+    agent_rules_margin_days: float = 0.25
+    agent_cache_ttl_s: float = 300.0     # 0 disables the analyze cache
+    agent_cache_max_entries: int = 1024
+    agent_cache_temp_step_c: float = 0.5 # telemetry quantization for cache keys
+    agent_cache_humidity_step_pct: float = 5.0
+    agent_cache_vibration_step_g: float = 0.1
+    agent_context_budget_tokens: int = 1500  # summary + recent turns per session
+    agent_max_sessions: int = 1000
+    agent_session_idle_s: float = 3600.0
+    agent_job_workers: int = 4           # concurrent background analyses
+    agent_job_queue_max: int = 1000      # waiting jobs before submissions get 503
+    agent_jobs_retained: int = 1000      # finished jobs kept for polling
+    agent_batch_llm_concurrency: int = 8 # LLM calls in flight across all batch analyses
+    transcript_flush_interval_s: float = 0.5  # background transcript writer cadence
+    transcript_max_batch: int = 500      # rows per bulk insert
+    transcript_max_pending: int = 20000  # buffered rows before the oldest are dropped
+
+    # ── Agent tracing ─────────────────────────────────────────────────────────
+    agent_tracing: bool = True           # spans per turn / iteration / tool / DB write
+    trace_retained: int = 200            # finished traces kept for /api/agent/traces
+    trace_json_log: bool = False         # one JSON line per trace on the aegis.traces logger
+    trace_json_path: str = ""            # … written to this file instead of the app log
+    trace_otlp_endpoint: str = ""        # e.g. http://127.0.0.1:4318/v1/traces (OTLP/HTTP JSON)
+
+    # ── Storage backend ───────────────────────────────────────────────────────
+    # "supabase" → hosted Postgres via PostgREST
+    # "sqlite"   → embedded SQLite (WAL) for edge depots, tests and benchmarks
+    storage_backend: Literal["supabase", "sqlite"] = "supabase"
+    sqlite_path: str = "./aegis_local.db"
+    sqlite_sync_interval_s: float = 0.0  # > 0 pushes local rows upstream periodically
+
+    # ── Remote DB resilience ──────────────────────────────────────────────────
+    db_op_timeout_s: float = 3.0         # deadline per Supabase operation
+    db_breaker_failures: int = 3         # consecutive failures before the breaker opens
+    db_breaker_reset_s: float = 15.0     # open duration before a half-open probe
+
+    # ── Telemetry rollups & retention ─────────────────────────────────────────
+    telemetry_rollup_flush_s: float = 30.0       # how often rollup deltas are written
+    telemetry_raw_retention_h: float = 0.0       # opt-in: compact rolled-up raw readings older than this (0 = keep)
+    telemetry_compaction_interval_s: float = 3600.0
+    telemetry_compaction_min_h: float = 24.0     # smallest retention POST /api/telemetry/compact accepts
+    admin_token: str = ""                        # X-Admin-Token for destructive endpoints (empty = disabled)
+
+    # ── In-memory telemetry ring buffers ──────────────────────────────────────
+    telemetry_buffer_capacity: int = 600         # readings kept per session
+    telemetry_buffer_max_mb: float = 64.0        # global cap across sessions
+    telemetry_buffer_idle_s: float = 1800.0      # drop sessions idle this long
+
+    # ── Telemetry SSE fan-out ─────────────────────────────────────────────────
+    telemetry_stream_queue_size: int = 256       # per-client queue; oldest dropped on overflow
+    telemetry_stream_replay_size: int = 2048     # events kept for Last-Event-ID resume
+
+    # ── Event-driven risk scoring on ingest ───────────────────────────────────
+    risk_ewma_alpha: float = 0.3
+    risk_temp_delta_c: float = 0.5               # re-score when EWMA temp moves this far
+    risk_humidity_delta_pct: float = 5.0
+    risk_vibration_delta_g: float = 0.2
+    risk_default_distance_km: float = 250.0      # distance to destination when unknown
+    risk_trend_horizon_min: float = 30.0         # look-ahead for the temperature-trend trigger (0 = off)
+    risk_session_idle_h: float = 24.0            # drop sessions with no readings for this long
+
+    # ── Cumulative shelf-life tracking ────────────────────────────────────────
+    shelf_life_reference_hours: float = 240.0    # cargo life when held at 4 °C
+    shelf_life_idle_h: float = 24.0              # drop trips with no readings for this long
+
+    # ── Fleet risk snapshot ───────────────────────────────────────────────────
+    fleet_active_window_s: float = 900.0         # trucks silent longer drop out
+
+    # ── Road network ──────────────────────────────────────────────────────────
+    road_network_path: str = "./models/road_network.json"  # nodes + edges with road conditions
+
+    # ── Rescue point spatial index ────────────────────────────────────────────
+    rescue_index_refresh_s: float = 60.0         # rebuild from the DB at least this often (writes rebuild at once)
+    rescue_distance_half_km: float = 25.0        # recovery chance halves every this many km
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
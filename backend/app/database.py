@@ -1,9 +1,47 @@
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from functools import lru_cache
 from .config import get_settings
+from .services.circuit_breaker import CircuitBreaker
 
 
 @lru_cache()
 def get_supabase_client() -> Client:
     settings = get_settings()
-    return create_client(settings.supabase_url, settings.supabase_anon_key)
+    return create_client(
+        settings.supabase_url,
+        settings.supabase_anon_key,
+        options=ClientOptions(postgrest_client_timeout=settings.db_op_timeout_s),
+    )
+
+
+@lru_cache()
+def get_db_breaker() -> CircuitBreaker:
+    """Process-wide breaker guarding every Supabase call."""
+    settings = get_settings()
+    return CircuitBreaker(
+        failure_threshold=settings.db_breaker_failures,
+        reset_timeout_s=settings.db_breaker_reset_s,
+    )
+
+
+def get_supabase_service():
+    from .services.supabase_service import SupabaseService
+    return SupabaseService(
+        get_supabase_client(),
+        breaker=get_db_breaker(),
+        op_timeout_s=get_settings().db_op_timeout_s,
+    )
+
+
+@lru_cache()
+def get_local_store():
+    """Shared embedded SQLite store (one connection per process)."""
+    from .services.local_store_service import LocalStoreService
+    return LocalStoreService(get_settings().sqlite_path)
+
+
+def get_db_service():
+    """Return the data service for the configured storage backend."""
+    if get_settings().storage_backend == "sqlite":
+        return get_local_store()
+    return get_supabase_service()
@@ -7,6 +7,7 @@ Start:
     cd backend
     uvicorn app.main:app --reload --port 8000
 """
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -16,6 +17,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from .config import get_settings
 from .routers import (
     telemetry,
+    telemetry_ws,
     prediction,
     routes_router,
     facilities,
@@ -23,6 +25,7 @@ from .routers import (
     rescue,
     recommendations,
     agent,
+    fleet,
 )
 
 logging.basicConfig(
@@ -44,10 +47,84 @@ async def lifespan(app: FastAPI):
         logger.info("ML models loaded successfully.")
     except Exception as exc:
         logger.warning("ML model pre-load failed (will retry on first request): %s", exc)
+
+    sync_task = None
+    if (
+        settings.storage_backend == "sqlite"
+        and settings.sqlite_sync_interval_s > 0
+        and settings.supabase_url
+    ):
+        sync_task = asyncio.create_task(_sync_local_store(settings.sqlite_sync_interval_s))
+        logger.info("Local store sync enabled every %.0fs.", settings.sqlite_sync_interval_s)
+    maintenance_task = asyncio.create_task(_telemetry_maintenance(settings))
     yield
+    background = [t for t in (sync_task, maintenance_task) if t is not None]
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    from .services.agent_jobs import stop_agent_job_queue
+    from .services.transcript_writer import stop_transcript_writer
+
+    await stop_agent_job_queue()
+    await stop_transcript_writer()
+    await _flush_rollups()
     logger.info("Aegis Harvest backend shutting down.")
 
 
+async def _flush_rollups():
+    from .database import get_db_service
+    from .services.telemetry_rollup import get_telemetry_rollup
+
+    try:
+        await get_telemetry_rollup().flush(get_db_service())
+    except Exception as exc:
+        logger.warning("Telemetry rollup flush failed: %s", exc)
+
+
+async def _telemetry_maintenance(settings):
+    """Flush rollup deltas, evict idle buffers and compact old raw telemetry."""
+    from .database import get_db_service
+    from .services.telemetry_buffer import get_telemetry_buffers
+    from .services.telemetry_rollup import get_telemetry_rollup
+
+    rollup = get_telemetry_rollup()
+    since_compaction = 0.0
+    while True:
+        await asyncio.sleep(settings.telemetry_rollup_flush_s)
+        await _flush_rollups()
+        get_telemetry_buffers().evict_idle()
+        since_compaction += settings.telemetry_rollup_flush_s
+        if (
+            settings.telemetry_raw_retention_h > 0
+            and since_compaction >= settings.telemetry_compaction_interval_s
+        ):
+            since_compaction = 0.0
+            try:
+                removed = await rollup.compact(
+                    get_db_service(), settings.telemetry_raw_retention_h * 3600
+                )
+                if removed:
+                    logger.info("Compacted %d raw telemetry rows.", removed)
+            except Exception as exc:
+                logger.warning("Telemetry compaction failed: %s", exc)
+
+
+async def _sync_local_store(interval_s: float):
+    """Periodically push locally written rows to Supabase."""
+    from .database import get_local_store, get_supabase_service
+
+    store = get_local_store()
+    upstream = get_supabase_service()
+    while True:
+        await asyncio.sleep(interval_s)
+        try:
+            pushed = await store.sync_upstream(upstream)
+            if pushed:
+                logger.info("Local store synced upstream: %s", pushed)
+        except Exception as exc:
+            logger.warning("Local store sync failed: %s", exc)
+
+
 app = FastAPI(
     title="Aegis Harvest API",
     description="Autonomous Cold-Chain Copilot — ML predictions, agentic routing, and real-time telemetry.",
@@ -67,6 +144,7 @@ app.add_middleware(
 
 # ── Routers ────────────────────────────────────────────────────────────────────
 app.include_router(telemetry.router)
+app.include_router(telemetry_ws.router)
 app.include_router(prediction.router)
 app.include_router(routes_router.router)
 app.include_router(facilities.router)
@@ -74,15 +152,22 @@ app.include_router(trips.router)
 app.include_router(rescue.router)
 app.include_router(recommendations.router)
 app.include_router(agent.router)
+app.include_router(fleet.router)
 
 
 # ── Health check ───────────────────────────────────────────────────────────────
 @app.get("/health", tags=["Health"])
 async def health():
+    from .database import get_db_breaker
+
+    database = {"backend": settings.storage_backend}
+    if settings.storage_backend == "supabase":
+        database.update(get_db_breaker().snapshot())
     return {
         "status": "ok",
         "service": "Aegis Harvest API",
         "version": "1.0.0",
+        "database": database,
     }
 
 
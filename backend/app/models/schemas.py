@@ -33,6 +33,8 @@ class PredictionInput(BaseModel):
     road_b: Literal["Clear", "Traffic", "Construction", "Blocked"] = "Traffic"
     cap_a_pct: float = Field(default=70.0, ge=0, le=100)
     cap_b_pct: float = Field(default=50.0, ge=0, le=100)
+    # Truck's road-network node: dist_a/dist_b/road_a/road_b come from shortest paths
+    node: Optional[str] = None
 
 
 class SurvivalMargins(BaseModel):
@@ -65,6 +67,32 @@ class RouteData(BaseModel):
     road_condition: Literal["Clear", "Traffic", "Construction", "Blocked"] = "Clear"
 
 
+class OptimizeTruck(BaseModel):
+    truck_id: str
+    temp_c: float = Field(..., ge=-10, le=60)
+    humidity_pct: float = Field(..., ge=0, le=100)
+    vibration_g: float = Field(..., ge=0, le=5)
+    distance_km: float = Field(default=250.0, ge=0)  # to the original destination
+    shelf_life_days: Optional[float] = Field(default=None, ge=0)  # skips the ML prediction
+    # Per destination name; missing → the destination's default distance / Clear road
+    distances_km: Dict[str, float] = {}
+    roads: Dict[str, Literal["Clear", "Traffic", "Construction", "Blocked"]] = {}
+    node: Optional[str] = None  # road-network node; fills destinations not given above
+
+
+class RouteOptimizeRequest(BaseModel):
+    trucks: List[OptimizeTruck] = Field(..., min_length=1, max_length=2000)
+    capacities: Dict[str, int] = {}  # destination name → truck slots (overrides)
+    units_per_truck: float = Field(default=100.0, gt=0)  # facility storage per truck
+    rescue_slots: int = Field(default=2, ge=0)  # per rescue point unless overridden
+    default_facility_distance_km: float = Field(default=100.0, ge=0)
+    target_margin_days: float = Field(default=1.0, gt=0)  # margin beyond this adds no score
+
+
+class RoadConditionUpdate(BaseModel):
+    road: Literal["Clear", "Traffic", "Construction", "Blocked"]
+
+
 # ── Facilities ─────────────────────────────────────────────────────────────────
 class FacilityData(BaseModel):
     id: Optional[str] = None
@@ -75,6 +103,8 @@ class FacilityData(BaseModel):
     storage_capacity: int
     current_load: int
     last_updated: Optional[str] = None
+    lat: Optional[float] = Field(default=None, ge=-90, le=90)
+    lon: Optional[float] = Field(default=None, ge=-180, le=180)
 
 
 # ── Trip Logs ──────────────────────────────────────────────────────────────────
@@ -90,6 +120,16 @@ class TripLog(BaseModel):
     shelf_life_used: int
 
 
+class TripClose(BaseModel):
+    """Close a tracked session; shelf life, duration and temp range come from telemetry."""
+    trip_id: str
+    session_id: str
+    route: str
+    cargo: str
+    status: Literal["completed", "incident", "aborted"] = "completed"
+    date: Optional[str] = None
+
+
 # ── Rescue Points ──────────────────────────────────────────────────────────────
 class RescuePoint(BaseModel):
     id: Optional[str] = None
@@ -99,6 +139,15 @@ class RescuePoint(BaseModel):
     type: Literal["cold-storage", "market", "processing"]
     available: bool
     eta: int
+    lat: Optional[float] = Field(default=None, ge=-90, le=90)
+    lon: Optional[float] = Field(default=None, ge=-180, le=180)
+
+
+class RescuePointUpdate(BaseModel):
+    recovery_chance: Optional[int] = Field(default=None, ge=0, le=100)
+    available: Optional[bool] = None
+    lat: Optional[float] = Field(default=None, ge=-90, le=90)
+    lon: Optional[float] = Field(default=None, ge=-180, le=180)
 
 
 # ── AI Recommendations ─────────────────────────────────────────────────────────
@@ -135,9 +184,20 @@ class AgentAnalyzeRequest(BaseModel):
     session_id: Optional[str] = None
 
 
+class AgentJobRequest(AgentAnalyzeRequest):
+    # Defaults to the telemetry's severity (critical > 15 °C, warning > 8 °C)
+    priority: Optional[Literal["critical", "warning", "nominal"]] = None
+
+
+class AgentBatchAnalyzeRequest(BaseModel):
+    trucks: List[AgentAnalyzeRequest] = Field(..., min_length=1, max_length=500)
+
+
 class AgentResponse(BaseModel):
     message: str
     recommendations: Optional[List[AIRecommendation]] = None
     prediction: Optional[PredictionResult] = None
     action_required: bool = False
     session_id: Optional[str] = None
+    cached: bool = False
+    cache_age_s: Optional[float] = None
@@ -2,32 +2,89 @@
 /api/agent — Aegis Harvest Autonomous Copilot endpoints.
 
 POST /api/agent/chat     → conversational interface
+POST /api/agent/chat/stream → same, as Server-Sent Events (tools + answer tokens)
 POST /api/agent/analyze  → auto-analyze current telemetry (no user message needed)
+POST /api/agent/analyze/batch → analyse many trucks with shared prefetch and batched ML
 GET  /api/agent/history  → fetch conversation history for a session
+GET  /api/agent/cache    → analyze cache stats; DELETE to invalidate
+GET  /api/agent/sessions → per-session context size, token and latency accounting
+GET  /api/agent/sessions/{id}/replay → stored turns with their tool calls (no LLM)
+POST /api/agent/jobs     → queue an analysis; poll /jobs/{id} or follow /jobs/{id}/events
+GET  /api/agent/traces   → recent agent-loop traces; /traces/{id} for the span tree
+GET  /api/agent/metrics  → p50/p95 latency per span kind and per tool / DB call
 """
+import asyncio
+import json
+from functools import lru_cache
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
+from openai import AsyncOpenAI
+from sse_starlette.sse import EventSourceResponse
 
 from ..config import get_settings
-from ..database import get_supabase_client
-from ..models.schemas import AgentChatRequest, AgentAnalyzeRequest, AgentResponse
+from ..database import get_db_service
+from ..models.schemas import (
+    AgentAnalyzeRequest,
+    AgentBatchAnalyzeRequest,
+    AgentChatRequest,
+    AgentJobRequest,
+    AgentResponse,
+)
+from ..services.agent_jobs import PRIORITIES, QueueFullError, get_agent_job_queue
+from ..services.agent_cache import get_analysis_cache
 from ..services.agent_service import AegisAgentService
+from ..services.agent_sessions import get_session_store
+from ..services.agent_tracing import get_tracer
+from ..services.transcript_writer import get_transcript_writer, replay_turns
 from ..services.ml_service import get_ml_service
-from ..services.supabase_service import SupabaseService
+from ..services.road_network import get_road_network
 
 router = APIRouter(prefix="/api/agent", tags=["Aegis Copilot Agent"])
 
 
+@lru_cache()
+def _get_llm_client() -> AsyncOpenAI:
+    settings = get_settings()
+    return AsyncOpenAI(
+        api_key=settings.openai_api_key, base_url=settings.openai_base_url or None
+    )
+
+
+@lru_cache()
+def _get_batch_llm_slots() -> asyncio.Semaphore:
+    # Process-wide, so concurrent batch requests share one LLM budget
+    return asyncio.Semaphore(get_settings().agent_batch_llm_concurrency)
+
+
 def _get_agent() -> AegisAgentService:
     settings = get_settings()
     ml = get_ml_service(settings.models_dir)
-    svc = SupabaseService(get_supabase_client())
+    svc = get_db_service()
     return AegisAgentService(
         openai_api_key=settings.openai_api_key,
         ml_service=ml,
         supabase_service=svc,
+        tool_timeout_s=settings.agent_tool_timeout_s,
+        client=_get_llm_client(),
+        fast_path=settings.agent_fast_path,
+        rules_margin_c=settings.agent_rules_margin_c,
+        rules_margin_days=settings.agent_rules_margin_days,
+        cache=get_analysis_cache() if settings.agent_cache_ttl_s > 0 else None,
+        sessions=get_session_store(),
+        tracer=get_tracer(),
+        transcripts=get_transcript_writer(),
+        road_network=get_road_network(),
     )
 
 
+def _require_node(prediction) -> None:
+    """404 for a ``prediction.node`` the road network does not have, as /api/predict."""
+    node = prediction.node if prediction else None
+    if node and node not in get_road_network().nodes:
+        raise HTTPException(status_code=404, detail=f"Unknown road-network node: {node}")
+
+
 @router.post("/chat", response_model=AgentResponse)
 async def agent_chat(
     body: AgentChatRequest,
@@ -59,6 +116,36 @@ async def agent_chat(
     )
 
 
+@router.post("/chat/stream")
+async def agent_chat_stream(
+    body: AgentChatRequest,
+    agent: AegisAgentService = Depends(_get_agent),
+):
+    """
+    Streaming variant of /chat. Emits ``session``, then ``tool_call`` and
+    ``tool_result`` as tools run, ``token`` for each fragment of the final
+    answer and ``done`` with the full response (``error`` on failure).
+    """
+    telemetry_dict = body.telemetry.model_dump() if body.telemetry else None
+    history_dicts = (
+        [h.model_dump() for h in body.history] if body.history else []
+    )
+
+    async def events():
+        try:
+            async for event in agent.chat_stream(
+                message=body.message,
+                telemetry=telemetry_dict,
+                history=history_dicts,
+                session_id=body.session_id,
+            ):
+                yield {"event": event["event"], "data": json.dumps(event["data"], default=str)}
+        except Exception as exc:
+            yield {"event": "error", "data": json.dumps({"detail": f"Agent error: {exc}"})}
+
+    return EventSourceResponse(events())
+
+
 @router.post("/analyze", response_model=AgentResponse)
 async def agent_analyze(
     body: AgentAnalyzeRequest,
@@ -68,13 +155,18 @@ async def agent_analyze(
     Trigger autonomous analysis of current telemetry.
     The agent will run ML predictions, assess risk, and generate recommendations
     without requiring a user message — ideal for automated monitoring.
+    Clear-cut nominal readings are answered by the local rules engine without
+    an LLM round trip; ``prediction`` overrides the route conditions scored
+    (``prediction.node`` derives them from the road network).
     """
+    _require_node(body.prediction)
     telemetry_dict = body.telemetry.model_dump()
 
     try:
         result = await agent.analyze(
             telemetry=telemetry_dict,
             session_id=body.session_id,
+            conditions=body.prediction.model_dump() if body.prediction else None,
         )
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Agent analysis error: {exc}")
@@ -83,14 +175,185 @@ async def agent_analyze(
         message=result["message"],
         action_required=result.get("action_required", False),
         session_id=result.get("session_id"),
+        cached=result.get("cached", False),
+        cache_age_s=result.get("cache_age_s"),
     )
 
 
+@router.post("/analyze/batch")
+async def agent_analyze_batch(
+    body: AgentBatchAnalyzeRequest,
+    agent: AegisAgentService = Depends(_get_agent),
+):
+    """
+    Situation reports for many trucks in one call (e.g. a regional heat wave).
+    Rescue points, facilities and routes are fetched once and every truck is
+    scored in a single ML batch; only trucks the rules engine cannot settle
+    go to the LLM, under the ``agent_batch_llm_concurrency`` limit.
+    ``sources`` counts results by origin: cache, rules or llm. A truck in
+    the same telemetry bucket as an earlier one reuses its analysis and
+    carries ``shared_with`` (that truck's index); like cache hits, it gets
+    no recommendation or conversation rows of its own.
+    """
+    for t in body.trucks:
+        _require_node(t.prediction)
+    items = [
+        {
+            "telemetry": t.telemetry.model_dump(),
+            "session_id": t.session_id,
+            "conditions": t.prediction.model_dump() if t.prediction else None,
+        }
+        for t in body.trucks
+    ]
+    try:
+        batch = await agent.analyze_batch(items, llm_slots=_get_batch_llm_slots())
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Agent analysis error: {exc}")
+
+    batch["results"] = [
+        {
+            **AgentResponse(
+                message=r["message"],
+                action_required=r.get("action_required", False),
+                session_id=r.get("session_id"),
+                cached=r.get("cached", False),
+                cache_age_s=r.get("cache_age_s"),
+            ).model_dump(exclude_none=True),
+            "source": r.get("source", "llm"),
+            **({"shared_with": r["shared_with"]} if "shared_with" in r else {}),
+        }
+        for r in batch["results"]
+    ]
+    return batch
+
+
 @router.get("/history/{session_id}")
 async def get_history(
     session_id: str,
+    limit: Optional[int] = None,
     agent: AegisAgentService = Depends(_get_agent),
 ):
-    """Retrieve conversation history for a given session."""
-    history = await agent.db.get_conversation_history(session_id)
+    """Retrieve conversation history for a given session (the last ``limit`` turns)."""
+    # Read-your-writes: transcripts are persisted in the background
+    await get_transcript_writer().flush()
+    history = await agent.db.get_conversation_history(session_id, limit=limit)
     return {"session_id": session_id, "history": history, "count": len(history)}
+
+
+@router.get("/cache")
+async def analysis_cache_stats():
+    """Analyze-cache size, hit rate and current data versions."""
+    return get_analysis_cache().stats()
+
+
+@router.delete("/cache")
+async def invalidate_analysis_cache():
+    """Drop every cached analysis."""
+    return {"success": True, "invalidated": get_analysis_cache().invalidate()}
+
+
+@router.get("/sessions")
+async def session_store_stats():
+    """Sessions held server-side, their aggregate LLM usage and transcript writer state."""
+    return {**get_session_store().stats(), "transcripts": get_transcript_writer().stats()}
+
+
+@router.get("/sessions/{session_id}")
+async def session_stats(session_id: str):
+    """Context size, token and latency accounting for one session."""
+    ctx = get_session_store().peek(session_id)
+    if ctx is None:
+        raise HTTPException(status_code=404, detail="Session not active")
+    return ctx.stats()
+
+
+@router.get("/sessions/{session_id}/replay")
+async def replay_session(session_id: str):
+    """
+    The session's stored turns — user message, each tool call with its
+    arguments, result and duration, and the reply — without re-running the LLM.
+    """
+    writer = get_transcript_writer()
+    await writer.flush()
+    rows = await get_db_service().get_conversation_history(session_id, include_tools=True)
+    if not rows:
+        raise HTTPException(status_code=404, detail="No transcript for this session")
+    turns = replay_turns(rows)
+    return {"session_id": session_id, "turns": turns, "count": len(turns)}
+
+
+# ── Background jobs ────────────────────────────────────────────────────────────
+@router.post("/jobs", status_code=202)
+async def submit_analysis_job(body: AgentJobRequest):
+    """
+    Queue an analysis and return at once with its job id. Critical telemetry
+    is served first; a session with a job still waiting has that job
+    refreshed with this telemetry instead of getting a second one.
+    """
+    _require_node(body.prediction)
+    queue = get_agent_job_queue(_get_agent)
+    try:
+        return queue.submit(
+            telemetry=body.telemetry.model_dump(),
+            session_id=body.session_id,
+            conditions=body.prediction.model_dump() if body.prediction else None,
+            priority=PRIORITIES[body.priority] if body.priority else None,
+        )
+    except QueueFullError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+
+
+@router.get("/jobs")
+async def analysis_job_stats():
+    """Worker pool and queue counters."""
+    return get_agent_job_queue(_get_agent).stats()
+
+
+@router.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Status and, once done, the situation report of a queued analysis."""
+    job = get_agent_job_queue(_get_agent).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
+
+
+@router.get("/jobs/{job_id}/events")
+async def follow_analysis_job(job_id: str):
+    """SSE stream of a job's status changes, ending when it is done or failed."""
+    job = get_agent_job_queue(_get_agent).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        while True:
+            waiter = asyncio.ensure_future(job.wait_change())
+            snap = job.snapshot()
+            yield {"event": snap["status"], "data": json.dumps(snap, default=str)}
+            if snap["status"] in ("done", "failed"):
+                waiter.cancel()
+                return
+            await waiter
+
+    return EventSourceResponse(events())
+
+
+@router.get("/traces")
+async def recent_traces(limit: int = 50):
+    """Most recent finished traces (one per agent turn or analysis), newest first."""
+    return get_tracer().recent(limit=max(1, min(limit, 500)))
+
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """All spans of one trace in start order; ``parent_id`` links the tree."""
+    spans = get_tracer().trace(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail="Trace not found or expired")
+    return {"trace_id": trace_id, "spans": spans}
+
+
+@router.get("/metrics")
+async def agent_metrics():
+    """Span latency summaries (avg, p50, p95, max) by kind and by name."""
+    return get_tracer().metrics()
@@ -3,8 +3,10 @@
 """
 from fastapi import APIRouter, Depends
 
-from ..database import get_supabase_client
+from ..database import get_db_service
 from ..models.schemas import FacilityData
+from ..services.agent_cache import get_analysis_cache
+from ..services.rescue_index import get_rescue_index
 from ..services.supabase_service import SupabaseService
 
 router = APIRouter(prefix="/api/facilities", tags=["Facilities"])
@@ -18,6 +20,8 @@ _DEFAULT_FACILITIES = [
         "storage_capacity": 5000,
         "current_load": 3200,
         "last_updated": "2 min ago",
+        "lat": 13.083,
+        "lon": 80.236,
     },
     {
         "name": "Center B – Regional Depot",
@@ -27,12 +31,14 @@ _DEFAULT_FACILITIES = [
         "storage_capacity": 3000,
         "current_load": 2100,
         "last_updated": "1 min ago",
+        "lat": 13.312,
+        "lon": 79.962,
     },
 ]
 
 
 def _get_svc() -> SupabaseService:
-    return SupabaseService(get_supabase_client())
+    return get_db_service()
 
 
 @router.get("/")
@@ -57,5 +63,9 @@ async def update_facility(
         "power_status": body.power_status,
         "current_load": body.current_load,
     }
+    if body.lat is not None and body.lon is not None:
+        updates.update(lat=body.lat, lon=body.lon)
     saved = await svc.update_facility(name, updates)
+    get_analysis_cache().bump("facilities")
+    get_rescue_index().invalidate()
     return {"success": True, "facility": saved}
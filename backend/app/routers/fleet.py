@@ -0,0 +1,26 @@
+"""
+/api/fleet — fleet-wide views across every active truck.
+"""
+from fastapi import APIRouter, Depends
+
+from ..database import get_db_service
+from ..services.fleet_risk import get_fleet_risk_cache
+from ..services.supabase_service import SupabaseService
+
+router = APIRouter(prefix="/api/fleet", tags=["Fleet"])
+
+
+def _get_svc() -> SupabaseService:
+    return get_db_service()
+
+
+@router.get("/risk")
+async def fleet_risk(svc: SupabaseService = Depends(_get_svc)):
+    """
+    Risk level, predicted shelf life and best centre for every truck that
+    reported recently, critical first. Only trucks with new telemetry since
+    the previous call are re-scored, in one batched inference pass. The first
+    call also picks up trucks that reported to storage before this process
+    (or another worker) saw them.
+    """
+    return await get_fleet_risk_cache().snapshot(svc)
@@ -1,12 +1,16 @@
 """
 /api/predict — run the XGBoost ML models on live telemetry.
+
+With ``node`` set, the distances and road conditions to Centre A and B come
+from condition-aware shortest paths over the road network.
 """
 from fastapi import APIRouter, Depends, HTTPException
 
 from ..config import get_settings
-from ..database import get_supabase_client
+from ..database import get_db_service
 from ..models.schemas import PredictionInput, PredictionResult, SurvivalMargins
 from ..services.ml_service import get_ml_service, ColdChainMLService
+from ..services.road_network import get_road_network
 from ..services.supabase_service import SupabaseService
 
 router = APIRouter(prefix="/api/predict", tags=["ML Prediction"])
@@ -17,7 +21,7 @@ def _get_ml() -> ColdChainMLService:
 
 
 def _get_svc() -> SupabaseService:
-    return SupabaseService(get_supabase_client())
+    return get_db_service()
 
 
 @router.post("/", response_model=PredictionResult)
@@ -30,24 +34,20 @@ async def predict(
     Run shelf-life + routing prediction.
     Logs the prediction to Supabase and returns the full result.
     """
+    inputs = body.model_dump(exclude={"node"})
+    if body.node:
+        try:
+            inputs.update(get_road_network().prediction_conditions(body.node))
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown road-network node: {body.node}")
+
     try:
-        result = ml.predict(
-            temp_c=body.temp_c,
-            humidity_pct=body.humidity_pct,
-            vibration_g=body.vibration_g,
-            distance_km=body.distance_km,
-            dist_a_km=body.dist_a_km,
-            dist_b_km=body.dist_b_km,
-            road_a=body.road_a,
-            road_b=body.road_b,
-            cap_a_pct=body.cap_a_pct,
-            cap_b_pct=body.cap_b_pct,
-        )
+        result = ml.predict(**inputs)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"ML prediction failed: {exc}")
 
     # Async log to DB (fire-and-forget)
-    await svc.log_prediction(body.model_dump(), result)
+    await svc.log_prediction({**inputs, "node": body.node}, result)
 
     margins_raw = result["survival_margins"]
     return PredictionResult(
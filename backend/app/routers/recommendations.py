@@ -1,27 +1,65 @@
 """
 /api/recommendations — manage AI-generated action recommendations.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
 
-from ..database import get_supabase_client
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ..database import get_db_service
 from ..models.schemas import AIRecommendation, RecommendationAction
+from ..services.pagination import (
+    EXPORT_MEDIA_TYPES,
+    decode_cursor,
+    export_stream,
+    iter_rows,
+    next_cursor,
+)
 from ..services.supabase_service import SupabaseService
 
 router = APIRouter(prefix="/api/recommendations", tags=["Recommendations"])
 
+_CURSOR_KEYS = ("created_at", "id")
+
 
 def _get_svc() -> SupabaseService:
-    return SupabaseService(get_supabase_client())
+    return get_db_service()
 
 
 @router.get("/")
 async def get_recommendations(
-    limit: int = 20,
+    limit: int = Query(default=20, ge=0),
+    cursor: Optional[str] = None,
+    svc: SupabaseService = Depends(_get_svc),
+):
+    """Return latest AI recommendations; page with ``next_cursor``."""
+    try:
+        before = decode_cursor(cursor, _CURSOR_KEYS) if cursor else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    recs = await svc.get_recommendations(limit=limit, before=before)
+    return {
+        "recommendations": recs,
+        "count": len(recs),
+        "next_cursor": next_cursor(recs, limit, _CURSOR_KEYS),
+    }
+
+
+@router.get("/export")
+async def export_recommendations(
+    format: Literal["ndjson", "csv"] = "ndjson",
     svc: SupabaseService = Depends(_get_svc),
 ):
-    """Return latest AI recommendations."""
-    recs = await svc.get_recommendations(limit=limit)
-    return {"recommendations": recs, "count": len(recs)}
+    """Stream every recommendation (newest first) page by page."""
+    rows = iter_rows(
+        lambda limit, before: svc.get_recommendations(limit=limit, before=before, strict=True),
+        _CURSOR_KEYS,
+    )
+    return StreamingResponse(
+        export_stream(rows, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=recommendations.{format}"},
+    )
 
 
 @router.post("/{rec_id}/action")
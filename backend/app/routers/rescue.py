@@ -1,10 +1,20 @@
 """
 /api/rescue — Market Pivot Engine rescue points.
+
+GET /api/rescue/nearest?lat=&lon=&k= → best candidates for a truck's current
+                                       position (in-memory KD-tree)
+PUT /api/rescue/{name}               → update availability, recovery or position
 """
-from fastapi import APIRouter, Depends
+import asyncio
+import time
+
+from fastapi import APIRouter, Depends, HTTPException
 
-from ..database import get_supabase_client
-from ..models.schemas import RescuePoint
+from ..database import get_db_service
+from ..models.schemas import RescuePoint, RescuePointUpdate
+from ..services.agent_cache import get_analysis_cache
+from ..services.agent_service import DEFAULT_FACILITIES
+from ..services.rescue_index import get_rescue_index
 from ..services.supabase_service import SupabaseService
 
 router = APIRouter(prefix="/api/rescue", tags=["Market Pivot / Rescue"])
@@ -17,6 +27,8 @@ _DEFAULT_RESCUE_POINTS = [
         "type": "cold-storage",
         "available": True,
         "eta": 18,
+        "lat": 13.012,
+        "lon": 80.018,
     },
     {
         "name": "FreshMart Outlet",
@@ -25,6 +37,8 @@ _DEFAULT_RESCUE_POINTS = [
         "type": "market",
         "available": True,
         "eta": 12,
+        "lat": 12.951,
+        "lon": 80.141,
     },
     {
         "name": "AgriProcess Plant",
@@ -33,6 +47,8 @@ _DEFAULT_RESCUE_POINTS = [
         "type": "processing",
         "available": True,
         "eta": 30,
+        "lat": 13.213,
+        "lon": 79.985,
     },
     {
         "name": "ColdChain Hub B2",
@@ -41,6 +57,8 @@ _DEFAULT_RESCUE_POINTS = [
         "type": "cold-storage",
         "available": False,
         "eta": 45,
+        "lat": 13.29,
+        "lon": 80.05,
     },
     {
         "name": "Metro Fresh Market",
@@ -49,12 +67,14 @@ _DEFAULT_RESCUE_POINTS = [
         "type": "market",
         "available": True,
         "eta": 8,
+        "lat": 13.069,
+        "lon": 80.213,
     },
 ]
 
 
 def _get_svc() -> SupabaseService:
-    return SupabaseService(get_supabase_client())
+    return get_db_service()
 
 
 @router.get("/")
@@ -74,10 +94,74 @@ async def get_rescue_points(
 @router.get("/best")
 async def get_best_rescue_point(svc: SupabaseService = Depends(_get_svc)):
     """Return the single best available rescue point."""
-    points = await svc.get_rescue_points(available_only=True)
+    points = await svc.select(
+        "rescue_points",
+        [("available", "eq", True)],
+        order_by="recovery_chance",
+        desc=True,
+        limit=1,
+    )
     if not points:
         points = [p for p in _DEFAULT_RESCUE_POINTS if p["available"]]
     if not points:
         return {"rescue_point": None}
     best = max(points, key=lambda p: p.get("recovery_chance", 0))
     return {"rescue_point": best}
+
+
+@router.get("/nearest")
+async def get_nearest_rescue_points(
+    lat: float,
+    lon: float,
+    k: int = 5,
+    include_facilities: bool = False,
+    svc: SupabaseService = Depends(_get_svc),
+):
+    """
+    The ``k`` best available rescue points (optionally facilities too) for a
+    truck at ``lat``/``lon``, ranked by recovery chance discounted by the
+    great-circle distance from the truck (halved every
+    ``rescue_distance_half_km``). Distance and ETA are computed from the
+    position rather than read from the stored fields.
+    """
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPException(status_code=400, detail="lat must be in [-90, 90] and lon in [-180, 180]")
+    if not 1 <= k <= 100:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 100")
+
+    async def load():
+        points, facilities = await asyncio.gather(
+            svc.get_rescue_points(available_only=True), svc.get_facilities()
+        )
+        if not points:
+            points = [p for p in _DEFAULT_RESCUE_POINTS if p["available"]]
+        return points, facilities or DEFAULT_FACILITIES
+
+    rescue_index = get_rescue_index()
+    index = await rescue_index.get(load)
+    started = time.perf_counter()
+    candidates = index.nearest(lat, lon, k, rescue_index.half_km, include_facilities)
+    return {
+        "candidates": candidates,
+        "count": len(candidates),
+        "indexed_sites": len(index),
+        "query_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+@router.put("/{name}")
+async def update_rescue_point(
+    name: str,
+    body: RescuePointUpdate,
+    svc: SupabaseService = Depends(_get_svc),
+):
+    """Update a rescue point's availability, recovery chance or coordinates."""
+    updates = body.model_dump(exclude_none=True)
+    if not updates:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    saved = await svc.update_rescue_point(name, updates)
+    if not saved:
+        raise HTTPException(status_code=404, detail=f"Rescue point not found: {name}")
+    get_analysis_cache().bump("rescue_points")
+    get_rescue_index().invalidate()
+    return {"success": True, "rescue_point": saved}
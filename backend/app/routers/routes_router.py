@@ -1,10 +1,24 @@
 """
 /api/routes — active delivery routes with survival margins.
+
+POST /api/routes/optimize → jointly assign at-risk trucks to facilities and
+                            rescue points within their remaining capacity
+GET  /api/routes/network  → road-network graph and shortest-path cache stats
+GET  /api/routes/network/paths?node= → best paths from a node to every destination
+PUT  /api/routes/network/edges/{id} → change a road condition (cached paths repaired)
 """
-from fastapi import APIRouter, Depends
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
 
-from ..database import get_supabase_client
-from ..models.schemas import RouteData
+from ..config import get_settings
+from ..database import get_db_service
+from ..models.schemas import RoadConditionUpdate, RouteData, RouteOptimizeRequest
+from ..services.agent_cache import get_analysis_cache
+from ..services.agent_service import DEFAULT_FACILITIES, DEFAULT_RESCUE_POINTS
+from ..services.ml_service import get_ml_service
+from ..services.road_network import get_road_network
+from ..services.route_optimizer import build_destinations, optimize_assignments
 from ..services.supabase_service import SupabaseService
 
 router = APIRouter(prefix="/api/routes", tags=["Routes"])
@@ -59,7 +73,7 @@ _DEFAULT_ROUTES = [
 
 
 def _get_svc() -> SupabaseService:
-    return SupabaseService(get_supabase_client())
+    return get_db_service()
 
 
 @router.get("/")
@@ -79,16 +93,115 @@ async def upsert_route(
     """Create or update a route record."""
     route_dict = body.model_dump(exclude_none=True)
     saved = await svc.upsert_route(route_dict)
+    get_analysis_cache().bump("routes")
     return {"success": True, "route": saved}
 
 
+@router.post("/optimize")
+async def optimize_routes(
+    body: RouteOptimizeRequest,
+    svc: SupabaseService = Depends(_get_svc),
+):
+    """
+    Assign a set of at-risk trucks to facilities and available rescue points
+    at once, so simultaneous pivots do not all overflow the same centre.
+    Shelf life comes from one batched ML prediction (unless supplied); the
+    assignment maximises recovery × survival margin within capacity (a
+    transportation LP with per-destination capacities). Trucks that fit
+    nowhere useful are returned as ``unassigned`` with the reason. A truck's
+    ``node`` fills in shortest-path distances and road conditions for
+    destinations on the road network.
+    """
+    facilities, points = await asyncio.gather(
+        svc.get_facilities(), svc.get_rescue_points(available_only=True)
+    )
+    destinations = build_destinations(
+        facilities or DEFAULT_FACILITIES,
+        points or [p for p in DEFAULT_RESCUE_POINTS if p["available"]],
+        units_per_truck=body.units_per_truck,
+        rescue_slots=body.rescue_slots,
+        capacities=body.capacities,
+        default_facility_distance_km=body.default_facility_distance_km,
+    )
+
+    trucks = [t.model_dump() for t in body.trucks]
+    network = get_road_network()
+    for t in trucks:
+        if not t["node"]:
+            continue
+        try:
+            paths = network.paths_from(t["node"])
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown road-network node: {t['node']}")
+        for p in paths:
+            t["distances_km"].setdefault(p["destination"], p["km"])
+            t["roads"].setdefault(p["destination"], p["road"])
+    to_predict = [t for t in trucks if t["shelf_life_days"] is None]
+    if to_predict:
+        ml = get_ml_service(get_settings().models_dir)
+        predictions = await asyncio.to_thread(ml.predict_batch, [
+            {
+                "temp_c": t["temp_c"],
+                "humidity_pct": t["humidity_pct"],
+                "vibration_g": t["vibration_g"],
+                "distance_km": t["distance_km"],
+            }
+            for t in to_predict
+        ])
+        for t, p in zip(to_predict, predictions):
+            t["shelf_life_days"] = p["predicted_shelf_life_days"]
+
+    return await asyncio.to_thread(
+        optimize_assignments,
+        trucks,
+        [t["shelf_life_days"] for t in trucks],
+        destinations,
+        body.target_margin_days,
+    )
+
+
+@router.get("/network")
+async def road_network():
+    """The road graph (edges with their current condition) and path-cache stats."""
+    network = get_road_network()
+    return {
+        **network.stats(),
+        "edges": list(network.edges.values()),
+    }
+
+
+@router.get("/network/paths")
+async def road_network_paths(node: str):
+    """
+    Condition-aware best paths from ``node`` to every facility and rescue
+    point, nearest first, plus the Centre A / B conditions fed to the ML model.
+    """
+    network = get_road_network()
+    try:
+        return {
+            "node": node,
+            "paths": network.paths_from(node),
+            "prediction_conditions": network.prediction_conditions(node),
+        }
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown road-network node: {node}")
+
+
+@router.put("/network/edges/{edge_id}")
+async def set_road_condition(edge_id: str, body: RoadConditionUpdate):
+    """Change one road's condition; cached shortest-path trees are repaired in place."""
+    try:
+        return get_road_network().set_road_condition(edge_id, body.road)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown road-network edge: {edge_id}")
+
+
 @router.get("/{route_id}")
 async def get_route(route_id: str, svc: SupabaseService = Depends(_get_svc)):
-    """Get a single route by ID."""
-    routes = await svc.get_routes()
-    for r in routes:
-        if r.get("route_id") == route_id:
-            return r
+    """Get a single route by ID (indexed lookup on the unique route_id)."""
+    route = await svc.get_route(route_id)
+    if route:
+        return route
     # Fallback to default
     for r in _DEFAULT_ROUTES:
         if r["route_id"] == route_id:
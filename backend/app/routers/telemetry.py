@@ -1,22 +1,39 @@
 """
 /api/telemetry — log sensor readings and retrieve history.
 """
-import asyncio
-import json
-from typing import Optional
+import hmac
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 
-from ..database import get_supabase_client
+from ..config import get_settings
+from ..database import get_db_service
 from ..models.schemas import TelemetryInput
+from ..services.pagination import (
+    EXPORT_MEDIA_TYPES,
+    decode_cursor,
+    export_stream,
+    iter_rows,
+    next_cursor,
+)
+from ..services.risk_tracker import get_risk_tracker
+from ..services.shelf_life_tracker import get_shelf_life_tracker
 from ..services.supabase_service import SupabaseService
+from ..services.telemetry_broker import get_telemetry_broker
+from ..services.telemetry_buffer import get_telemetry_buffers
+from ..services.telemetry_pipeline import get_telemetry_pipeline
+from ..services.telemetry_rollup import RESOLUTIONS_S, get_telemetry_rollup
+
+_CURSOR_KEYS = ("created_at", "id")
 
 router = APIRouter(prefix="/api/telemetry", tags=["Telemetry"])
 
 
 def _get_svc() -> SupabaseService:
-    return SupabaseService(get_supabase_client())
+    return get_db_service()
 
 
 @router.post("/log")
@@ -24,7 +41,7 @@ async def log_telemetry(
     body: TelemetryInput,
     svc: SupabaseService = Depends(_get_svc),
 ):
-    """Persist a telemetry snapshot to Supabase."""
+    """Persist a telemetry snapshot and run the ingest pipeline on it."""
     data = {
         "temperature": body.temperature,
         "humidity": body.humidity,
@@ -36,38 +53,178 @@ async def log_telemetry(
         "signal_strength": body.signal_strength,
         "session_id": body.session_id,
     }
-    saved = await svc.log_telemetry(data)
-    return {"success": True, "record": saved}
+    result = await get_telemetry_pipeline().ingest(data, svc)
+    return {"success": True, **result}
 
 
 @router.get("/history")
 async def get_telemetry_history(
-    limit: int = 20,
+    limit: int = Query(default=20, ge=0),
+    cursor: Optional[str] = None,
+    session_id: Optional[str] = None,
+    svc: SupabaseService = Depends(_get_svc),
+):
+    """
+    Return recent telemetry readings (newest first), optionally for one session.
+    Pass the returned ``next_cursor`` back as ``cursor`` to walk older pages.
+    """
+    try:
+        before = decode_cursor(cursor, _CURSOR_KEYS) if cursor else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    records = await svc.get_latest_telemetry(
+        limit=limit, before=before, session_id=session_id
+    )
+    return {
+        "records": records,
+        "count": len(records),
+        "next_cursor": next_cursor(records, limit, _CURSOR_KEYS),
+    }
+
+
+@router.get("/export")
+async def export_telemetry(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    svc: SupabaseService = Depends(_get_svc),
+):
+    """Stream the full telemetry history (newest first) page by page."""
+    rows = iter_rows(
+        lambda limit, before: svc.get_latest_telemetry(limit=limit, before=before, strict=True),
+        _CURSOR_KEYS,
+    )
+    return StreamingResponse(
+        export_stream(rows, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=telemetry.{format}"},
+    )
+
+
+@router.get("/live/{session_id}")
+async def live_telemetry(session_id: str, n: int = 20):
+    """Latest ``n`` readings for a session from its in-memory ring buffer (no DB)."""
+    buffers = get_telemetry_buffers()
+    if not buffers.has(session_id):
+        raise HTTPException(status_code=404, detail="No live data for this session")
+    records = buffers.latest(session_id, max(1, n))
+    return {"session_id": session_id, "records": records, "count": len(records)}
+
+
+@router.get("/live/{session_id}/stats")
+async def live_telemetry_stats(session_id: str, window_s: float = 300.0):
+    """Windowed min/max/mean/std and rate of change per field, from memory."""
+    stats = get_telemetry_buffers().window_stats(session_id, window_s)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No live data for this session")
+    return stats
+
+
+@router.get("/risk/{session_id}")
+async def session_risk(session_id: str):
+    """Latest event-driven prediction and change-detection state for a session."""
+    state = get_risk_tracker().state(session_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No readings for this session")
+    return state
+
+
+@router.get("/shelf-life/{session_id}")
+async def session_shelf_life(session_id: str):
+    """Live cumulative shelf-life consumption and remaining-life estimate."""
+    estimate = get_shelf_life_tracker().estimate(session_id)
+    if estimate is None:
+        raise HTTPException(status_code=404, detail="No readings for this session")
+    return estimate
+
+
+@router.get("/live")
+async def live_buffer_status():
+    """Ring buffer occupancy and memory use."""
+    buffers = get_telemetry_buffers()
+    return {**buffers.stats(), "session_ids": buffers.session_ids()}
+
+
+@router.get("/rollup")
+async def telemetry_rollup(
+    resolution: int = 60,
+    session_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    svc: SupabaseService = Depends(_get_svc),
+):
+    """
+    Per-session min/max/mean aggregates for [start, end), answered from the
+    rollup table. Defaults to the last 60 buckets at the chosen resolution.
+    """
+    if resolution not in RESOLUTIONS_S:
+        raise HTTPException(
+            status_code=400, detail=f"resolution must be one of {list(RESOLUTIONS_S)}"
+        )
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - timedelta(seconds=resolution * 60)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    buckets = await get_telemetry_rollup().query(
+        svc, resolution, start, end, session_id=session_id
+    )
+    return {
+        "resolution_s": resolution,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "buckets": buckets,
+        "count": len(buckets),
+    }
+
+
+@router.post("/compact")
+async def compact_telemetry(
+    retention_h: Optional[float] = None,
+    admin_token: Optional[str] = Header(default=None, alias="X-Admin-Token"),
     svc: SupabaseService = Depends(_get_svc),
 ):
-    """Return recent telemetry readings (newest first)."""
-    records = await svc.get_latest_telemetry(limit=limit)
-    return {"records": records, "count": len(records)}
+    """
+    Flush rollups and delete raw readings older than the retention window
+    (only those already counted by the hourly rollup). Requires the
+    ``X-Admin-Token`` header to match ``admin_token``; disabled when unset.
+    """
+    settings = get_settings()
+    if not settings.admin_token or not hmac.compare_digest(admin_token or "", settings.admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    hours = retention_h if retention_h is not None else settings.telemetry_raw_retention_h
+    floor = max(settings.telemetry_compaction_min_h, settings.telemetry_raw_retention_h)
+    if hours < floor:
+        raise HTTPException(status_code=400, detail=f"retention_h must be at least {floor:g}")
+    removed = await get_telemetry_rollup().compact(svc, hours * 3600)
+    return {"success": True, "deleted_rows": removed, "retention_h": hours}
+
+
+def _as_utc(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
 
 
 @router.get("/stream")
-async def stream_telemetry():
+async def stream_telemetry(
+    session_id: Optional[str] = None,
+    last_event_id: Optional[int] = None,
+    last_event_id_header: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+):
     """
-    Server-Sent Events stream — emits a simulated telemetry tick every 3 s.
-    The frontend Simulation Lab can subscribe to keep the dashboard live.
+    Server-Sent Events stream of readings posted to /log (and any derived events).
+    ``session_id`` takes a comma-separated list to follow specific trucks.
+    Reconnecting clients resume after Last-Event-ID from the replay buffer.
     """
-    import random
-
-    async def generator():
-        while True:
-            payload = {
-                "temperature": round(4 + random.gauss(0, 0.5), 2),
-                "humidity": round(85 + random.gauss(0, 2), 1),
-                "vibration": round(0.3 + random.uniform(0, 0.2), 3),
-                "ethylene": round(12 + random.uniform(-2, 2), 1),
-                "co2": round(450 + random.uniform(-30, 30), 1),
-            }
-            yield {"event": "telemetry", "data": json.dumps(payload)}
-            await asyncio.sleep(3)
-
-    return EventSourceResponse(generator())
+    resume_from = last_event_id
+    if resume_from is None and last_event_id_header:
+        try:
+            resume_from = int(last_event_id_header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    session_ids = [s for s in (session_id or "").split(",") if s] or None
+    broker = get_telemetry_broker()
+    sub = broker.subscribe(session_ids=session_ids, last_event_id=resume_from)
+    return EventSourceResponse(broker.stream(sub), ping=15)
+
+
+@router.get("/stream/stats")
+async def stream_stats():
+    """Broker fan-out counters."""
+    return get_telemetry_broker().stats()
@@ -0,0 +1,125 @@
+"""
+/api/telemetry/ws — persistent WebSocket channel for truck gateways and dashboards.
+
+Ingest (client → server)
+    binary frame → telemetry_codec batch (absolute or delta-encoded)
+    text frame   → JSON TelemetryInput, a list of them, or {"readings": [...]}
+    Every frame is fed through the same ingest pipeline as POST /log and
+    answered with {"ack": <readings stored>}; when the insert failed the
+    answer also carries "error" and the frame should be resent.
+
+Egress (server → client)
+    Broker events for the sessions named in ``subscribe`` ("*" = all) as JSON
+    text frames, or — with ``egress=binary`` — telemetry events as single-record
+    binary frames (a reading that does not fit the wire format goes as JSON).
+    If the egress task fails the socket is closed with code 1011.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from ..database import get_db_service
+from ..models.schemas import TelemetryInput
+from ..services.telemetry_broker import Subscription, get_telemetry_broker
+from ..services.telemetry_codec import decode_frame, encode_batch
+from ..services.telemetry_pipeline import get_telemetry_pipeline
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/telemetry", tags=["Telemetry"])
+
+
+def _parse_json_readings(text: str, default_session: Optional[str]) -> List[dict]:
+    payload = json.loads(text)
+    if isinstance(payload, dict) and "readings" in payload:
+        default_session = payload.get("session_id") or default_session
+        payload = payload["readings"]
+    items = payload if isinstance(payload, list) else [payload]
+    rows = []
+    for item in items:
+        reading = TelemetryInput(**item).model_dump()
+        reading["session_id"] = reading["session_id"] or default_session
+        rows.append(reading)
+    return rows
+
+
+async def _pump_events(ws: WebSocket, sub: Subscription, egress: str) -> None:
+    broker = get_telemetry_broker()
+    async for event in broker.stream(sub):
+        if egress == "binary" and event["event"] == "telemetry":
+            data = json.loads(event["data"])
+            ts = datetime.fromisoformat(data["created_at"]).timestamp() * 1000
+            try:
+                frame = encode_batch([{**data, "ts_ms": int(ts)}], data.get("session_id") or "")
+            except ValueError:
+                frame = None  # out of the codec's range — fall through to JSON
+            if frame is not None:
+                await ws.send_bytes(frame)
+                continue
+        # data is already serialised by the broker — splice it in as-is
+        await ws.send_text(
+            f'{{"id": {event["id"]}, "event": "{event["event"]}", "data": {event["data"]}}}'
+        )
+
+
+def _close_on_failure(ws: WebSocket, task: asyncio.Task) -> None:
+    if task.cancelled() or task.exception() is None:
+        return
+    logger.error("Telemetry socket egress failed: %s", task.exception())
+
+    async def close():
+        try:
+            await ws.close(code=1011)
+        except Exception:
+            pass  # already closed by the client
+
+    asyncio.ensure_future(close())
+
+
+@router.websocket("/ws")
+async def telemetry_socket(
+    ws: WebSocket,
+    session_id: Optional[str] = None,
+    subscribe: Optional[str] = None,
+    egress: Literal["json", "binary"] = "json",
+):
+    await ws.accept()
+    svc = get_db_service()
+    pipeline = get_telemetry_pipeline()
+
+    pump: Optional[asyncio.Task] = None
+    if subscribe:
+        wanted = None if subscribe == "*" else [s for s in subscribe.split(",") if s]
+        sub = get_telemetry_broker().subscribe(session_ids=wanted)
+        pump = asyncio.create_task(_pump_events(ws, sub, egress))
+        pump.add_done_callback(lambda task: _close_on_failure(ws, task))
+
+    try:
+        while True:
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                if message.get("bytes") is not None:
+                    rows = decode_frame(message["bytes"], default_session=session_id)
+                else:
+                    rows = _parse_json_readings(message.get("text") or "", session_id)
+            except (ValueError, ValidationError, TypeError) as exc:
+                await ws.send_text(json.dumps({"error": str(exc)}))
+                continue
+            results = await pipeline.ingest_batch(rows, svc)
+            stored = sum(1 for r in results if r["record"])
+            reply = {"ack": stored}
+            if stored < len(rows):
+                reply["error"] = f"{len(rows) - stored} readings were not stored; resend the frame"
+            await ws.send_text(json.dumps(reply))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if pump:
+            pump.cancel()
@@ -1,14 +1,28 @@
 """
 /api/trips — historical trip log records.
 """
-from fastapi import APIRouter, Depends
+from typing import Literal, Optional
 
-from ..database import get_supabase_client
-from ..models.schemas import TripLog
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ..database import get_db_service
+from ..models.schemas import TripClose, TripLog
+from ..services.pagination import (
+    EXPORT_MEDIA_TYPES,
+    decode_cursor,
+    export_stream,
+    iter_rows,
+    next_cursor,
+)
+from ..services.risk_tracker import get_risk_tracker
+from ..services.shelf_life_tracker import get_shelf_life_tracker
 from ..services.supabase_service import SupabaseService
 
 router = APIRouter(prefix="/api/trips", tags=["Trip Logs"])
 
+_CURSOR_KEYS = ("date", "id")
+
 _DEFAULT_TRIPS = [
     {
         "trip_id": "T001",
@@ -74,22 +88,49 @@ _DEFAULT_TRIPS = [
 
 
 def _get_svc() -> SupabaseService:
-    return SupabaseService(get_supabase_client())
+    return get_db_service()
 
 
 @router.get("/")
 async def get_trips(
-    limit: int = 50,
+    limit: int = Query(default=50, ge=0),
     status: str = None,
+    cursor: Optional[str] = None,
     svc: SupabaseService = Depends(_get_svc),
 ):
-    """Return trip logs, newest first. Optionally filter by status."""
-    trips = await svc.get_trip_logs(limit=limit)
-    if not trips:
+    """
+    Return trip logs, newest first. Optionally filter by status.
+    Pass the returned ``next_cursor`` back as ``cursor`` to walk older pages.
+    """
+    try:
+        before = decode_cursor(cursor, _CURSOR_KEYS) if cursor else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    trips = await svc.get_trip_logs(limit=limit, before=before, status=status)
+    page_cursor = next_cursor(trips, limit, _CURSOR_KEYS)
+    # Defaults only stand in for an empty table, not for an empty filter result
+    if not trips and before is None and not await svc.select_one("trip_logs", columns="id"):
         trips = _DEFAULT_TRIPS
-    if status:
-        trips = [t for t in trips if t.get("status") == status]
-    return {"trips": trips, "count": len(trips)}
+        if status:
+            trips = [t for t in trips if t.get("status") == status]
+    return {"trips": trips, "count": len(trips), "next_cursor": page_cursor}
+
+
+@router.get("/export")
+async def export_trips(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    svc: SupabaseService = Depends(_get_svc),
+):
+    """Stream every trip log (newest first) page by page."""
+    rows = iter_rows(
+        lambda limit, before: svc.get_trip_logs(limit=limit, before=before, strict=True),
+        _CURSOR_KEYS,
+    )
+    return StreamingResponse(
+        export_stream(rows, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=trips.{format}"},
+    )
 
 
 @router.post("/")
@@ -101,3 +142,35 @@ async def add_trip(
     trip_dict = body.model_dump(exclude_none=True)
     saved = await svc.add_trip_log(trip_dict)
     return {"success": True, "trip": saved}
+
+
+@router.post("/close")
+async def close_trip(
+    body: TripClose,
+    svc: SupabaseService = Depends(_get_svc),
+):
+    """
+    Finish a trip recorded under ``session_id`` and log it with the
+    shelf life actually consumed in transit.
+    """
+    tracker = get_shelf_life_tracker()
+    summary = tracker.summary(body.session_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No telemetry tracked for this session")
+    trip = {
+        "trip_id": body.trip_id,
+        "date": body.date or summary["started_at"],
+        "route": body.route,
+        "cargo": body.cargo,
+        "duration": summary["duration"],
+        "temp_range": summary["temp_range"],
+        "status": body.status,
+        "shelf_life_used": round(summary["used_pct"]),
+    }
+    saved = await svc.add_trip_log(trip)
+    if not saved:
+        # keep the session tracked so the close can be retried
+        raise HTTPException(status_code=503, detail="Trip log could not be saved; retry the close")
+    tracker.forget(body.session_id)
+    get_risk_tracker().forget(body.session_id)
+    return {"success": True, "trip": saved, "shelf_life": summary}
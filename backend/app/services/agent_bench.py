@@ -0,0 +1,235 @@
+"""
+Agent benchmark harness.
+
+Drives ``/api/agent/chat`` and ``/api/agent/analyze`` with a seeded mix of
+requests from ``concurrency`` parallel clients and reports:
+
+  * turn latency per endpoint (p50/p95/p99/max) and throughput,
+  * iterations per agent turn and tool latency per tool, from the agent
+    tracer's span metrics (``/api/agent/metrics``) before and after the run,
+  * event-loop blocking: a probe sleeps ``interval`` in a loop and records
+    how late it wakes. Run in-process this is the app's own loop, so it
+    exposes synchronous work (inference, SQLite, client setup) on the
+    request path; against a remote server it only covers the client.
+
+``run_local_bench`` wires everything in-process — httpx ASGITransport,
+SQLite ``:memory:`` and the real ``AsyncOpenAI`` client talking to the mock
+chat-completions app (``mock_llm``) through another ASGITransport — so the
+OpenAI SDK's request building and SSE parsing are part of what is measured.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from .latency_stats import percentiles
+
+logger = logging.getLogger(__name__)
+
+_QUESTIONS = (
+    "What is the current cargo status?",
+    "Should we reroute?",
+    "How much shelf life is left?",
+    "Any rescue points nearby?",
+    "Summarise the risk for dispatch.",
+)
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic ``asyncio.sleep`` wakes up."""
+
+    def __init__(self, interval_s: float = 0.01, blocked_threshold_s: float = 0.005):
+        self.interval_s = interval_s
+        self.blocked_threshold_s = blocked_threshold_s
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.interval_s)
+            self.lags.append(max(0.0, time.perf_counter() - t0 - self.interval_s))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def report(self, elapsed: float) -> dict:
+        blocked = sum(lag for lag in self.lags if lag > self.blocked_threshold_s)
+        return {
+            **percentiles(self.lags),
+            "blocked_s": round(blocked, 3),
+            "blocked_pct": round(100.0 * blocked / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+class AgentBenchmark:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        requests: int = 100,
+        concurrency: int = 8,
+        chat_share: float = 0.3,
+        sessions: int = 20,
+        seed: int = 7,
+    ):
+        self.client = client
+        self.concurrency = concurrency
+        rng = random.Random(seed)
+        self.workload = [self._request(rng, sessions, chat_share) for _ in range(requests)]
+        self.latency: Dict[str, List[float]] = {"chat": [], "analyze": []}
+        self.errors: Dict[str, int] = {}
+        self.cached = 0
+
+    @staticmethod
+    def _request(rng: random.Random, sessions: int, chat_share: float) -> dict:
+        # Mostly cold cargo, some warm, a few critical
+        temp = rng.choice((rng.uniform(2, 7.5), rng.uniform(2, 7.5), rng.uniform(9, 14), rng.uniform(16, 24)))
+        telemetry = {
+            "temperature": round(temp, 2),
+            "humidity": round(rng.uniform(80, 95), 1),
+            "vibration": round(rng.uniform(0.05, 0.9), 2),
+        }
+        session_id = f"BENCH-{rng.randrange(sessions):03d}"
+        if rng.random() < chat_share:
+            return {"kind": "chat", "path": "/api/agent/chat", "body": {
+                "message": rng.choice(_QUESTIONS), "telemetry": telemetry, "session_id": session_id,
+            }}
+        return {"kind": "analyze", "path": "/api/agent/analyze", "body": {
+            "telemetry": telemetry, "session_id": session_id,
+        }}
+
+    async def _metrics(self) -> dict:
+        try:
+            resp = await self.client.get("/api/agent/metrics")
+            return resp.json() if resp.status_code == 200 else {}
+        except httpx.HTTPError:
+            return {}
+
+    async def _worker(self, queue: "asyncio.Queue[dict]") -> None:
+        while True:
+            try:
+                req = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = time.perf_counter()
+            try:
+                resp = await self.client.post(req["path"], json=req["body"])
+                ok = resp.status_code < 400
+            except httpx.HTTPError as exc:
+                logger.debug("%s failed: %s", req["kind"], exc)
+                ok, resp = False, None
+            self.latency[req["kind"]].append(time.perf_counter() - t0)
+            if not ok:
+                self.errors[req["kind"]] = self.errors.get(req["kind"], 0) + 1
+            elif req["kind"] == "analyze" and resp.json().get("cached"):
+                self.cached += 1
+
+    async def run(self, monitor_loop: bool = True) -> dict:
+        before = await self._metrics()
+        queue: "asyncio.Queue[dict]" = asyncio.Queue()
+        for req in self.workload:
+            queue.put_nowait(req)
+        monitor = LoopLagMonitor()
+        if monitor_loop:
+            monitor.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(self._worker(queue) for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - start
+        await monitor.stop()
+        after = await self._metrics()
+        return self.report(elapsed, before, after, monitor if monitor_loop else None)
+
+    def report(self, elapsed: float, before: dict, after: dict, monitor: Optional[LoopLagMonitor]) -> dict:
+        def delta(section: str, key: str) -> int:
+            return (
+                after.get(section, {}).get(key, {}).get("count", 0)
+                - before.get(section, {}).get(key, {}).get("count", 0)
+            )
+
+        turns, iterations = delta("by_kind", "turn"), delta("by_kind", "iteration")
+        tools = {
+            name.split(":", 1)[1]: {
+                "calls": delta("by_name", name),
+                "p50_ms": stats["p50_ms"],
+                "p95_ms": stats["p95_ms"],
+                "max_ms": stats["max_ms"],
+            }
+            for name, stats in after.get("by_name", {}).items()
+            if name.startswith("tool:") and delta("by_name", name)
+        }
+        total = sum(len(v) for v in self.latency.values())
+        return {
+            "requests": total,
+            "concurrency": self.concurrency,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_per_s": round(total / elapsed, 2) if elapsed else 0.0,
+            "chat_latency": percentiles(self.latency["chat"]),
+            "analyze_latency": percentiles(self.latency["analyze"]),
+            "analyze_cached": self.cached,
+            "llm_turns": turns,
+            "iterations_per_turn": round(iterations / turns, 2) if turns else None,
+            "iteration_p95_ms": after.get("by_kind", {}).get("iteration", {}).get("p95_ms"),
+            "tool_latency": tools,
+            "event_loop_lag": monitor.report(elapsed) if monitor else None,
+            "errors": self.errors,
+        }
+
+
+async def run_local_bench(
+    script: str = "analyze",
+    latency_s: float = 0.15,
+    jitter_s: float = 0.0,
+    token_delay_s: float = 0.0,
+    llm_url: Optional[str] = None,
+    **kwargs,
+) -> dict:
+    """
+    Benchmark the app in-process. The caller must have set
+    STORAGE_BACKEND=sqlite / SQLITE_PATH=:memory: before ``app`` is imported.
+    With ``llm_url`` the agent talks to that server instead of the in-process mock.
+    """
+    from openai import AsyncOpenAI
+
+    from ..config import get_settings
+    from ..main import app
+    from ..routers.agent import _get_agent
+    from .ml_service import get_ml_service
+    from .mock_llm import create_mock_llm_app, in_process_client, load_script
+    from .transcript_writer import stop_transcript_writer
+
+    # ASGITransport skips the lifespan; load the models up front as it would
+    await asyncio.to_thread(get_ml_service(get_settings().models_dir)._load)
+
+    mock = None
+    if llm_url:
+        llm = AsyncOpenAI(api_key="sk-bench", base_url=llm_url)
+    else:
+        mock = create_mock_llm_app(load_script(script), latency_s, jitter_s, token_delay_s)
+        llm = in_process_client(mock)
+
+    def _agent():
+        agent = _get_agent()
+        agent.client = llm
+        return agent
+
+    app.dependency_overrides[_get_agent] = _agent
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+            report = await AgentBenchmark(client, **kwargs).run(monitor_loop=True)
+    finally:
+        app.dependency_overrides.pop(_get_agent, None)
+        await stop_transcript_writer()
+        await llm.close()
+    report["event_loop_measured"] = "in-process app"
+    if mock is not None:
+        report["llm_calls"] = mock.state.llm.calls
+    return report
@@ -0,0 +1,132 @@
+"""
+Cache of /api/agent/analyze results.
+
+Automated monitoring re-asks for analyses of telemetry that has barely
+moved. Results are keyed on a quantized telemetry bucket (temperature,
+humidity, vibration, door), the temperature's decision band (nominal /
+warning / critical, so a bucket never straddles the 8 °C or 15 °C
+threshold), the route conditions analysed, and the current
+data versions: facilities, routes and rescue points (bumped by their write
+endpoints) plus the ML model version. Any version bump therefore makes
+older entries unreachable; they are also dropped eagerly.
+
+Entries expire after ``ttl_s``; the store is an LRU bounded by
+``max_entries``. Hits return the stored report with its age and skip the
+LLM loop and its recommendation / conversation writes.
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .agent_rules import TEMP_CRIT_C, TEMP_WARN_C
+
+logger = logging.getLogger(__name__)
+
+DATA_KINDS = ("facilities", "routes", "rescue_points")
+
+
+def _bucket(value, step: float) -> Optional[int]:
+    return None if value is None else int(round(float(value) / step))
+
+
+def temp_band(telemetry: dict) -> str:
+    """Decision-table temperature band: ``nominal``, ``warning`` or ``critical``."""
+    temp = float(telemetry.get("temperature", 4.0))
+    return "critical" if temp > TEMP_CRIT_C else "warning" if temp > TEMP_WARN_C else "nominal"
+
+
+class AnalysisCache:
+    def __init__(
+        self,
+        ttl_s: float = 300.0,
+        max_entries: int = 1024,
+        temp_step_c: float = 0.5,
+        humidity_step_pct: float = 5.0,
+        vibration_step_g: float = 0.1,
+    ):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.steps = (temp_step_c, humidity_step_pct, vibration_step_g)
+        self._entries: "OrderedDict[Tuple, Tuple[float, dict]]" = OrderedDict()
+        self._versions: Dict[str, int] = {kind: 0 for kind in DATA_KINDS}
+        self.hits = 0
+        self.misses = 0
+
+    # ── Versions & invalidation ────────────────────────────────────────────────
+    def bump(self, kind: str) -> None:
+        """Record a change to ``kind`` data; every cached analysis is now stale."""
+        self._versions[kind] = self._versions.get(kind, 0) + 1
+        self._entries.clear()
+
+    def invalidate(self) -> int:
+        n = len(self._entries)
+        self._entries.clear()
+        return n
+
+    # ── Lookup ─────────────────────────────────────────────────────────────────
+    def key(self, telemetry: dict, conditions: dict, model_version: str) -> Tuple:
+        t_step, h_step, v_step = self.steps
+        return (
+            temp_band(telemetry),
+            _bucket(telemetry.get("temperature"), t_step),
+            _bucket(telemetry.get("humidity"), h_step),
+            _bucket(telemetry.get("vibration"), v_step),
+            telemetry.get("door_status", "closed"),
+            tuple(sorted(conditions.items())),
+            tuple(self._versions[k] for k in DATA_KINDS),
+            model_version,
+        )
+
+    def get(self, key: Tuple) -> Optional[Tuple[dict, float]]:
+        """(result, age_s) for a live entry, else None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, result = entry
+        age = time.monotonic() - stored_at
+        if age > self.ttl_s:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result, age
+
+    def put(self, key: Tuple, result: dict) -> None:
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "ttl_s": self.ttl_s,
+            "data_versions": dict(self._versions),
+        }
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_cache: Optional[AnalysisCache] = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    global _cache
+    if _cache is None:
+        from ..config import get_settings
+
+        settings = get_settings()
+        _cache = AnalysisCache(
+            ttl_s=settings.agent_cache_ttl_s,
+            max_entries=settings.agent_cache_max_entries,
+            temp_step_c=settings.agent_cache_temp_step_c,
+            humidity_step_pct=settings.agent_cache_humidity_step_pct,
+            vibration_step_g=settings.agent_cache_vibration_step_g,
+        )
+    return _cache
@@ -0,0 +1,235 @@
+"""
+Background job queue for agent analyses.
+
+``submit`` returns immediately with a job id; a bounded pool of worker
+tasks drains an asyncio.PriorityQueue and runs ``AegisAgentService.analyze``
+for each job. Priority follows the decision table — critical telemetry
+(> 15 °C) before warning (> 8 °C) before nominal — then submission order.
+
+At most one job per session waits in the queue: submitting again for a
+session that already has a queued job refreshes that job's telemetry (and
+raises its priority if the new reading is more urgent) instead of adding a
+second one. Finished jobs are kept, LRU-bounded, for polling; every state
+change also wakes SSE followers of that job.
+"""
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from .agent_rules import TEMP_CRIT_C, TEMP_WARN_C
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CRITICAL, PRIORITY_WARNING, PRIORITY_NOMINAL = 0, 1, 2
+_PRIORITY_NAMES = {0: "critical", 1: "warning", 2: "nominal"}
+PRIORITIES = {name: p for p, name in _PRIORITY_NAMES.items()}
+_TERMINAL = ("done", "failed")
+
+
+def telemetry_priority(telemetry: dict) -> int:
+    temp = float(telemetry.get("temperature", 4.0))
+    if temp > TEMP_CRIT_C:
+        return PRIORITY_CRITICAL
+    if temp > TEMP_WARN_C:
+        return PRIORITY_WARNING
+    return PRIORITY_NOMINAL
+
+
+class AgentJob:
+    def __init__(self, session_id: str, telemetry: dict, conditions: Optional[dict], priority: int):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.telemetry = telemetry
+        self.conditions = conditions
+        self.priority = priority
+        self.status = "queued"
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.merged = 0
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_change(self) -> None:
+        await self._changed.wait()
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "priority": _PRIORITY_NAMES[self.priority],
+            "merged_submissions": self.merged,
+            "submitted_at": self.submitted_at,
+            "queue_wait_s": round(self.started_at - self.submitted_at, 3) if self.started_at else None,
+            "run_s": (
+                round(self.finished_at - self.started_at, 3)
+                if self.finished_at and self.started_at else None
+            ),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+class AgentJobQueue:
+    def __init__(
+        self,
+        agent_factory: Callable,
+        workers: int = 4,
+        max_queued: int = 1000,
+        retain: int = 1000,
+    ):
+        self.agent_factory = agent_factory
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retain = retain
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._jobs: "OrderedDict[str, AgentJob]" = OrderedDict()
+        self._queued_by_session: Dict[str, AgentJob] = {}
+        self.completed = 0
+        self.failed = 0
+
+    # ── Lifecycle ──────────────────────────────────────────────────────────────
+    def _ensure_started(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"agent-job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ── Submission ─────────────────────────────────────────────────────────────
+    def submit(
+        self,
+        telemetry: dict,
+        session_id: Optional[str] = None,
+        conditions: Optional[dict] = None,
+        priority: Optional[int] = None,
+    ) -> dict:
+        self._ensure_started()
+        priority = telemetry_priority(telemetry) if priority is None else priority
+        session_id = session_id or uuid.uuid4().hex
+
+        queued = self._queued_by_session.get(session_id)
+        if queued is not None:
+            # Coalesce: the waiting job analyses the newest reading instead
+            queued.telemetry, queued.conditions = telemetry, conditions
+            queued.merged += 1
+            if priority < queued.priority:
+                queued.priority = priority
+                self._queue.put_nowait((priority, next(self._seq), queued.id))
+            queued._notify()
+            return {**queued.snapshot(), "deduplicated": True}
+
+        if len(self._queued_by_session) >= self.max_queued:
+            raise QueueFullError("Agent job queue is full")
+        job = AgentJob(session_id, telemetry, conditions, priority)
+        self._jobs[job.id] = job
+        self._queued_by_session[session_id] = job
+        self._queue.put_nowait((priority, next(self._seq), job.id))
+        self._trim()
+        return {**job.snapshot(), "deduplicated": False}
+
+    def get(self, job_id: str) -> Optional[AgentJob]:
+        return self._jobs.get(job_id)
+
+    def _trim(self) -> None:
+        while len(self._jobs) > self.retain:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status not in _TERMINAL:
+                break
+            del self._jobs[oldest_id]
+
+    # ── Workers ────────────────────────────────────────────────────────────────
+    async def _worker(self, n: int) -> None:
+        while True:
+            priority, _seq, job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            # Skip entries superseded by a priority upgrade or already taken
+            if job is None or job.status != "queued" or job.priority != priority:
+                continue
+            if self._queued_by_session.get(job.session_id) is job:
+                del self._queued_by_session[job.session_id]
+            job.status, job.started_at = "running", time.time()
+            job._notify()
+            try:
+                agent = self.agent_factory()
+                job.result = await agent.analyze(
+                    telemetry=job.telemetry,
+                    session_id=job.session_id,
+                    conditions=job.conditions,
+                )
+                job.status = "done"
+                self.completed += 1
+            except asyncio.CancelledError:
+                job.status, job.error = "failed", "cancelled"
+                job._notify()
+                raise
+            except Exception as exc:
+                logger.error("Agent job %s failed: %s", job.id, exc)
+                job.status, job.error = "failed", str(exc)
+                self.failed += 1
+            job.finished_at = time.time()
+            job._notify()
+
+    def stats(self) -> dict:
+        by_status: Dict[str, int] = {}
+        for job in self._jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "running": bool(self._tasks),
+            "queued": len(self._queued_by_session),
+            "jobs": by_status,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_queue: Optional[AgentJobQueue] = None
+
+
+def get_agent_job_queue(agent_factory: Optional[Callable] = None) -> AgentJobQueue:
+    """The process-wide queue; the first caller supplies the agent factory."""
+    global _queue
+    if _queue is None:
+        from ..config import get_settings
+
+        if agent_factory is None:
+            raise RuntimeError("Agent job queue not initialised")
+        settings = get_settings()
+        _queue = AgentJobQueue(
+            agent_factory,
+            workers=settings.agent_job_workers,
+            max_queued=settings.agent_job_queue_max,
+            retain=settings.agent_jobs_retained,
+        )
+    return _queue
+
+
+async def stop_agent_job_queue() -> None:
+    if _queue is not None:
+        await _queue.stop()
@@ -0,0 +1,106 @@
+"""
+Local rules engine for the copilot's decision framework.
+
+Evaluates the SYSTEM_PROMPT decision table against an ML prediction:
+
+| Condition                                   | Action    | Severity |
+|---------------------------------------------|-----------|----------|
+| Temp ≤ 8°C and shelf life > 2 days          | maintain  | low      |
+| 8 < Temp ≤ 15°C or shelf life 0.5–2 days    | reroute   | medium   |
+| Temp > 15°C or shelf life < 0.5 days        | pivot     | critical |
+
+A decision is *ambiguous* when a reading sits within the configured margin
+of a table boundary, the temperature and shelf-life columns point at
+different rows, the routing model wants a pivot anyway, or the door is open.
+``AegisAgentService.analyze`` answers unambiguous ``maintain`` decisions
+from here and escalates everything else to the LLM.
+"""
+TEMP_WARN_C = 8.0
+TEMP_CRIT_C = 15.0
+LIFE_WARN_DAYS = 2.0
+LIFE_CRIT_DAYS = 0.5
+
+_ACTIONS = ("maintain", "reroute", "pivot")
+_SEVERITY = {"maintain": "low", "reroute": "medium", "pivot": "critical"}
+_ACTION_TEXT = {
+    "maintain": "Maintain current route and optimise speed.",
+    "reroute": "Reroute to the nearest cold centre",
+    "pivot": "CRISIS — trigger an immediate market pivot",
+}
+
+
+def _temp_row(temp_c: float) -> int:
+    return 2 if temp_c > TEMP_CRIT_C else 1 if temp_c > TEMP_WARN_C else 0
+
+
+def _life_row(days: float) -> int:
+    return 2 if days < LIFE_CRIT_DAYS else 1 if days <= LIFE_WARN_DAYS else 0
+
+
+def evaluate(
+    telemetry: dict,
+    prediction: dict,
+    margin_c: float = 0.5,
+    margin_days: float = 0.25,
+) -> dict:
+    """Apply the decision table → action, severity, ambiguity and its reasons."""
+    temp = float(telemetry.get("temperature", 4.0))
+    days = float(prediction["predicted_shelf_life_days"])
+    t_row, l_row = _temp_row(temp), _life_row(days)
+    action = _ACTIONS[max(t_row, l_row)]
+
+    reasons = []
+    for bound in (TEMP_WARN_C, TEMP_CRIT_C):
+        if abs(temp - bound) <= margin_c:
+            reasons.append(f"temperature within {margin_c}°C of {bound:g}°C")
+    for bound in (LIFE_WARN_DAYS, LIFE_CRIT_DAYS):
+        if abs(days - bound) <= margin_days:
+            reasons.append(f"shelf life within {margin_days} d of {bound:g} d")
+    if t_row != l_row:
+        reasons.append("temperature and shelf life disagree")
+    if prediction.get("market_pivot_trigger") and action == "maintain":
+        reasons.append("routing model suggests a pivot")
+    if telemetry.get("door_status") == "open":
+        reasons.append("container door open")
+
+    return {
+        "action": action,
+        "severity": _SEVERITY[action],
+        "ambiguous": bool(reasons),
+        "reasons": reasons,
+        "temperature": temp,
+        "shelf_life_days": days,
+        "recommended_center": prediction.get("recommended_center"),
+    }
+
+
+def needs_llm(decision: dict) -> bool:
+    return decision["action"] != "maintain" or decision["ambiguous"]
+
+
+def situation_report(decision: dict, prediction: dict) -> str:
+    """Structured report in the same four-part shape the LLM is asked for."""
+    action = decision["action"]
+    status = (
+        f"NOMINAL: {decision['temperature']:.1f}°C with "
+        f"{decision['shelf_life_days']:.1f} days of predicted shelf life remaining."
+        if action == "maintain"
+        else f"{decision['severity'].upper()}: {decision['temperature']:.1f}°C, "
+        f"{decision['shelf_life_days']:.1f} days of predicted shelf life remaining."
+    )
+    step = _ACTION_TEXT[action]
+    if action != "maintain" and decision.get("recommended_center"):
+        step += f" (model recommends {decision['recommended_center']})."
+    elif action != "maintain":
+        step += "."
+    recovery = (
+        "Not applicable — no pivot required."
+        if action == "maintain"
+        else f"Survival margin to Centre A {prediction['survival_margins']['SM_A']:.1f} days."
+    )
+    return "\n".join([
+        f"1. Status: {status}",
+        f"2. Action: {step}",
+        f"3. Cargo recovery: {recovery}",
+        f"4. Severity: {decision['severity']}",
+    ])
@@ -5,14 +5,23 @@ Agentic loop powered by OpenAI function calling.
 Tools: run_ml_prediction, get_rescue_points, get_facility_status,
        get_active_routes, log_recommendation
 """
+import asyncio
 import json
+import time
 import uuid
 import logging
-from typing import Optional, List
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 
+from . import agent_rules
+from .agent_cache import AnalysisCache
+from .agent_sessions import SessionContext, SessionStore, compact_tool_result, estimate_tokens
+from .agent_tracing import Tracer
+from .transcript_writer import TranscriptWriter
 from .ml_service import ColdChainMLService
+from .road_network import RoadNetwork
 from .supabase_service import SupabaseService
 
 logger = logging.getLogger(__name__)
@@ -185,6 +194,8 @@ DEFAULT_RESCUE_POINTS = [
         "type": "cold-storage",
         "available": True,
         "eta": 18,
+        "lat": 13.012,
+        "lon": 80.018,
     },
     {
         "name": "FreshMart Outlet",
@@ -193,6 +204,8 @@ DEFAULT_RESCUE_POINTS = [
         "type": "market",
         "available": True,
         "eta": 12,
+        "lat": 12.951,
+        "lon": 80.141,
     },
     {
         "name": "AgriProcess Plant",
@@ -201,6 +214,8 @@ DEFAULT_RESCUE_POINTS = [
         "type": "processing",
         "available": True,
         "eta": 30,
+        "lat": 13.213,
+        "lon": 79.985,
     },
     {
         "name": "Metro Fresh Market",
@@ -209,25 +224,31 @@ DEFAULT_RESCUE_POINTS = [
         "type": "market",
         "available": True,
         "eta": 8,
+        "lat": 13.069,
+        "lon": 80.213,
     },
 ]
 
 DEFAULT_FACILITIES = [
     {
-        "name": "Centre A – Metro Cold Hub",
+        "name": "Center A – Metro Cold Hub",
         "temperature": 3,
         "humidity": 88,
         "power_status": "normal",
         "storage_capacity": 5000,
         "current_load": 3200,
+        "lat": 13.083,
+        "lon": 80.236,
     },
     {
-        "name": "Centre B – Regional Depot",
+        "name": "Center B – Regional Depot",
         "temperature": 5,
         "humidity": 82,
         "power_status": "normal",
         "storage_capacity": 3000,
         "current_load": 2100,
+        "lat": 13.312,
+        "lon": 79.962,
     },
 ]
 
@@ -236,7 +257,7 @@ DEFAULT_ROUTES = [
         "route_id": "R1",
         "name": "Route Alpha",
         "origin": "Farm Hub A",
-        "destination": "Centre A",
+        "destination": "Center A",
         "eta": 180,
         "survival_margin": 900,
         "status": "on-track",
@@ -245,7 +266,7 @@ DEFAULT_ROUTES = [
         "route_id": "R2",
         "name": "Route Beta",
         "origin": "Farm Hub B",
-        "destination": "Centre B",
+        "destination": "Center B",
         "eta": 240,
         "survival_margin": 600,
         "status": "on-track",
@@ -254,7 +275,7 @@ DEFAULT_ROUTES = [
         "route_id": "R3",
         "name": "Route Gamma",
         "origin": "Farm Hub C",
-        "destination": "Centre A",
+        "destination": "Center A",
         "eta": 120,
         "survival_margin": 1200,
         "status": "on-track",
@@ -262,6 +283,90 @@ DEFAULT_ROUTES = [
 ]
 
 
+_TOOLS_TOKENS = estimate_tokens(json.dumps(TOOLS))
+
+
+def _record_usage(
+    ctx, usage, messages: list, content: List[str], calls: dict, seconds: float
+) -> Tuple[int, int]:
+    """API-reported usage when available, else a character-based estimate → (prompt, completion)."""
+    if usage is not None:
+        prompt, completion = usage.prompt_tokens, usage.completion_tokens
+    else:
+        prompt = estimate_tokens(json.dumps(messages, default=str)) + _TOOLS_TOKENS
+        completion = estimate_tokens("".join(content) + json.dumps(list(calls.values())))
+    if ctx is not None:
+        ctx.record_llm_call(prompt, completion, seconds)
+    return prompt, completion
+
+
+class _Transcript:
+    """One agent turn as agent_conversations rows: user, tool calls, assistant."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turn_id = uuid.uuid4().hex
+        self.rows: List[dict] = []
+
+    def add(self, role: str, content: str, **extra) -> None:
+        self.rows.append({
+            "session_id": self.session_id,
+            "role": role,
+            "content": content,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "turn_id": self.turn_id,
+            "seq": len(self.rows),
+            **extra,
+        })
+
+    def add_tool(self, call: dict, result: str, seconds: float) -> None:
+        try:
+            args = json.loads(call["arguments"] or "{}")
+        except ValueError:
+            args = {"_raw": call["arguments"]}
+        self.add(
+            "tool",
+            result,
+            tool_name=call["name"],
+            tool_call_id=call["id"],
+            tool_args=args,
+            duration_ms=round(seconds * 1000, 3),
+        )
+
+
+# Route conditions analyze() scores against unless the caller gives its own
+# or a road-network node (these end up in the analyze prompt)
+ANALYZE_CONDITIONS = {
+    "distance_km": 250.0,
+    "dist_a_km": 50.0,
+    "dist_b_km": 120.0,
+    "road_a": "Clear",
+    "road_b": "Traffic",
+    "cap_a_pct": 64.0,
+    "cap_b_pct": 70.0,
+}
+
+# run_ml_prediction defaults for arguments the model leaves out
+_PREDICT_DEFAULTS = {
+    "dist_a_km": 50.0,
+    "dist_b_km": 100.0,
+    "road_a": "Clear",
+    "road_b": "Traffic",
+    "cap_a_pct": 70.0,
+    "cap_b_pct": 50.0,
+}
+_PREDICT_FIELDS = ("temp_c", "humidity_pct", "vibration_g", "distance_km", *_PREDICT_DEFAULTS)
+
+
+def _prediction_key(arguments: dict) -> tuple:
+    """Hashable identity of a prediction input (250 and 250.0 compare equal)."""
+    key = []
+    for field in _PREDICT_FIELDS:
+        value = arguments.get(field, _PREDICT_DEFAULTS.get(field))
+        key.append(round(float(value), 3) if isinstance(value, (int, float)) else value)
+    return tuple(key)
+
+
 class AegisAgentService:
     """Agentic loop: receives a message, calls tools, returns final response."""
 
@@ -270,16 +375,45 @@ class AegisAgentService:
         openai_api_key: str,
         ml_service: ColdChainMLService,
         supabase_service: SupabaseService,
+        base_url: Optional[str] = None,
+        tool_timeout_s: float = 10.0,
+        client: Optional[AsyncOpenAI] = None,
+        fast_path: bool = True,
+        rules_margin_c: float = 0.5,
+        rules_margin_days: float = 0.25,
+        cache: Optional[AnalysisCache] = None,
+        sessions: Optional[SessionStore] = None,
+        tracer: Optional[Tracer] = None,
+        transcripts: Optional[TranscriptWriter] = None,
+        road_network: Optional[RoadNetwork] = None,
     ):
-        self.client = OpenAI(api_key=openai_api_key)
+        # Pass a shared client where possible: building one costs ~25 ms of
+        # blocking TLS setup and forfeits connection reuse
+        self.client = client or AsyncOpenAI(api_key=openai_api_key, base_url=base_url or None)
         self.ml = ml_service
         self.db = supabase_service
+        self.tool_timeout_s = tool_timeout_s
+        self.fast_path = fast_path
+        self.rules_margins = (rules_margin_c, rules_margin_days)
+        self.cache = cache
+        self.sessions = sessions
+        self.tracer = tracer or Tracer(enabled=False)
+        self.transcripts = transcripts
+        self.road_network = road_network
+        # Set for the duration of analyze_batch: shared tool data and ML results
+        self._prefetched: Optional[dict] = None
 
     # ── Tool dispatcher ────────────────────────────────────────────────────────
     async def _execute_tool(self, tool_name: str, arguments: dict) -> str:
         try:
             if tool_name == "run_ml_prediction":
-                result = self.ml.predict(
+                if self._prefetched is not None:
+                    cached = self._prefetched["predictions"].get(_prediction_key(arguments))
+                    if cached is not None:
+                        return json.dumps(cached)
+                # CPU-bound inference runs off the event loop
+                result = await asyncio.to_thread(
+                    self.ml.predict,
                     temp_c=arguments["temp_c"],
                     humidity_pct=arguments["humidity_pct"],
                     vibration_g=arguments["vibration_g"],
@@ -294,27 +428,13 @@ class AegisAgentService:
                 return json.dumps(result)
 
             elif tool_name == "get_rescue_points":
-                available_only = arguments.get("available_only", True)
-                points = await self.db.get_rescue_points(available_only=available_only)
-                if not points:
-                    points = (
-                        [p for p in DEFAULT_RESCUE_POINTS if p["available"]]
-                        if available_only
-                        else DEFAULT_RESCUE_POINTS
-                    )
-                return json.dumps(points)
+                return json.dumps(await self._rescue_points(arguments.get("available_only", True)))
 
             elif tool_name == "get_facility_status":
-                facilities = await self.db.get_facilities()
-                if not facilities:
-                    facilities = DEFAULT_FACILITIES
-                return json.dumps(facilities)
+                return json.dumps(await self._facilities())
 
             elif tool_name == "get_active_routes":
-                routes = await self.db.get_routes()
-                if not routes:
-                    routes = DEFAULT_ROUTES
-                return json.dumps(routes)
+                return json.dumps(await self._routes())
 
             elif tool_name == "log_recommendation":
                 rec = {
@@ -324,7 +444,8 @@ class AegisAgentService:
                     "message": arguments["message"],
                     "status": "pending",
                 }
-                await self.db.save_recommendation(rec)
+                with self.tracer.span("save_recommendation", "db", severity=rec["severity"]):
+                    await self.db.save_recommendation(rec)
                 return json.dumps({"success": True, "rec_id": rec["rec_id"]})
 
             else:
@@ -334,6 +455,52 @@ class AegisAgentService:
             logger.error("Tool error (%s): %s", tool_name, exc)
             return json.dumps({"error": str(exc)})
 
+    # ── Shared context (DB with built-in fallbacks, or a batch's prefetch) ──────
+    async def _rescue_points(self, available_only: bool = True) -> List[dict]:
+        if self._prefetched is not None:
+            points = self._prefetched["rescue_points"]
+            return [p for p in points if p.get("available")] if available_only else points
+        points = await self.db.get_rescue_points(available_only=available_only)
+        if not points:
+            points = (
+                [p for p in DEFAULT_RESCUE_POINTS if p["available"]]
+                if available_only
+                else DEFAULT_RESCUE_POINTS
+            )
+        return points
+
+    async def _facilities(self) -> List[dict]:
+        if self._prefetched is not None:
+            return self._prefetched["facilities"]
+        return await self.db.get_facilities() or DEFAULT_FACILITIES
+
+    async def _routes(self) -> List[dict]:
+        if self._prefetched is not None:
+            return self._prefetched["routes"]
+        return await self.db.get_routes() or DEFAULT_ROUTES
+
+    async def _run_tool_call(self, call: dict) -> Tuple[dict, float]:
+        """Execute one {id, name, arguments} call under the per-tool deadline → (tool message, seconds)."""
+        name = call["name"]
+        started = time.perf_counter()
+        with self.tracer.span(name, "tool", call_id=call["id"]) as span:
+            try:
+                args = json.loads(call["arguments"] or "{}")
+                content = await asyncio.wait_for(
+                    self._execute_tool(name, args), timeout=self.tool_timeout_s
+                )
+            except asyncio.TimeoutError:
+                logger.error("Tool timeout (%s) after %.1fs", name, self.tool_timeout_s)
+                content = json.dumps({"error": f"{name} timed out"})
+            except json.JSONDecodeError as exc:
+                content = json.dumps({"error": f"Invalid tool arguments: {exc}"})
+            span.set(result_chars=len(content), failed='"error"' in content[:10])
+        return {
+            "role": "tool",
+            "tool_call_id": call["id"],
+            "content": compact_tool_result(name, content),
+        }, time.perf_counter() - started
+
     # ── Main agentic chat loop ─────────────────────────────────────────────────
     async def chat(
         self,
@@ -342,9 +509,182 @@ class AegisAgentService:
         history: Optional[List[dict]] = None,
         session_id: Optional[str] = None,
     ) -> dict:
+        result: dict = {}
+        async for event in self.chat_stream(message, telemetry, history, session_id):
+            if event["event"] == "done":
+                result = event["data"]
+        return result
+
+    async def chat_stream(
+        self,
+        message: str,
+        telemetry: Optional[dict] = None,
+        history: Optional[List[dict]] = None,
+        session_id: Optional[str] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        The agentic loop as a stream of ``{"event", "data"}`` items:
+        ``session``, then ``tool_call`` / ``tool_result`` per tool, ``token``
+        for each fragment of the final answer, and finally ``done`` with the
+        same payload ``chat`` returns. An iteration's text is held until the
+        model finishes it: text that comes with tool calls is narration, not
+        the answer, and is never sent as ``token``.
+        """
         if not session_id:
             session_id = uuid.uuid4().hex
+        yield {"event": "session", "data": {"session_id": session_id}}
+
+        with self.tracer.span("agent.turn", "turn", session_id=session_id) as turn:
+            async for event in self._turn(message, telemetry, history, session_id, turn):
+                yield event
+
+    async def _turn(
+        self,
+        message: str,
+        telemetry: Optional[dict],
+        history: Optional[List[dict]],
+        session_id: str,
+        turn,
+    ) -> AsyncIterator[dict]:
+        turn_started = time.perf_counter()
+        transcript = _Transcript(session_id)
+        transcript.add("user", message)
+        ctx = None
+        if self.sessions is not None:
+            ctx = await self.sessions.get(session_id, self.db, history)
+        messages = self._build_messages(message, telemetry, history, ctx)
 
+        # Agentic loop — keep iterating while the model wants to call tools
+        for iteration in range(6):
+            with self.tracer.span("agent.iteration", "iteration", iteration=iteration) as span:
+                call_started = time.perf_counter()
+                stream = await self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    tools=TOOLS,
+                    tool_choice="auto",
+                    temperature=0.3,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+
+                content: List[str] = []
+                calls: Dict[int, dict] = {}
+                usage = None
+                first_token = None
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    delta = chunk.choices[0].delta
+                    if delta.content:
+                        content.append(delta.content)
+                    for tc in delta.tool_calls or ():
+                        call = calls.setdefault(tc.index, {"id": None, "name": "", "arguments": ""})
+                        if tc.id:
+                            call["id"] = tc.id
+                        if tc.function and tc.function.name:
+                            call["name"] += tc.function.name
+                        if tc.function and tc.function.arguments:
+                            call["arguments"] += tc.function.arguments
+                llm_seconds = time.perf_counter() - call_started
+                prompt_tokens, completion_tokens = _record_usage(
+                    ctx, usage, messages, content, calls, llm_seconds
+                )
+                span.set(
+                    llm_ms=round(llm_seconds * 1000, 3),
+                    ttft_ms=round((first_token - call_started) * 1000, 3) if first_token else None,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    usage_reported=usage is not None,
+                    tool_calls=len(calls),
+                )
+
+                if calls:
+                    ordered = [calls[i] for i in sorted(calls)]
+                    # Append assistant message with tool calls
+                    messages.append({
+                        "role": "assistant",
+                        "content": "".join(content) or None,
+                        "tool_calls": [
+                            {
+                                "id": c["id"],
+                                "type": "function",
+                                "function": {"name": c["name"], "arguments": c["arguments"]},
+                            }
+                            for c in ordered
+                        ],
+                    })
+                    for c in ordered:
+                        yield {"event": "tool_call", "data": c}
+                    # Tool calls within a turn are independent — run them concurrently;
+                    # gather keeps results in call order
+                    timed = await asyncio.gather(*(self._run_tool_call(c) for c in ordered))
+                    results = [res for res, _seconds in timed]
+                    for c, (res, seconds) in zip(ordered, timed):
+                        transcript.add_tool(c, res["content"], seconds)
+                        yield {
+                            "event": "tool_result",
+                            "data": {"id": c["id"], "name": c["name"], "result": res["content"]},
+                        }
+                    messages.extend(results)
+                    continue
+
+            # Model produced a final text response
+            for fragment in content:
+                yield {"event": "token", "data": {"delta": fragment}}
+            reply = "".join(content)
+
+            # Persist conversation
+            transcript.add("assistant", reply)
+            await self._persist(transcript)
+            if ctx is not None:
+                ctx.add_turn("user", message)
+                ctx.add_turn("assistant", reply)
+                ctx.record_turn(time.perf_counter() - turn_started)
+
+            action_keywords = {"reroute", "pivot", "crisis", "immediate", "redirect"}
+            action_required = any(kw in reply.lower() for kw in action_keywords)
+
+            turn.set(iterations=iteration + 1, action_required=action_required)
+            yield {"event": "done", "data": {
+                "message": reply,
+                "session_id": session_id,
+                "action_required": action_required,
+            }}
+            return
+
+        turn.set(iterations=6, exhausted=True)
+        reply = (
+            "Analysis complete. Telemetry reviewed. "
+            "Please check the Recommendations panel for next steps."
+        )
+        transcript.add("assistant", reply)
+        await self._persist(transcript)
+        yield {"event": "done", "data": {
+            "message": reply,
+            "session_id": session_id,
+            "action_required": False,
+        }}
+
+    async def _persist(self, transcript: "_Transcript") -> None:
+        """Hand the turn to the background writer, or write it in one insert when there is none."""
+        if self.transcripts is not None:
+            self.transcripts.enqueue(transcript.rows)
+            return
+        with self.tracer.span("save_conversation_turns", "db", rows=len(transcript.rows)):
+            await self.db.save_conversation_turns(transcript.rows)
+
+    def _build_messages(
+        self,
+        message: str,
+        telemetry: Optional[dict],
+        history: Optional[List[dict]],
+        session: Optional[SessionContext] = None,
+    ) -> list:
         messages: list = [{"role": "system", "content": SYSTEM_PROMPT}]
 
         # Inject current telemetry as system context
@@ -362,70 +702,205 @@ class AegisAgentService:
             )
             messages.append({"role": "system", "content": ctx})
 
+        # Server-side session context (summary + recent turns within budget)
+        # supersedes whatever history the client resends
+        if session is not None:
+            messages.extend(session.messages())
         # Previous conversation turns (cap at last 10)
-        if history:
+        elif history:
             for turn in history[-10:]:
                 messages.append(
                     {"role": turn.get("role", "user"), "content": turn.get("content", "")}
                 )
 
         messages.append({"role": "user", "content": message})
+        return messages
 
-        # Agentic loop — keep iterating while the model wants to call tools
-        for _iteration in range(6):
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                tools=TOOLS,
-                tool_choice="auto",
-                temperature=0.3,
-            )
-
-            assistant_msg = response.choices[0].message
-
-            if assistant_msg.tool_calls:
-                # Append assistant message with tool calls
-                messages.append(assistant_msg)
-                # Execute all tool calls
-                for tc in assistant_msg.tool_calls:
-                    args = json.loads(tc.function.arguments)
-                    tool_result = await self._execute_tool(tc.function.name, args)
-                    messages.append(
-                        {
-                            "role": "tool",
-                            "tool_call_id": tc.id,
-                            "content": tool_result,
-                        }
-                    )
-            else:
-                # Model produced a final text response
-                reply = assistant_msg.content or ""
+    # ── Auto-analyze (called when telemetry changes) ───────────────────────────
+    async def analyze(
+        self,
+        telemetry: dict,
+        session_id: Optional[str] = None,
+        conditions: Optional[dict] = None,
+    ) -> dict:
+        """
+        Autonomously assess telemetry and generate a recommendation.
+        Repeats of a recently analysed telemetry bucket are served from the
+        cache; unambiguous nominal readings are answered by the local rules
+        engine; anything else goes through the LLM tool loop.
+        """
+        cond = self._conditions(conditions)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key(telemetry, cond, self.ml.model_version)
+            hit = self.cache.get(cache_key)
+            if hit is not None:
+                result, age = hit
+                return {
+                    **result,
+                    "session_id": session_id or result["session_id"],
+                    "cached": True,
+                    "cache_age_s": round(age, 3),
+                }
 
-                # Persist conversation
-                await self.db.save_conversation_turn(session_id, "user", message)
-                await self.db.save_conversation_turn(session_id, "assistant", reply)
+        result = await self._analyze(telemetry, session_id, cond)
+        if cache_key is not None:
+            self.cache.put(cache_key, result)
+        return result
 
-                action_keywords = {"reroute", "pivot", "crisis", "immediate", "redirect"}
-                action_required = any(kw in reply.lower() for kw in action_keywords)
+    async def analyze_batch(
+        self,
+        items: List[dict],
+        llm_slots: Optional[asyncio.Semaphore] = None,
+    ) -> dict:
+        """
+        Analyse many trucks at once. Each item is ``{"telemetry", "session_id",
+        "conditions"}`` as for ``analyze``. Rescue points, facilities and
+        routes are fetched once and ML predictions for every uncached truck
+        run as one batch; only trucks the rules engine escalates reach the
+        LLM, at most ``llm_slots`` at a time. Results keep the input order.
+
+        Trucks in the same cache bucket as an earlier one in the batch reuse
+        its analysis, like a cache hit: they get ``shared_with`` (the leader's
+        index) and no recommendation or conversation rows of their own.
+        """
+        started = time.perf_counter()
+        conds = [self._conditions(item.get("conditions")) for item in items]
+
+        results: List[Optional[dict]] = [None] * len(items)
+        keys: List[Optional[tuple]] = [None] * len(items)
+        if self.cache is not None:
+            for i, (item, cond) in enumerate(zip(items, conds)):
+                keys[i] = self.cache.key(item["telemetry"], cond, self.ml.model_version)
+                hit = self.cache.get(keys[i])
+                if hit is not None:
+                    result, age = hit
+                    results[i] = {
+                        **result,
+                        "session_id": item.get("session_id") or result["session_id"],
+                        "cached": True,
+                        "cache_age_s": round(age, 3),
+                    }
+        # Trucks in the same cache bucket share one analysis
+        pending: List[int] = []
+        followers: Dict[int, int] = {}
+        leaders: Dict[tuple, int] = {}
+        for i, r in enumerate(results):
+            if r is not None:
+                continue
+            if keys[i] is not None and keys[i] in leaders:
+                followers[i] = leaders[keys[i]]
+                continue
+            if keys[i] is not None:
+                leaders[keys[i]] = i
+            pending.append(i)
+
+        inputs = [
+            {
+                "temp_c": items[i]["telemetry"].get("temperature", 4),
+                "humidity_pct": items[i]["telemetry"].get("humidity", 85.0),
+                "vibration_g": items[i]["telemetry"].get("vibration", 0.3),
+                **conds[i],
+            }
+            for i in pending
+        ]
+        points, facilities, routes, predictions = await asyncio.gather(
+            self._rescue_points(available_only=False),
+            self._facilities(),
+            self._routes(),
+            asyncio.to_thread(self.ml.predict_batch, inputs),
+        )
+        self._prefetched = {
+            "rescue_points": points,
+            "facilities": facilities,
+            "routes": routes,
+            "predictions": {_prediction_key(x): p for x, p in zip(inputs, predictions)},
+        }
 
-                return {
-                    "message": reply,
-                    "session_id": session_id,
-                    "action_required": action_required,
+        async def run(i: int, prediction: dict) -> None:
+            item = items[i]
+            try:
+                result = await self._analyze(
+                    item["telemetry"], item.get("session_id"), conds[i],
+                    prediction=prediction, llm_slots=llm_slots,
+                )
+            except Exception as exc:
+                logger.error("Batch analysis failed for item %d: %s", i, exc)
+                results[i] = {
+                    "message": f"Analysis failed: {exc}",
+                    "session_id": item.get("session_id"),
+                    "action_required": False,
+                    "source": "error",
                 }
+                return
+            if keys[i] is not None:
+                self.cache.put(keys[i], result)
+            results[i] = result
 
+        try:
+            await asyncio.gather(*(run(i, p) for i, p in zip(pending, predictions)))
+        finally:
+            self._prefetched = None
+        for i, leader in followers.items():
+            results[i] = {
+                **results[leader],
+                "session_id": items[i].get("session_id") or results[leader]["session_id"],
+                "cached": True,
+                "cache_age_s": 0.0,
+                "shared_with": leader,
+            }
+        if followers:
+            logger.info(
+                "Batch analysis: %d trucks reused another truck's analysis "
+                "(no recommendation or conversation writes)", len(followers),
+            )
+
+        sources: Dict[str, int] = {}
+        for r in results:
+            src = "cache" if r.get("cached") else r.get("source", "llm")
+            sources[src] = sources.get(src, 0) + 1
         return {
-            "message": (
-                "Analysis complete. Telemetry reviewed. "
-                "Please check the Recommendations panel for next steps."
-            ),
-            "session_id": session_id,
-            "action_required": False,
+            "results": results,
+            "count": len(results),
+            "sources": sources,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
         }
 
-    # ── Auto-analyze (called when telemetry changes) ───────────────────────────
-    async def analyze(self, telemetry: dict, session_id: Optional[str] = None) -> dict:
-        """Autonomously assess telemetry and generate a recommendation."""
+    def _conditions(self, conditions: Optional[dict]) -> dict:
+        """Route conditions to score: defaults, the caller's, then shortest paths from ``node``."""
+        conditions = conditions or {}
+        cond = {**ANALYZE_CONDITIONS}
+        cond.update({k: v for k, v in conditions.items() if k in ANALYZE_CONDITIONS})
+        node = conditions.get("node")
+        if node and self.road_network is not None:
+            try:
+                cond.update(self.road_network.prediction_conditions(node))
+            except KeyError:
+                raise ValueError(f"Unknown road-network node: {node}") from None
+        return cond
+
+    async def _analyze(
+        self,
+        telemetry: dict,
+        session_id: Optional[str],
+        cond: dict,
+        prediction: Optional[dict] = None,
+        llm_slots: Optional[asyncio.Semaphore] = None,
+    ) -> dict:
+        with self.tracer.span("agent.analyze", "analyze", session_id=session_id) as span:
+            result = await self._analyze_inner(telemetry, session_id, cond, prediction, llm_slots)
+            span.set(source=result.get("source"), action_required=result.get("action_required"))
+        return result
+
+    async def _analyze_inner(
+        self,
+        telemetry: dict,
+        session_id: Optional[str],
+        cond: dict,
+        prediction: Optional[dict],
+        llm_slots: Optional[asyncio.Semaphore],
+    ) -> dict:
         temp = telemetry.get("temperature", 4)
 
         if temp > 15:
@@ -435,15 +910,61 @@ class AegisAgentService:
         else:
             status_msg = f"NOMINAL: Temperature {temp}°C is within safe range."
 
+        if self.fast_path:
+            fast = await self._analyze_locally(telemetry, status_msg, session_id, cond, prediction)
+            if fast is not None:
+                return fast
+
         prompt = (
             f"{status_msg}\n\n"
             "Please:\n"
-            "1. Run the ML prediction with these conditions "
-            "(use distance_km=250, dist_a_km=50, dist_b_km=120, "
-            "road_a='Clear', road_b='Traffic', cap_a_pct=64, cap_b_pct=70)\n"
+            "1. Run the ML prediction with these conditions (use "
+            + ", ".join(f"{k}={v!r}" if isinstance(v, str) else f"{k}={v:g}" for k, v in cond.items())
+            + ")\n"
             "2. If a pivot is triggered or risk is critical, get rescue points\n"
             "3. Log your primary recommendation\n"
             "4. Provide a concise situation report with clear action items"
         )
 
-        return await self.chat(prompt, telemetry=telemetry, session_id=session_id)
+        if llm_slots is None:
+            result = await self.chat(prompt, telemetry=telemetry, session_id=session_id)
+        else:
+            async with llm_slots:
+                result = await self.chat(prompt, telemetry=telemetry, session_id=session_id)
+        return {**result, "source": "llm"}
+
+    async def _analyze_locally(
+        self,
+        telemetry: dict,
+        status_msg: str,
+        session_id: Optional[str],
+        cond: dict,
+        prediction: Optional[dict] = None,
+    ) -> Optional[dict]:
+        """Rules-engine answer, or None when the case must be escalated."""
+        if prediction is None:
+            prediction = await asyncio.to_thread(
+                self.ml.predict,
+                temp_c=telemetry.get("temperature", 4),
+                humidity_pct=telemetry.get("humidity", 85.0),
+                vibration_g=telemetry.get("vibration", 0.3),
+                **cond,
+            )
+        decision = agent_rules.evaluate(telemetry, prediction, *self.rules_margins)
+        if agent_rules.needs_llm(decision):
+            return None
+
+        if not session_id:
+            session_id = uuid.uuid4().hex
+        reply = agent_rules.situation_report(decision, prediction)
+        transcript = _Transcript(session_id)
+        transcript.add("user", status_msg)
+        transcript.add("assistant", reply)
+        await self._persist(transcript)
+        return {
+            "message": reply,
+            "session_id": session_id,
+            "action_required": False,
+            "source": "rules",
+            "decision": decision,
+        }
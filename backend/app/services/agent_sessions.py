@@ -0,0 +1,219 @@
+"""
+Server-side conversation state for copilot sessions.
+
+Each session keeps the most recent turns verbatim plus a rolling summary of
+everything older, both inside a token budget, so the prompt stops growing
+with session length. When the recent turns exceed their share of the
+budget the oldest are folded into the summary as one-line digests; when the
+summary exceeds its share its oldest lines are dropped. Summarising is
+extractive and local — it costs no extra LLM calls.
+
+Tool results are compacted to the fields the model actually reasons over
+before they enter the prompt.
+
+Token counts are estimated at ~4 characters per token unless the API
+reports usage. Per-session accounting (LLM calls, prompt/completion tokens,
+latency) is exposed through ``stats``.
+"""
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_DIGEST_CHARS = 160
+
+# Fields the model uses from each tool's output
+_TOOL_FIELDS = {
+    "run_ml_prediction": (
+        "predicted_shelf_life_days", "recommended_center", "survival_margins",
+        "market_pivot_trigger", "risk_level",
+    ),
+    "get_rescue_points": ("name", "type", "distance", "recovery_chance", "eta", "available"),
+    "get_facility_status": (
+        "name", "temperature", "power_status", "storage_capacity", "current_load",
+    ),
+    "get_active_routes": ("route_id", "name", "destination", "eta", "survival_margin", "status"),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def _round(value):
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {k: _round(v) for k, v in value.items()}
+    return value
+
+
+def compact_tool_result(name: str, content: str) -> str:
+    """Keep only the fields in _TOOL_FIELDS (floats to 2 dp); pass errors through."""
+    fields = _TOOL_FIELDS.get(name)
+    if not fields:
+        return content
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return content
+
+    def pick(obj):
+        if not isinstance(obj, dict) or "error" in obj:
+            return obj
+        return {k: _round(obj[k]) for k in fields if k in obj}
+
+    data = [pick(x) for x in data] if isinstance(data, list) else pick(data)
+    return json.dumps(data, separators=(",", ":"))
+
+
+class SessionContext:
+    def __init__(self, session_id: str, budget_tokens: int):
+        self.session_id = session_id
+        self.budget_tokens = budget_tokens
+        self.summary: Deque[str] = deque()
+        self.recent: Deque[dict] = deque()
+        self.turns = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.last_prompt_tokens = 0
+        self.llm_seconds = 0.0
+        self.turn_seconds: Deque[float] = deque(maxlen=100)
+        self.touched = time.monotonic()
+
+    # ── Context ────────────────────────────────────────────────────────────────
+    def messages(self) -> List[dict]:
+        """Summary (as a system note) followed by the verbatim recent turns."""
+        out = []
+        if self.summary:
+            out.append({
+                "role": "system",
+                "content": "Earlier in this session (summary):\n" + "\n".join(self.summary),
+            })
+        out.extend(self.recent)
+        return out
+
+    def add_turn(self, role: str, content: str) -> None:
+        self.recent.append({"role": role, "content": content})
+        self._fit()
+
+    def _fit(self) -> None:
+        recent_budget = self.budget_tokens * 2 // 3
+        summary_budget = self.budget_tokens - recent_budget
+        # Always keep the latest exchange verbatim
+        while len(self.recent) > 2 and self._tokens(self.recent) > recent_budget:
+            turn = self.recent.popleft()
+            text = " ".join(turn["content"].split())
+            if len(text) > _DIGEST_CHARS:
+                text = text[:_DIGEST_CHARS].rstrip() + "…"
+            self.summary.append(f"- {turn['role']}: {text}")
+        while self.summary and sum(estimate_tokens(s) for s in self.summary) > summary_budget:
+            self.summary.popleft()
+
+    @staticmethod
+    def _tokens(turns) -> int:
+        return sum(estimate_tokens(t["content"]) + 4 for t in turns)
+
+    # ── Accounting ─────────────────────────────────────────────────────────────
+    def record_llm_call(self, prompt_tokens: int, completion_tokens: int, seconds: float) -> None:
+        self.llm_calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.last_prompt_tokens = prompt_tokens
+        self.llm_seconds += seconds
+
+    def record_turn(self, seconds: float) -> None:
+        self.turns += 1
+        self.turn_seconds.append(seconds)
+        self.touched = time.monotonic()
+
+    def stats(self) -> dict:
+        lat = sorted(self.turn_seconds)
+        return {
+            "session_id": self.session_id,
+            "turns": self.turns,
+            "context_tokens": self._tokens(self.messages()),
+            "budget_tokens": self.budget_tokens,
+            "recent_turns": len(self.recent),
+            "summary_lines": len(self.summary),
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "llm_seconds": round(self.llm_seconds, 3),
+            "turn_latency_ms": {
+                "avg": round(sum(lat) / len(lat) * 1000, 1) if lat else None,
+                "p95": round(lat[min(len(lat) - 1, int(0.95 * len(lat)))] * 1000, 1) if lat else None,
+            },
+        }
+
+
+class SessionStore:
+    """LRU of SessionContext, bounded in count and idle time."""
+
+    def __init__(self, budget_tokens: int = 1500, max_sessions: int = 1000, idle_ttl_s: float = 3600.0):
+        self.budget_tokens = budget_tokens
+        self.max_sessions = max_sessions
+        self.idle_ttl_s = idle_ttl_s
+        self._sessions: "OrderedDict[str, SessionContext]" = OrderedDict()
+
+    async def get(self, session_id: str, db=None, client_history: Optional[List[dict]] = None) -> SessionContext:
+        """
+        The session's context. A session new to this process is seeded from
+        the client-sent history, else from the stored conversation.
+        """
+        ctx = self._sessions.get(session_id)
+        if ctx is not None:
+            self._sessions.move_to_end(session_id)
+            ctx.touched = time.monotonic()
+            return ctx
+        self._evict()
+        ctx = SessionContext(session_id, self.budget_tokens)
+        seed = client_history
+        if not seed and db is not None:
+            seed = await db.get_conversation_history(session_id, limit=20)
+        for turn in seed or ():
+            ctx.add_turn(turn.get("role", "user"), turn.get("content") or "")
+        self._sessions[session_id] = ctx
+        return ctx
+
+    def peek(self, session_id: str) -> Optional[SessionContext]:
+        return self._sessions.get(session_id)
+
+    def _evict(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl_s
+        while self._sessions:
+            sid, ctx = next(iter(self._sessions.items()))
+            if len(self._sessions) < self.max_sessions and ctx.touched >= cutoff:
+                break
+            del self._sessions[sid]
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "budget_tokens": self.budget_tokens,
+            "prompt_tokens": sum(c.prompt_tokens for c in self._sessions.values()),
+            "llm_calls": sum(c.llm_calls for c in self._sessions.values()),
+        }
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        from ..config import get_settings
+
+        settings = get_settings()
+        _store = SessionStore(
+            budget_tokens=settings.agent_context_budget_tokens,
+            max_sessions=settings.agent_max_sessions,
+            idle_ttl_s=settings.agent_session_idle_s,
+        )
+    return _store
@@ -0,0 +1,305 @@
+"""
+Structured tracing for the copilot's agent loop.
+
+Every agent turn is a trace: a ``turn`` root span (or ``analyze`` when the
+turn comes from auto-analysis), one ``iteration`` span per loop pass with
+LLM latency, time to first token and token counts, one ``tool`` span per
+tool call and one ``db`` span per conversation / recommendation write.
+Parent links follow the running task through a context variable, so tools
+run concurrently under ``asyncio.gather`` still nest under their iteration.
+
+Finished traces are kept in a bounded ring for inspection and handed to
+the configured exporters:
+
+* ``JsonLogExporter``  — one JSON line per trace via the ``aegis.traces``
+  logger, optionally to its own file.
+* ``OtlpHttpExporter`` — OTLP/HTTP JSON to a local OpenTelemetry collector
+  (e.g. ``http://127.0.0.1:4318/v1/traces``), fire-and-forget.
+
+Durations are also kept per span kind and per span name (last
+``reservoir`` samples each) for the p50/p95 figures on
+``/api/agent/metrics``.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "aegis_current_span", default=None
+)
+
+
+def detach_span() -> None:
+    """Start new traces from here on in this task (for long-lived background tasks)."""
+    _current.set(None)
+
+
+class Span:
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "kind",
+        "start_ns", "end_ns", "attrs", "error", "_t0", "duration_ms",
+    )
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"], attrs: dict):
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._t0 = time.perf_counter()
+        self.duration_ms = 0.0
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+# ── Exporters ──────────────────────────────────────────────────────────────────
+class JsonLogExporter:
+    def __init__(self, path: str = ""):
+        self.log = logging.getLogger("aegis.traces")
+        if path:
+            handler = logging.FileHandler(path, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.log.addHandler(handler)
+            self.log.propagate = False
+            self.log.setLevel(logging.INFO)
+
+    def export(self, spans: List[Span]) -> None:
+        self.log.info(json.dumps({"spans": [s.to_dict() for s in spans]}, default=str))
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpExporter:
+    def __init__(self, endpoint: str, service_name: str = "aegis-backend", timeout_s: float = 2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout_s = timeout_s
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pending: set = set()
+        self.failures = 0
+
+    def payload(self, spans: List[Span]) -> dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": self.service_name}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "aegis.agent"},
+                "spans": [{
+                    "traceId": s.trace_id,
+                    "spanId": s.span_id,
+                    **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                    "name": s.name,
+                    "kind": 1,  # SPAN_KIND_INTERNAL
+                    "startTimeUnixNano": str(s.start_ns),
+                    "endTimeUnixNano": str(s.end_ns),
+                    "attributes": [
+                        {"key": k, "value": _otlp_value(v)}
+                        for k, v in {"aegis.kind": s.kind, **s.attrs}.items()
+                        if v is not None
+                    ],
+                    "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+                } for s in spans],
+            }],
+        }]}
+
+    def export(self, spans: List[Span]) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._post(self.payload(spans)))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _post(self, body: dict) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout_s)
+        try:
+            resp = await self._client.post(self.endpoint, json=body)
+            resp.raise_for_status()
+        except Exception as exc:
+            self.failures += 1
+            if self.failures == 1 or self.failures % 100 == 0:
+                logger.warning("Trace export to %s failed (%d so far): %s", self.endpoint, self.failures, exc)
+
+
+# ── Tracer ─────────────────────────────────────────────────────────────────────
+class Tracer:
+    def __init__(
+        self,
+        enabled: bool = True,
+        exporters: Optional[list] = None,
+        retain: int = 200,
+        reservoir: int = 1000,
+    ):
+        self.enabled = enabled
+        self.exporters = exporters or []
+        self.retain = retain
+        self.reservoir = reservoir
+        self._open: Dict[str, List[Span]] = {}
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._durations: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+
+    @contextmanager
+    def span(self, name: str, kind: str, **attrs) -> Iterator:
+        """Time a block as a span under the current one (a new trace if none)."""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        parent = _current.get()
+        span = Span(name, kind, parent, attrs)
+        if parent is None:
+            self._open[span.trace_id] = []
+        # Restore rather than reset: async generators may resume in another context
+        _current.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            _current.set(parent)
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        span.duration_ms = (time.perf_counter() - span._t0) * 1000
+        for key in (span.kind, f"{span.kind}:{span.name}"):
+            samples = self._durations.get(key)
+            if samples is None:
+                samples = self._durations[key] = deque(maxlen=self.reservoir)
+            samples.append(span.duration_ms)
+            self._counts[key] = self._counts.get(key, 0) + 1
+            if span.error:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+        spans = self._open.get(span.trace_id)
+        if spans is None:  # outlived its root
+            return
+        spans.append(span)
+        if span.parent_id is None:
+            del self._open[span.trace_id]
+            self._traces[span.trace_id] = spans
+            while len(self._traces) > self.retain:
+                self._traces.popitem(last=False)
+            for exporter in self.exporters:
+                try:
+                    exporter.export(spans)
+                except Exception as exc:
+                    logger.warning("Trace exporter %s failed: %s", type(exporter).__name__, exc)
+
+    # ── Inspection ─────────────────────────────────────────────────────────────
+    def recent(self, limit: int = 50) -> List[dict]:
+        out = []
+        for trace_id in reversed(self._traces):
+            spans = self._traces[trace_id]
+            root = spans[-1]
+            out.append({
+                "trace_id": trace_id,
+                "name": root.name,
+                "start_ns": root.start_ns,
+                "duration_ms": round(root.duration_ms, 3),
+                "spans": len(spans),
+                "session_id": root.attrs.get("session_id"),
+                "error": root.error,
+            })
+            if len(out) >= limit:
+                break
+        return out
+
+    def trace(self, trace_id: str) -> Optional[List[dict]]:
+        spans = self._traces.get(trace_id)
+        if spans is None:
+            return None
+        return [s.to_dict() for s in sorted(spans, key=lambda s: s.start_ns)]
+
+    def metrics(self) -> dict:
+        def summary(key: str) -> dict:
+            lat = sorted(self._durations[key])
+            n = len(lat)
+            return {
+                "count": self._counts[key],
+                "errors": self._errors.get(key, 0),
+                "avg_ms": round(sum(lat) / n, 3),
+                "p50_ms": round(lat[n // 2], 3),
+                "p95_ms": round(lat[min(n - 1, int(0.95 * n))], 3),
+                "max_ms": round(lat[-1], 3),
+            }
+
+        keys = sorted(self._durations)
+        return {
+            "enabled": self.enabled,
+            "traces_retained": len(self._traces),
+            "by_kind": {k: summary(k) for k in keys if ":" not in k},
+            "by_name": {k: summary(k) for k in keys if ":" in k},
+        }
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        from ..config import get_settings
+
+        settings = get_settings()
+        exporters: list = []
+        if settings.trace_json_log:
+            exporters.append(JsonLogExporter(settings.trace_json_path))
+        if settings.trace_otlp_endpoint:
+            exporters.append(OtlpHttpExporter(settings.trace_otlp_endpoint))
+        _tracer = Tracer(
+            enabled=settings.agent_tracing,
+            exporters=exporters,
+            retain=settings.trace_retained,
+        )
+    return _tracer
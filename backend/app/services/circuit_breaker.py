@@ -0,0 +1,83 @@
+"""
+Circuit breaker for the remote database.
+
+CLOSED     → calls go through; consecutive failures are counted.
+OPEN       → calls are refused immediately for ``reset_timeout_s``.
+HALF_OPEN  → one probe call is let through; success closes the breaker,
+             failure re-opens it for another ``reset_timeout_s``.
+"""
+import threading
+import time
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, reset_timeout_s: float = 15.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_s = reset_timeout_s
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout_s:
+                    return False
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            # HALF_OPEN: exactly one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._last_error = error
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN:
+                self._trip()
+                return
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_in = 0.0
+            if self._state == OPEN:
+                retry_in = max(
+                    0.0, self.reset_timeout_s - (time.monotonic() - self._opened_at)
+                )
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_in_s": round(retry_in, 2),
+                "last_error": self._last_error,
+            }
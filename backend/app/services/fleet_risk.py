@@ -0,0 +1,162 @@
+"""
+Fleet-wide risk snapshot.
+
+As an ingest stage this only remembers each session's latest reading and
+marks it dirty. ``snapshot()`` then scores just the dirty sessions with one
+``predict_batch`` call, merges them into the cached per-truck results, drops
+sessions that have gone quiet and returns the fleet ranked critical-first.
+A steady fleet therefore costs one batched inference per refresh over only
+the trucks that actually reported since the last one.
+
+The ingest stage only sees readings this process stored, so the first
+snapshot also loads each session's latest reading within the active window
+from the database — after a restart, or on a worker that did not take the
+ingest, the fleet is not empty. Until that load succeeds it is retried on
+every snapshot.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+RISK_ORDER = {"critical": 0, "warning": 1, "safe": 2}
+
+
+class FleetRiskCache:
+    def __init__(self, ml_service, active_window_s: float = 900.0, distance_km: float = 250.0):
+        self.ml = ml_service
+        self.active_window_s = active_window_s
+        self.distance_km = distance_km
+        self._latest: Dict[str, dict] = {}
+        self._seen_at: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._scored: Dict[str, dict] = {}
+        self._lock = asyncio.Lock()
+        self._loaded = False
+
+    # ── Ingest stage ───────────────────────────────────────────────────────────
+    async def __call__(self, record: dict, result: dict, svc) -> None:
+        session_id = record.get("session_id")
+        if not session_id or record.get("temperature") is None:
+            return
+        self._latest[session_id] = record
+        self._seen_at[session_id] = time.monotonic()
+        self._dirty.add(session_id)
+
+    # ── Snapshot ───────────────────────────────────────────────────────────────
+    async def snapshot(self, svc=None) -> dict:
+        async with self._lock:
+            if not self._loaded and svc is not None:
+                await self._load(svc)
+            self._expire()
+            refreshed = await self._refresh()
+            trucks = sorted(
+                self._scored.values(),
+                key=lambda t: (RISK_ORDER.get(t["risk_level"], 3), t["predicted_shelf_life_days"]),
+            )
+        counts = {level: 0 for level in RISK_ORDER}
+        for t in trucks:
+            counts[t["risk_level"]] = counts.get(t["risk_level"], 0) + 1
+        return {
+            "trucks": trucks,
+            "count": len(trucks),
+            **counts,
+            "refreshed": refreshed,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    async def _load(self, svc) -> None:
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(seconds=self.active_window_s)
+        try:
+            rows = await svc.get_latest_reading_per_session(since.isoformat(), strict=True)
+        except Exception as exc:
+            logger.error("Fleet risk load failed: %s", exc)
+            return
+        self._loaded = True
+        mono = time.monotonic()
+        for r in rows:
+            sid = r.get("session_id")
+            # A reading ingested here meanwhile is at least as new
+            if not sid or r.get("temperature") is None or sid in self._latest:
+                continue
+            try:
+                reading_at = datetime.fromisoformat(str(r["created_at"]).replace("Z", "+00:00"))
+                age = max(0.0, (now - reading_at).total_seconds())
+            except (KeyError, TypeError, ValueError):
+                age = 0.0
+            self._latest[sid] = r
+            self._seen_at[sid] = mono - age  # expires when it would have here
+            self._dirty.add(sid)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.active_window_s
+        for sid in [s for s, seen in self._seen_at.items() if seen < cutoff]:
+            self._seen_at.pop(sid, None)
+            self._latest.pop(sid, None)
+            self._scored.pop(sid, None)
+            self._dirty.discard(sid)
+
+    async def _refresh(self) -> int:
+        if not self._dirty:
+            return 0
+        sessions = list(self._dirty)
+        self._dirty.clear()
+        readings = [self._latest[sid] for sid in sessions]
+        inputs = [
+            {
+                "temp_c": r["temperature"],
+                "humidity_pct": 85.0 if r.get("humidity") is None else r["humidity"],
+                "vibration_g": 0.3 if r.get("vibration") is None else r["vibration"],
+                "distance_km": self.distance_km,
+            }
+            for r in readings
+        ]
+        try:
+            results = await asyncio.to_thread(self.ml.predict_batch, inputs)
+        except Exception as exc:
+            logger.error("Fleet risk refresh failed: %s", exc)
+            self._dirty.update(sessions)
+            return 0
+
+        from .shelf_life_tracker import get_shelf_life_tracker
+
+        shelf = get_shelf_life_tracker()
+        for sid, reading, res in zip(sessions, readings, results):
+            used = shelf.estimate(sid)
+            self._scored[sid] = {
+                "session_id": sid,
+                "risk_level": res["risk_level"],
+                "predicted_shelf_life_days": res["predicted_shelf_life_days"],
+                "recommended_center": res["recommended_center"],
+                "market_pivot_trigger": res["market_pivot_trigger"],
+                "stress_index": res["stress_index"],
+                "shelf_life_used_pct": used["used_pct"] if used else None,
+                "temperature": reading["temperature"],
+                "humidity": reading.get("humidity"),
+                "vibration": reading.get("vibration"),
+                "reading_at": reading.get("created_at"),
+            }
+        return len(sessions)
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_cache: Optional[FleetRiskCache] = None
+
+
+def get_fleet_risk_cache() -> FleetRiskCache:
+    global _cache
+    if _cache is None:
+        from ..config import get_settings
+        from .ml_service import get_ml_service
+
+        settings = get_settings()
+        _cache = FleetRiskCache(
+            get_ml_service(settings.models_dir),
+            active_window_s=settings.fleet_active_window_s,
+            distance_km=settings.risk_default_distance_km,
+        )
+    return _cache
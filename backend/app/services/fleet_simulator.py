@@ -0,0 +1,274 @@
+"""
+Fleet simulator / ingest load generator.
+
+Drives N virtual trucks against the HTTP API at a fixed per-truck rate:
+
+  * every tick POSTs a reading to /api/telemetry/log,
+  * every ``predict_every`` ticks POSTs the truck's conditions to /api/predict,
+  * every ``analyze_every`` ticks (0 = never) asks /api/agent/analyze.
+
+Trucks hold a reefer setpoint with sensor noise, occasionally suffer a
+cooling failure that drifts the cargo towards ambient until it is fixed,
+open their doors (short temperature spike) and move between the
+ROAD_MAPPING road conditions, which set the vibration level.
+
+Meanwhile a listener follows the "prediction" events published by the
+ingest pipeline and measures reading → published prediction latency. The
+report covers ingest throughput and latency, end-to-end latency, and
+backlog: how far trucks fell behind their send schedule plus the event
+listener's queue depth and drops.
+
+``run_local`` wires everything in-process — httpx ASGITransport, SQLite
+``:memory:`` storage and the mock chat-completions app (``mock_llm``) behind
+the real OpenAI client — so no network, database or API key is needed.
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from .latency_stats import percentiles
+from .ml_service import ROAD_MAPPING
+
+logger = logging.getLogger(__name__)
+
+# Typical vibration (G) for each road condition
+ROAD_VIBRATION = {"Clear": 0.15, "Traffic": 0.3, "Construction": 0.8, "Blocked": 0.05}
+AMBIENT_C = 32.0
+
+
+# ── Virtual truck ──────────────────────────────────────────────────────────────
+class VirtualTruck:
+    def __init__(self, session_id: str, rng: random.Random):
+        self.session_id = session_id
+        self.rng = rng
+        self.setpoint = rng.uniform(2.0, 5.0)
+        self.temp = self.setpoint
+        self.humidity = rng.uniform(82.0, 92.0)
+        self.road = "Clear"
+        self.failed = False
+        self.door_ticks = 0
+        self.battery = 100.0
+
+    def step(self) -> dict:
+        rng = self.rng
+        # Road conditions: mostly sticky, occasionally change
+        if rng.random() < 0.05:
+            self.road = rng.choice(list(ROAD_MAPPING))
+        # Cooling failure starts rarely and is fixed eventually
+        if not self.failed and rng.random() < 0.005:
+            self.failed = True
+        elif self.failed and rng.random() < 0.02:
+            self.failed = False
+        if self.door_ticks == 0 and rng.random() < 0.01:
+            self.door_ticks = rng.randint(2, 6)
+
+        target = AMBIENT_C if self.failed else self.setpoint
+        pull = 0.03 if self.failed else 0.15
+        self.temp += (target - self.temp) * pull + rng.gauss(0.0, 0.05)
+        if self.door_ticks:
+            self.temp += 0.4
+            self.door_ticks -= 1
+        self.humidity = min(100.0, max(40.0, self.humidity + rng.gauss(0.0, 0.3)))
+        self.battery = max(5.0, self.battery - 0.01)
+        vibration = max(0.0, ROAD_VIBRATION[self.road] + rng.gauss(0.0, 0.05))
+
+        return {
+            "temperature": round(min(60.0, max(-10.0, self.temp)), 2),
+            "humidity": round(self.humidity, 1),
+            "vibration": round(min(5.0, vibration), 3),
+            "ethylene": round(max(0.0, 12.0 + rng.gauss(0.0, 1.0)), 1),
+            "co2": round(450.0 + rng.gauss(0.0, 15.0), 0),
+            "door_status": "open" if self.door_ticks else "closed",
+            "battery_level": int(self.battery),
+            "signal_strength": rng.randint(60, 100),
+            "session_id": self.session_id,
+        }
+
+    def prediction_input(self, reading: dict) -> dict:
+        return {
+            "temp_c": reading["temperature"],
+            "humidity_pct": reading["humidity"],
+            "vibration_g": reading["vibration"],
+            "distance_km": 250.0,
+            "road_a": self.road,
+            "road_b": "Traffic",
+        }
+
+
+class FleetSimulator:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        trucks: int = 20,
+        rate_hz: float = 1.0,
+        duration_s: float = 30.0,
+        predict_every: int = 10,
+        analyze_every: int = 0,
+        seed: int = 7,
+    ):
+        self.client = client
+        self.rate_hz = rate_hz
+        self.duration_s = duration_s
+        self.predict_every = predict_every
+        self.analyze_every = analyze_every
+        rng = random.Random(seed)
+        self.trucks = [
+            VirtualTruck(f"SIM-{i:04d}", random.Random(rng.random())) for i in range(trucks)
+        ]
+        self.ingest_latency: List[float] = []
+        self.predict_latency: List[float] = []
+        self.analyze_latency: List[float] = []
+        self.e2e_latency: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.max_lag_ticks = 0
+        self.listener_max_depth = 0
+        self.listener_dropped = 0
+        # session → perf_counter() when its in-flight reading was sent
+        self._sent_at: Dict[str, float] = {}
+
+    async def _call(self, name: str, path: str, body: dict, sink: List[float]) -> Optional[dict]:
+        t0 = time.perf_counter()
+        try:
+            resp = await self.client.post(path, json=body)
+            sink.append(time.perf_counter() - t0)
+            if resp.status_code >= 400:
+                self.errors[name] = self.errors.get(name, 0) + 1
+                return None
+            return resp.json()
+        except Exception as exc:
+            logger.debug("%s request failed: %s", name, exc)
+            self.errors[name] = self.errors.get(name, 0) + 1
+            return None
+
+    async def _drive(self, truck: VirtualTruck, start: float) -> None:
+        interval = 1.0 / self.rate_hz
+        tick = 0
+        while True:
+            due = start + tick * interval
+            now = time.perf_counter()
+            if now - start >= self.duration_s:
+                return
+            if due > now:
+                await asyncio.sleep(due - now)
+            else:
+                self.max_lag_ticks = max(self.max_lag_ticks, int((now - due) / interval))
+            reading = truck.step()
+            self._sent_at[truck.session_id] = time.perf_counter()
+            await self._call("ingest", "/api/telemetry/log", reading, self.ingest_latency)
+            tick += 1
+            if self.predict_every and tick % self.predict_every == 0:
+                await self._call(
+                    "predict", "/api/predict/", truck.prediction_input(reading), self.predict_latency
+                )
+            if self.analyze_every and tick % self.analyze_every == 0:
+                await self._call(
+                    "analyze", "/api/agent/analyze",
+                    {"telemetry": reading, "session_id": truck.session_id},
+                    self.analyze_latency,
+                )
+
+    def _observe_prediction(self, session_id: Optional[str]) -> None:
+        sent = self._sent_at.get(session_id)
+        if sent is not None:
+            self.e2e_latency.append(time.perf_counter() - sent)
+
+    async def _listen_local(self) -> None:
+        """Follow prediction events straight off the in-process broker."""
+        from .telemetry_broker import get_telemetry_broker
+
+        broker = get_telemetry_broker()
+        sub = broker.subscribe(session_ids=[t.session_id for t in self.trucks])
+        try:
+            while True:
+                _id, event, session_id, _data = await sub.queue.get()
+                self.listener_max_depth = max(self.listener_max_depth, sub.queue.qsize())
+                if event == "prediction":
+                    self._observe_prediction(session_id)
+        finally:
+            self.listener_dropped = sub.dropped
+            broker.unsubscribe(sub)
+
+    async def _listen_sse(self) -> None:
+        """Follow prediction events over GET /api/telemetry/stream."""
+        ids = ",".join(t.session_id for t in self.trucks)
+        event = None
+        async with self.client.stream(
+            "GET", "/api/telemetry/stream", params={"session_id": ids}, timeout=None
+        ) as resp:
+            async for line in resp.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:") and event == "prediction":
+                    self._observe_prediction(json.loads(line[5:]).get("session_id"))
+
+    async def run(self, listen: str = "local") -> dict:
+        listener = asyncio.create_task(
+            self._listen_local() if listen == "local" else self._listen_sse()
+        )
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        await asyncio.gather(*(self._drive(t, start) for t in self.trucks))
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.2)  # let trailing events arrive
+        listener.cancel()
+        try:
+            await listener
+        except (asyncio.CancelledError, httpx.HTTPError):
+            pass
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> dict:
+        sent = len(self.ingest_latency)
+        return {
+            "trucks": len(self.trucks),
+            "target_rate_per_s": round(len(self.trucks) * self.rate_hz, 2),
+            "elapsed_s": round(elapsed, 2),
+            "readings_sent": sent,
+            "ingest_throughput_per_s": round(sent / elapsed, 2) if elapsed else 0.0,
+            "ingest_latency": percentiles(self.ingest_latency),
+            "predict_latency": percentiles(self.predict_latency),
+            "analyze_latency": percentiles(self.analyze_latency),
+            "reading_to_prediction": percentiles(self.e2e_latency),
+            "backlog": {
+                "max_schedule_lag_ticks": self.max_lag_ticks,
+                "listener_max_queue_depth": self.listener_max_depth,
+                "listener_dropped_events": self.listener_dropped,
+            },
+            "errors": self.errors,
+        }
+
+
+async def run_local(llm_latency_s: float = 0.0, **kwargs) -> dict:
+    """
+    Run the simulator against the app in-process. The caller must have set
+    STORAGE_BACKEND=sqlite / SQLITE_PATH=:memory: before ``app`` is imported.
+    """
+    from ..main import app
+    from ..routers.agent import _get_agent
+    from .mock_llm import SCRIPTS, create_mock_llm_app, in_process_client
+    from .transcript_writer import stop_transcript_writer
+
+    mock = create_mock_llm_app(SCRIPTS["analyze"], latency_s=llm_latency_s)
+    llm = in_process_client(mock)
+
+    def _agent():
+        agent = _get_agent()
+        agent.client = llm
+        return agent
+
+    app.dependency_overrides[_get_agent] = _agent
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://sim") as client:
+            report = await FleetSimulator(client, **kwargs).run(listen="local")
+    finally:
+        app.dependency_overrides.pop(_get_agent, None)
+        await stop_transcript_writer()
+        await llm.close()
+    report["llm_calls"] = mock.state.llm.calls
+    return report
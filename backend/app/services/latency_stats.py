@@ -0,0 +1,17 @@
+"""
+Latency summaries shared by the load harnesses (fleet simulator, agent
+benchmark): samples in seconds in, nearest-rank percentiles in ms out.
+"""
+from typing import List
+
+
+def percentiles(samples: List[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    s = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(s[min(len(s) - 1, int(p * len(s)))] * 1000.0, 2)
+
+    return {"count": len(s), "p50_ms": pct(0.50), "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99), "max_ms": round(s[-1] * 1000.0, 2)}
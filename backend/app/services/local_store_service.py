@@ -0,0 +1,817 @@
+"""
+Local store — embedded SQLite backend with the same interface as SupabaseService.
+Used by edge depots with poor connectivity, and by tests and benchmarks
+(pass ":memory:" as the path). Tables mirror supabase_schema.sql.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ── Schema (SQLite dialect of supabase_schema.sql) ─────────────────────────────
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS telemetry_sessions (
+    id              TEXT PRIMARY KEY,
+    session_id      TEXT,
+    temperature     REAL,
+    humidity        REAL,
+    vibration       REAL,
+    ethylene        REAL,
+    co2             REAL,
+    door_status     TEXT DEFAULT 'closed',
+    battery_level   INTEGER,
+    signal_strength INTEGER,
+    created_at      TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ml_predictions (
+    id                    TEXT PRIMARY KEY,
+    input_data            TEXT,
+    predicted_shelf_life  REAL,
+    recommended_center    TEXT,
+    survival_margins      TEXT,
+    stress_index          REAL,
+    market_pivot_trigger  INTEGER DEFAULT 0,
+    created_at            TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS routes (
+    id              TEXT PRIMARY KEY,
+    route_id        TEXT UNIQUE NOT NULL,
+    name            TEXT,
+    origin          TEXT,
+    destination     TEXT,
+    eta             INTEGER,
+    survival_margin INTEGER,
+    distance        REAL,
+    status          TEXT DEFAULT 'on-track',
+    road_condition  TEXT DEFAULT 'Clear',
+    created_at      TEXT NOT NULL,
+    updated_at      TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS facilities (
+    id               TEXT PRIMARY KEY,
+    name             TEXT UNIQUE NOT NULL,
+    temperature      REAL,
+    humidity         REAL,
+    power_status     TEXT DEFAULT 'normal',
+    storage_capacity INTEGER,
+    current_load     INTEGER,
+    last_updated     TEXT NOT NULL,
+    lat              REAL,
+    lon              REAL
+);
+
+CREATE TABLE IF NOT EXISTS trip_logs (
+    id              TEXT PRIMARY KEY,
+    trip_id         TEXT UNIQUE NOT NULL,
+    date            TEXT,
+    route           TEXT,
+    cargo           TEXT,
+    duration        TEXT,
+    temp_range      TEXT,
+    status          TEXT DEFAULT 'completed',
+    shelf_life_used INTEGER,
+    created_at      TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS rescue_points (
+    id              TEXT PRIMARY KEY,
+    name            TEXT NOT NULL,
+    distance        REAL,
+    recovery_chance INTEGER,
+    type            TEXT,
+    available       INTEGER DEFAULT 1,
+    eta             INTEGER,
+    created_at      TEXT NOT NULL,
+    lat             REAL,
+    lon             REAL
+);
+
+CREATE TABLE IF NOT EXISTS ai_recommendations (
+    id          TEXT PRIMARY KEY,
+    rec_id      TEXT UNIQUE NOT NULL,
+    type        TEXT,
+    severity    TEXT,
+    message     TEXT,
+    status      TEXT DEFAULT 'pending',
+    created_at  TEXT NOT NULL,
+    resolved_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS agent_conversations (
+    id           TEXT PRIMARY KEY,
+    session_id   TEXT NOT NULL,
+    role         TEXT NOT NULL,
+    content      TEXT,
+    created_at   TEXT NOT NULL,
+    turn_id      TEXT,
+    seq          INTEGER,
+    tool_name    TEXT,
+    tool_call_id TEXT,
+    tool_args    TEXT,
+    duration_ms  REAL
+);
+
+CREATE TABLE IF NOT EXISTS telemetry_rollups (
+    session_id       TEXT NOT NULL,
+    resolution_s     INTEGER NOT NULL,
+    bucket_start     TEXT NOT NULL,
+    sample_count     INTEGER NOT NULL DEFAULT 0,
+    temperature_min  REAL, temperature_max REAL, temperature_sum REAL DEFAULT 0,
+    humidity_min     REAL, humidity_max    REAL, humidity_sum    REAL DEFAULT 0,
+    vibration_min    REAL, vibration_max   REAL, vibration_sum   REAL DEFAULT 0,
+    ethylene_min     REAL, ethylene_max    REAL, ethylene_sum    REAL DEFAULT 0,
+    co2_min          REAL, co2_max         REAL, co2_sum         REAL DEFAULT 0,
+    updated_at       TEXT,
+    PRIMARY KEY (session_id, resolution_s, bucket_start)
+);
+
+-- Rollup batches already merged (makes retried flushes idempotent)
+CREATE TABLE IF NOT EXISTS telemetry_rollup_batches (
+    batch_id    TEXT PRIMARY KEY,
+    applied_at  TEXT NOT NULL
+);
+
+-- Upstream sync watermarks: rowid of the last row pushed per table and,
+-- for tables with updatable rows, (change timestamp, id) of the last update
+CREATE TABLE IF NOT EXISTS _sync_state (
+    table_name      TEXT PRIMARY KEY,
+    last_rowid      INTEGER NOT NULL DEFAULT 0,
+    last_changed    TEXT,
+    last_changed_id TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_telemetry_session   ON telemetry_sessions (session_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_telemetry_created   ON telemetry_sessions (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_ai_recs_status      ON ai_recommendations (status);
+CREATE INDEX IF NOT EXISTS idx_ai_recs_created     ON ai_recommendations (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_sid   ON agent_conversations (session_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_trips_status        ON trip_logs (status, date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_trips_date          ON trip_logs (date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_rollups_range       ON telemetry_rollups (resolution_s, bucket_start);
+CREATE INDEX IF NOT EXISTS idx_rescue_recovery     ON rescue_points (available, recovery_chance DESC);
+"""
+
+# Raw readings before the cutoff, only in (session, hour) buckets whose hourly
+# rollup already counts at least as many readings
+_HOUR = "strftime('%Y-%m-%dT%H:00:00+00:00', created_at)"
+_DELETE_ROLLED_UP_SQL = f"""
+WITH old AS (
+    SELECT COALESCE(session_id, '') AS sid, {_HOUR} AS hb, COUNT(*) AS n
+    FROM telemetry_sessions WHERE created_at < ? GROUP BY sid, hb
+),
+covered AS (
+    SELECT o.sid, o.hb FROM old o
+    JOIN telemetry_rollups r
+      ON r.resolution_s = 3600 AND r.session_id = o.sid AND r.bucket_start = o.hb
+    WHERE r.sample_count >= o.n
+)
+DELETE FROM telemetry_sessions
+WHERE created_at < ? AND (COALESCE(session_id, ''), {_HOUR}) IN (SELECT sid, hb FROM covered)
+"""
+
+# Columns added after a table first shipped — applied to existing files on open
+_ADDED_COLUMNS: Sequence[Tuple[str, str, str]] = (
+    ("agent_conversations", "turn_id", "TEXT"),
+    ("agent_conversations", "seq", "INTEGER"),
+    ("agent_conversations", "tool_name", "TEXT"),
+    ("agent_conversations", "tool_call_id", "TEXT"),
+    ("agent_conversations", "tool_args", "TEXT"),
+    ("agent_conversations", "duration_ms", "REAL"),
+    ("facilities", "lat", "REAL"),
+    ("facilities", "lon", "REAL"),
+    ("rescue_points", "lat", "REAL"),
+    ("rescue_points", "lon", "REAL"),
+    ("_sync_state", "last_changed", "TEXT"),
+    ("_sync_state", "last_changed_id", "TEXT"),
+)
+
+# Columns SQLite cannot store natively — decoded back on read
+_JSON_COLUMNS: Dict[str, Sequence[str]] = {
+    "ml_predictions": ("input_data", "survival_margins"),
+    "agent_conversations": ("tool_args",),
+}
+_BOOL_COLUMNS: Dict[str, Sequence[str]] = {
+    "ml_predictions": ("market_pivot_trigger",),
+    "rescue_points": ("available",),
+}
+# Timestamp columns filled on insert (Postgres uses DEFAULT NOW())
+_TIMESTAMP_COLUMNS: Dict[str, Sequence[str]] = {
+    "routes": ("created_at", "updated_at"),
+    "facilities": ("last_updated",),
+}
+
+# Tables pushed upstream by sync_upstream(), upserted on id
+_SYNC_TABLES = (
+    "telemetry_sessions",
+    "ml_predictions",
+    "trip_logs",
+    "ai_recommendations",
+    "agent_conversations",
+)
+# Synced tables whose rows are updated in place → column stamped on update
+_SYNC_CHANGED_COLUMNS: Dict[str, str] = {
+    "ai_recommendations": "resolved_at",
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+_SQL_OPS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _keyset_sql(
+    table: str,
+    keys: Sequence[str],
+    before: Optional[Tuple],
+    limit: int,
+    where: Optional[Dict[str, Any]] = None,
+):
+    """Descending keyset page: ``(k1, k2) < before`` served by the (k1 DESC, k2 DESC) index."""
+    k1, k2 = keys
+    clauses, params = [], []
+    for col, value in (where or {}).items():
+        if value is not None:
+            clauses.append(f"{col} = ?")
+            params.append(value)
+    if before is not None:
+        clauses.append(f"({k1}, {k2}) < (?, ?)")
+        params.extend(before)
+    params.append(limit)
+    where_sql = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    return f"SELECT * FROM {table} {where_sql}ORDER BY {k1} DESC, {k2} DESC LIMIT ?", params
+
+
+class LocalStoreService:
+    """Drop-in replacement for SupabaseService backed by an embedded SQLite file."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            for table, col, col_type in _ADDED_COLUMNS:
+                existing = {r["name"] for r in self._conn.execute(f"PRAGMA table_info({table})")}
+                if col not in existing:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}")
+        self._columns: Dict[str, set] = {}
+
+    # ── Low-level helpers ──────────────────────────────────────────────────────
+    def _table_columns(self, table: str) -> set:
+        cols = self._columns.get(table)
+        if cols is None:
+            with self._lock:
+                rows = self._conn.execute(f"PRAGMA table_info({table})").fetchall()
+            if not rows:
+                raise ValueError(f"Unknown table: {table}")
+            cols = {r["name"] for r in rows}
+            self._columns[table] = cols
+        return cols
+
+    def _encode(self, table: str, row: dict) -> dict:
+        cols = self._table_columns(table)
+        unknown = set(row) - cols
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {table}: {sorted(unknown)}")
+        out = dict(row)
+        for col in _JSON_COLUMNS.get(table, ()):
+            if col in out and out[col] is not None:
+                out[col] = json.dumps(out[col])
+        for col in _BOOL_COLUMNS.get(table, ()):
+            if col in out and out[col] is not None:
+                out[col] = int(bool(out[col]))
+        return out
+
+    def _decode(self, table: str, row: sqlite3.Row) -> dict:
+        out = dict(row)
+        for col in _JSON_COLUMNS.get(table, ()):
+            if out.get(col) is not None:
+                out[col] = json.loads(out[col])
+        for col in _BOOL_COLUMNS.get(table, ()):
+            if out.get(col) is not None:
+                out[col] = bool(out[col])
+        return out
+
+    def _fetch(self, table: str, sql: str, params: Sequence = ()) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._decode(table, r) for r in rows]
+
+    def _prepare_insert(self, table: str, row: dict) -> dict:
+        row = self._encode(table, row)
+        row.setdefault("id", str(uuid.uuid4()))
+        now = _now()
+        cols = self._table_columns(table)
+        if "created_at" in cols:
+            row.setdefault("created_at", now)
+        for col in _TIMESTAMP_COLUMNS.get(table, ()):
+            row.setdefault(col, now)
+        return row
+
+    def _write_rows(
+        self, table: str, rows: List[dict], conflict_col: Optional[str] = None
+    ) -> List[dict]:
+        """Insert (or upsert on ``conflict_col``) rows in one transaction."""
+        if not rows:
+            return []
+        prepared = [self._prepare_insert(table, r) for r in rows]
+        ids = []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in prepared:
+                    cols = list(row)
+                    sql = (
+                        f"INSERT INTO {table} ({', '.join(cols)}) "
+                        f"VALUES ({', '.join('?' for _ in cols)})"
+                    )
+                    if conflict_col:
+                        updates = [c for c in cols if c not in ("id", conflict_col, "created_at")]
+                        sql += f" ON CONFLICT({conflict_col}) DO " + (
+                            "UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in updates)
+                            if updates else "NOTHING"
+                        )
+                    self._conn.execute(sql, [row[c] for c in cols])
+                    key_col = conflict_col or "id"
+                    ids.append((key_col, row[key_col]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        out = []
+        for key_col, key in ids:
+            out.extend(self._fetch(table, f"SELECT * FROM {table} WHERE {key_col} = ?", (key,)))
+        return out
+
+    def _update(self, table: str, updates: dict, key_col: str, key) -> List[dict]:
+        updates = self._encode(table, updates)
+        if not updates:
+            return []
+        assignments = ", ".join(f"{c} = ?" for c in updates)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE {table} SET {assignments} WHERE {key_col} = ?",
+                [*updates.values(), key],
+            )
+        return self._fetch(table, f"SELECT * FROM {table} WHERE {key_col} = ?", (key,))
+
+    def _select_sql(
+        self,
+        table: str,
+        filters: Optional[Sequence[Tuple[str, str, Any]]],
+        columns: str,
+        order_by: Optional[str],
+        desc: bool,
+        limit: Optional[int],
+    ):
+        known = self._table_columns(table)
+        wanted = [c.strip() for c in columns.split(",")] if columns != "*" else []
+        for col in wanted + ([order_by] if order_by else []):
+            if col not in known:
+                raise ValueError(f"Unknown column for {table}: {col}")
+        clauses, params = [], []
+        for col, op, value in filters or ():
+            if col not in known:
+                raise ValueError(f"Unknown column for {table}: {col}")
+            if op == "in":
+                values = list(value)
+                clauses.append(f"{col} IN ({', '.join('?' for _ in values)})")
+                params.extend(self._encode(table, {col: v})[col] for v in values)
+            elif op in _SQL_OPS:
+                clauses.append(f"{col} {_SQL_OPS[op]} ?")
+                params.append(self._encode(table, {col: value})[col])
+            else:
+                raise ValueError(f"Unsupported filter op: {op}")
+        sql = f"SELECT {', '.join(wanted) if wanted else '*'} FROM {table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if order_by:
+            sql += f" ORDER BY {order_by} {'DESC' if desc else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return sql, params
+
+    # ── Generic reads ──────────────────────────────────────────────────────────
+    async def select(
+        self,
+        table: str,
+        filters: Optional[Sequence[Tuple[str, str, Any]]] = None,
+        columns: str = "*",
+        order_by: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        try:
+            sql, params = self._select_sql(table, filters, columns, order_by, desc, limit)
+            return self._fetch(table, sql, params)
+        except Exception as exc:
+            logger.error("select(%s) error: %s", table, exc)
+            return []
+
+    async def select_one(
+        self,
+        table: str,
+        filters: Optional[Sequence[Tuple[str, str, Any]]] = None,
+        columns: str = "*",
+    ) -> Optional[dict]:
+        rows = await self.select(table, filters, columns=columns, limit=1)
+        return rows[0] if rows else None
+
+    def seed_rows(self, table: str, rows: List[dict], conflict_col: Optional[str] = None) -> int:
+        """Synchronous bulk load used by init_db.py."""
+        return len(self._write_rows(table, rows, conflict_col))
+
+    async def bulk_insert(
+        self, table: str, rows: List[dict], conflict_col: Optional[str] = None
+    ) -> List[dict]:
+        try:
+            return self._write_rows(table, rows, conflict_col)
+        except Exception as exc:
+            logger.error("bulk_insert(%s) error: %s", table, exc)
+            return []
+
+    # ── Telemetry ──────────────────────────────────────────────────────────────
+    async def log_telemetry(self, data: dict) -> dict:
+        try:
+            rows = self._write_rows("telemetry_sessions", [data])
+            return rows[0] if rows else {}
+        except Exception as exc:
+            logger.error("log_telemetry error: %s", exc)
+            return {}
+
+    async def get_latest_telemetry(
+        self,
+        limit: int = 20,
+        before: Optional[Tuple] = None,
+        session_id: Optional[str] = None,
+        strict: bool = False,
+    ) -> List[dict]:
+        try:
+            sql, params = _keyset_sql(
+                "telemetry_sessions",
+                ("created_at", "id"),
+                before,
+                limit,
+                where={"session_id": session_id},
+            )
+            return self._fetch("telemetry_sessions", sql, params)
+        except Exception as exc:
+            logger.error("get_latest_telemetry error: %s", exc)
+            if strict:
+                raise
+            return []
+
+    async def get_latest_reading_per_session(self, since: str, strict: bool = False) -> List[dict]:
+        """Each session's newest reading at or after ``since`` (ISO timestamp)."""
+        try:
+            return self._fetch(
+                "telemetry_sessions",
+                """
+                SELECT * FROM telemetry_sessions WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (
+                            PARTITION BY session_id ORDER BY created_at DESC, id DESC
+                        ) AS rn
+                        FROM telemetry_sessions
+                        WHERE created_at >= ? AND session_id IS NOT NULL
+                    ) WHERE rn = 1
+                )
+                """,
+                (since,),
+            )
+        except Exception as exc:
+            logger.error("get_latest_reading_per_session error: %s", exc)
+            if strict:
+                raise
+            return []
+
+    async def merge_telemetry_rollups(self, rows: List[dict], batch_id: str) -> bool:
+        """Additively merge rollup deltas once per ``batch_id`` (see telemetry_rollup.py)."""
+        if not rows:
+            return True
+        cols = list(rows[0])
+        metric_cols = [c for c in cols if c.endswith(("_min", "_max", "_sum"))]
+        sets = ["sample_count = sample_count + excluded.sample_count"]
+        for c in metric_cols:
+            if c.endswith("_sum"):
+                sets.append(f"{c} = COALESCE({c}, 0) + COALESCE(excluded.{c}, 0)")
+            else:
+                fn = "MIN" if c.endswith("_min") else "MAX"
+                sets.append(
+                    f"{c} = COALESCE({fn}({c}, excluded.{c}), {c}, excluded.{c})"
+                )
+        sets.append("updated_at = excluded.updated_at")
+        all_cols = cols + ["updated_at"]
+        sql = (
+            f"INSERT INTO telemetry_rollups ({', '.join(all_cols)}) "
+            f"VALUES ({', '.join('?' for _ in all_cols)}) "
+            "ON CONFLICT(session_id, resolution_s, bucket_start) DO UPDATE SET "
+            + ", ".join(sets)
+        )
+        now = _now()
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    applied = self._conn.execute(
+                        "INSERT OR IGNORE INTO telemetry_rollup_batches (batch_id, applied_at) "
+                        "VALUES (?, ?)",
+                        (batch_id, now),
+                    ).rowcount
+                    if applied:
+                        self._conn.executemany(
+                            sql, [[r[c] for c in cols] + [now] for r in rows]
+                        )
+                    self._conn.execute(
+                        "DELETE FROM telemetry_rollup_batches WHERE applied_at < ?",
+                        ((datetime.now(timezone.utc) - timedelta(days=7)).isoformat(),),
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            return True
+        except Exception as exc:
+            logger.error("merge_telemetry_rollups error: %s", exc)
+            return False
+
+    async def delete_rolled_up_telemetry_before(self, cutoff: str) -> int:
+        """Delete raw rows older than ``cutoff`` in hours the hourly rollup fully covers."""
+        try:
+            with self._lock:
+                self._conn.execute(_DELETE_ROLLED_UP_SQL, (cutoff, cutoff))
+                # rowcount is -1 for statements that start with WITH
+                return self._conn.execute("SELECT changes()").fetchone()[0]
+        except Exception as exc:
+            logger.error("delete_rolled_up_telemetry_before error: %s", exc)
+            return 0
+
+    # ── ML Predictions ─────────────────────────────────────────────────────────
+    async def log_prediction(self, input_data: dict, result: dict) -> dict:
+        try:
+            record = {
+                "input_data": input_data,
+                "predicted_shelf_life": result.get("predicted_shelf_life_days"),
+                "recommended_center": result.get("recommended_center"),
+                "survival_margins": result.get("survival_margins"),
+                "stress_index": result.get("stress_index"),
+                "market_pivot_trigger": result.get("market_pivot_trigger"),
+            }
+            rows = self._write_rows("ml_predictions", [record])
+            return rows[0] if rows else {}
+        except Exception as exc:
+            logger.error("log_prediction error: %s", exc)
+            return {}
+
+    # ── Routes ─────────────────────────────────────────────────────────────────
+    async def get_routes(self) -> List[dict]:
+        try:
+            return self._fetch("routes", "SELECT * FROM routes ORDER BY route_id")
+        except Exception as exc:
+            logger.error("get_routes error: %s", exc)
+            return []
+
+    async def get_route(self, route_id: str) -> Optional[dict]:
+        return await self.select_one("routes", [("route_id", "eq", route_id)])
+
+    async def upsert_route(self, route: dict) -> dict:
+        try:
+            route = {**route, "updated_at": _now()}
+            rows = self._write_rows("routes", [route], conflict_col="route_id")
+            return rows[0] if rows else {}
+        except Exception as exc:
+            logger.error("upsert_route error: %s", exc)
+            return {}
+
+    # ── Facilities ─────────────────────────────────────────────────────────────
+    async def get_facilities(self) -> List[dict]:
+        try:
+            return self._fetch("facilities", "SELECT * FROM facilities ORDER BY name")
+        except Exception as exc:
+            logger.error("get_facilities error: %s", exc)
+            return []
+
+    async def update_facility(self, name: str, updates: dict) -> dict:
+        try:
+            updates = {**updates, "last_updated": _now()}
+            rows = self._update("facilities", updates, "name", name)
+            return rows[0] if rows else {}
+        except Exception as exc:
+            logger.error("update_facility error: %s", exc)
+            return {}
+
+    # ── Trip Logs ──────────────────────────────────────────────────────────────
+    async def get_trip_logs(
+        self,
+        limit: int = 50,
+        before: Optional[Tuple] = None,
+        status: Optional[str] = None,
+        strict: bool = False,
+    ) -> List[dict]:
+        try:
+            sql, params = _keyset_sql(
+                "trip_logs", ("date", "id"), before, limit, where={"status": status}
+            )
+            return self._fetch("trip_logs", sql, params)
+        except Exception as exc:
+            logger.error("get_trip_logs error: %s", exc)
+            if strict:
+                raise
+            return []
+
+    async def add_trip_log(self, trip: dict) -> dict:
+        try:
+            rows = self._write_rows("trip_logs", [trip])
+            return rows[0] if rows else {}
+        except Exception as exc:
+            logger.error("add_trip_log error: %s", exc)
+            return {}
+
+    # ── Rescue Points ──────────────────────────────────────────────────────────
+    async def get_rescue_points(self, available_only: bool = False) -> List[dict]:
+        try:
+            where = "WHERE available = 1 " if available_only else ""
+            return self._fetch(
+                "rescue_points",
+                f"SELECT * FROM rescue_points {where}ORDER BY recovery_chance DESC",
+            )
+        except Exception as exc:
+            logger.error("get_rescue_points error: %s", exc)
+            return []
+
+    async def update_rescue_point(self, name: str, updates: dict) -> dict:
+        try:
+            rows = self._update("rescue_points", updates, "name", name)
+            return rows[0] if rows else {}
+        except Exception as exc:
+            logger.error("update_rescue_point error: %s", exc)
+            return {}
+
+    # ── AI Recommendations ─────────────────────────────────────────────────────
+    async def save_recommendation(self, rec: dict) -> dict:
+        try:
+            rows = self._write_rows("ai_recommendations", [rec])
+            return rows[0] if rows else {}
+        except Exception as exc:
+            logger.error("save_recommendation error: %s", exc)
+            return {}
+
+    async def get_recommendations(
+        self, limit: int = 20, before: Optional[Tuple] = None, strict: bool = False
+    ) -> List[dict]:
+        try:
+            sql, params = _keyset_sql(
+                "ai_recommendations", ("created_at", "id"), before, limit
+            )
+            return self._fetch("ai_recommendations", sql, params)
+        except Exception as exc:
+            logger.error("get_recommendations error: %s", exc)
+            if strict:
+                raise
+            return []
+
+    async def update_recommendation_status(self, rec_id: str, status: str) -> dict:
+        try:
+            rows = self._update(
+                "ai_recommendations",
+                {"status": status, "resolved_at": _now()},
+                "rec_id",
+                rec_id,
+            )
+            return rows[0] if rows else {}
+        except Exception as exc:
+            logger.error("update_recommendation_status error: %s", exc)
+            return {}
+
+    # ── Agent Conversations ────────────────────────────────────────────────────
+    async def save_conversation_turn(
+        self, session_id: str, role: str, content: str
+    ) -> dict:
+        try:
+            rows = self._write_rows(
+                "agent_conversations",
+                [{"session_id": session_id, "role": role, "content": content}],
+            )
+            return rows[0] if rows else {}
+        except Exception as exc:
+            logger.error("save_conversation_turn error: %s", exc)
+            return {}
+
+    async def save_conversation_turns(self, rows: List[dict]) -> int:
+        """Bulk upsert (on id) of transcript rows (one transaction); returns rows written."""
+        try:
+            self._write_rows("agent_conversations", rows, conflict_col="id")
+            return len(rows)
+        except Exception as exc:
+            logger.error("save_conversation_turns error: %s", exc)
+            return 0
+
+    async def get_conversation_history(
+        self, session_id: str, limit: Optional[int] = None, include_tools: bool = False
+    ) -> List[dict]:
+        try:
+            where = "session_id = ?" if include_tools else "session_id = ? AND role != 'tool'"
+            if limit is None:
+                return self._fetch(
+                    "agent_conversations",
+                    f"SELECT * FROM agent_conversations WHERE {where} ORDER BY created_at, seq",
+                    (session_id,),
+                )
+            rows = self._fetch(
+                "agent_conversations",
+                f"SELECT * FROM agent_conversations WHERE {where} "
+                "ORDER BY created_at DESC, seq DESC LIMIT ?",
+                (session_id, limit),
+            )
+            return rows[::-1]
+        except Exception as exc:
+            logger.error("get_conversation_history error: %s", exc)
+            return []
+
+    # ── Upstream sync ──────────────────────────────────────────────────────────
+    async def sync_upstream(self, upstream, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Push rows written locally since the last sync to ``upstream``
+        (a SupabaseService), plus rows of ``_SYNC_CHANGED_COLUMNS`` tables
+        updated since then. Rows are upserted on id, so resending a batch
+        that did land upstream is harmless; a batch that fails is retried on
+        the next call.
+        """
+        pushed: Dict[str, int] = {}
+        for table in _SYNC_TABLES:
+            with self._lock:
+                state = self._conn.execute(
+                    "SELECT * FROM _sync_state WHERE table_name = ?", (table,)
+                ).fetchone()
+                last_rowid = state["last_rowid"] if state else 0
+                rows = self._conn.execute(
+                    f"SELECT rowid AS _rowid, * FROM {table} WHERE rowid > ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size),
+                ).fetchall()
+            if rows and await self._push(upstream, table, rows):
+                self._save_sync_state(table, last_rowid=rows[-1]["_rowid"])
+                pushed[table] = len(rows)
+
+            col = _SYNC_CHANGED_COLUMNS.get(table)
+            if col is None:
+                continue
+            mark = (state["last_changed"] or "", state["last_changed_id"] or "") if state else ("", "")
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT rowid AS _rowid, * FROM {table} "
+                    f"WHERE {col} IS NOT NULL AND ({col}, id) > (?, ?) "
+                    f"ORDER BY {col}, id LIMIT ?",
+                    (*mark, batch_size),
+                ).fetchall()
+            if rows and await self._push(upstream, table, rows):
+                self._save_sync_state(table, last_changed=(rows[-1][col], rows[-1]["id"]))
+                pushed[f"{table}:updated"] = len(rows)
+        return pushed
+
+    async def _push(self, upstream, table: str, rows) -> bool:
+        payload = []
+        for r in rows:
+            d = self._decode(table, r)
+            d.pop("_rowid", None)
+            payload.append(d)
+        if not await upstream.bulk_insert(table, payload, conflict_col="id"):
+            logger.warning("sync_upstream: %s batch not accepted, will retry", table)
+            return False
+        return True
+
+    def _save_sync_state(self, table: str, last_rowid=None, last_changed=None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO _sync_state (table_name) VALUES (?)", (table,)
+            )
+            if last_rowid is not None:
+                self._conn.execute(
+                    "UPDATE _sync_state SET last_rowid = ? WHERE table_name = ?",
+                    (last_rowid, table),
+                )
+            if last_changed is not None:
+                self._conn.execute(
+                    "UPDATE _sync_state SET last_changed = ?, last_changed_id = ? "
+                    "WHERE table_name = ?",
+                    (*last_changed, table),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -5,7 +5,7 @@ Feature engineering exactly mirrors the training script (model (1).py).
 import pickle
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import numpy as np
 import pandas as pd
@@ -20,19 +20,31 @@ ROAD_MAPPING = {
 }
 
 AVG_SPEED_KMPH = 60  # km/h assumed trunk speed
+REFERENCE_TEMP_C = 4.0  # target cold; stress is 1.0 here
+VIBRATION_FLAG_G = 0.5  # above this a reading is flagged as rough handling
+
+
+def stress_index(temp_c, vibration_g):
+    """
+    Spoilage stress as in the training script: a Q10 model with base 2
+    (doubling every 10 °C above the reference), × 1.5 while vibration is
+    flagged. Takes scalars or numpy arrays / pandas Series alike.
+    """
+    exp_temp_risk = 2.0 ** ((temp_c - REFERENCE_TEMP_C) / 10.0)
+    return exp_temp_risk * (1 + 0.5 * (vibration_g > VIBRATION_FLAG_G))
 
 
 def _engineer_features(df: pd.DataFrame) -> pd.DataFrame:
     """Replicates feature engineering from the training script exactly."""
     df = df.copy()
     # Temperature Deviation (target cold = 4°C)
-    df["Temp_Deviation"] = df["Temp_C"] - 4.0
-    # Exponential Temperature Risk (Q10 model with base 2)
-    df["Exp_Temp_Risk"] = 2.0 ** ((df["Temp_C"] - 4.0) / 10.0)
+    df["Temp_Deviation"] = df["Temp_C"] - REFERENCE_TEMP_C
+    # Exponential Temperature Risk (Q10 model with base 2) — the stress without vibration
+    df["Exp_Temp_Risk"] = stress_index(df["Temp_C"], 0.0)
     # Vibration Flag
-    df["Vibration_Flag"] = (df["Vibration_G"] > 0.5).astype(int)
+    df["Vibration_Flag"] = (df["Vibration_G"] > VIBRATION_FLAG_G).astype(int)
     # Stress Index
-    df["Stress_Index"] = df["Exp_Temp_Risk"] * (1 + 0.5 * df["Vibration_Flag"])
+    df["Stress_Index"] = stress_index(df["Temp_C"], df["Vibration_G"])
     # Road Multipliers
     df["Road_A_Mult"] = df["Road_A"].map(ROAD_MAPPING).fillna(1.0)
     df["Road_B_Mult"] = df["Road_B"].map(ROAD_MAPPING).fillna(1.0)
@@ -50,6 +62,7 @@ class ColdChainMLService:
         self._le_center = None
         self._clf_features: list = []
         self._loaded = False
+        self._version = ""
 
     def _load(self):
         if self._loaded:
@@ -74,8 +87,15 @@ class ColdChainMLService:
             self._le_center = pkg["le_center"]
             self._clf_features = pkg["features"]
         logger.info("Routing model loaded from %s", secondary_path)
+        self._version = "%d-%d" % (primary_path.stat().st_mtime, secondary_path.stat().st_mtime)
         self._loaded = True
 
+    @property
+    def model_version(self) -> str:
+        """Identifies the loaded model files (their mtimes) for cache keys."""
+        self._load()
+        return self._version
+
     def predict(
         self,
         temp_c: float,
@@ -89,21 +109,42 @@ class ColdChainMLService:
         cap_a_pct: float = 70.0,
         cap_b_pct: float = 50.0,
     ) -> dict:
+        return self.predict_batch([{
+            "temp_c": temp_c,
+            "humidity_pct": humidity_pct,
+            "vibration_g": vibration_g,
+            "distance_km": distance_km,
+            "dist_a_km": dist_a_km,
+            "dist_b_km": dist_b_km,
+            "road_a": road_a,
+            "road_b": road_b,
+            "cap_a_pct": cap_a_pct,
+            "cap_b_pct": cap_b_pct,
+        }])[0]
+
+    def predict_batch(self, inputs: List[dict]) -> List[dict]:
+        """
+        Score many trucks in one pass: a single DataFrame, one feature
+        engineering call and one ``predict`` per model. Each input takes the
+        same keyword arguments as ``predict`` (missing ones use its defaults).
+        """
         self._load()
+        if not inputs:
+            return []
 
-        # Build a single-row DataFrame matching training schema
+        # Build an N-row DataFrame matching training schema
         df = pd.DataFrame([{
-            "Temp_C": temp_c,
-            "Humidity_Pct": humidity_pct,
-            "Vibration_G": vibration_g,
-            "Distance_KM": distance_km,
-            "Dist_A_KM": dist_a_km,
-            "Dist_B_KM": dist_b_km,
-            "Road_A": road_a,
-            "Road_B": road_b,
-            "Cap_A_Pct": cap_a_pct,
-            "Cap_B_Pct": cap_b_pct,
-        }])
+            "Temp_C": float(x["temp_c"]),
+            "Humidity_Pct": float(x["humidity_pct"]),
+            "Vibration_G": float(x["vibration_g"]),
+            "Distance_KM": float(x["distance_km"]),
+            "Dist_A_KM": float(x.get("dist_a_km", 50.0)),
+            "Dist_B_KM": float(x.get("dist_b_km", 100.0)),
+            "Road_A": x.get("road_a", "Clear"),
+            "Road_B": x.get("road_b", "Traffic"),
+            "Cap_A_Pct": float(x.get("cap_a_pct", 70.0)),
+            "Cap_B_Pct": float(x.get("cap_b_pct", 50.0)),
+        } for x in inputs])
         df = _engineer_features(df)
 
         # ── 1. Shelf-life prediction ──────────────────────────────────────────
@@ -111,54 +152,52 @@ class ColdChainMLService:
             "Temp_C", "Humidity_Pct", "Vibration_G", "Distance_KM",
             "Temp_Deviation", "Exp_Temp_Risk", "Vibration_Flag", "Stress_Index",
         ]
-        pred_days: float = float(self._spoilage_model.predict(df[reg_features])[0])
-        pred_days = max(0.0, pred_days)  # clamp to non-negative
+        pred_days = np.maximum(
+            0.0, np.asarray(self._spoilage_model.predict(df[reg_features]), dtype=float)
+        )  # clamp to non-negative
         df["Predicted_Days_Left"] = pred_days
 
         # ── 2. Survival margins ───────────────────────────────────────────────
-        travel_orig = (distance_km / AVG_SPEED_KMPH) / 24
-        travel_a = (dist_a_km / AVG_SPEED_KMPH * float(df["Road_A_Mult"].iloc[0])) / 24
-        travel_b = (dist_b_km / AVG_SPEED_KMPH * float(df["Road_B_Mult"].iloc[0])) / 24
-
-        sm_original = float(pred_days - travel_orig)
-        sm_a = float(pred_days - travel_a)
-        sm_b = float(pred_days - travel_b)
+        travel_orig = (df["Distance_KM"].to_numpy() / AVG_SPEED_KMPH) / 24
+        travel_a = (df["Dist_A_KM"].to_numpy() / AVG_SPEED_KMPH * df["Road_A_Mult"].to_numpy()) / 24
+        travel_b = (df["Dist_B_KM"].to_numpy() / AVG_SPEED_KMPH * df["Road_B_Mult"].to_numpy()) / 24
+        sm_original = pred_days - travel_orig
+        sm_a = pred_days - travel_a
+        sm_b = pred_days - travel_b
 
         # ── 3. Routing recommendation ─────────────────────────────────────────
-        road_a_enc = int(self._le_road.transform([road_a])[0])
-        road_b_enc = int(self._le_road.transform([road_b])[0])
-        df["Road_A_Encoded"] = road_a_enc
-        df["Road_B_Encoded"] = road_b_enc
-
-        clf_inputs = df[self._clf_features]
-        center_encoded = int(self._routing_model.predict(clf_inputs)[0])
-        best_center: str = str(self._le_center.inverse_transform([center_encoded])[0])
-
-        # Market pivot = not sending to original destination and not dumping
-        pivot_trigger = best_center not in ("Original", "Dump")
+        df["Road_A_Encoded"] = self._le_road.transform(df["Road_A"])
+        df["Road_B_Encoded"] = self._le_road.transform(df["Road_B"])
+        centers_encoded = self._routing_model.predict(df[self._clf_features])
+        centers = self._le_center.inverse_transform(np.asarray(centers_encoded, dtype=int))
 
         # ── 4. Risk level ─────────────────────────────────────────────────────
-        stress = float(df["Stress_Index"].iloc[0])
-        if temp_c > 15 or pred_days < 0.5:
-            risk_level = "critical"
-        elif temp_c > 8 or pred_days < 2.0:
-            risk_level = "warning"
-        else:
-            risk_level = "safe"
-
-        return {
-            "predicted_shelf_life_days": pred_days,
-            "predicted_shelf_life_hours": pred_days * 24.0,
-            "recommended_center": best_center,
-            "survival_margins": {
-                "SM_Original": sm_original,
-                "SM_A": sm_a,
-                "SM_B": sm_b,
-            },
-            "stress_index": stress,
-            "market_pivot_trigger": pivot_trigger,
-            "risk_level": risk_level,
-        }
+        temps = df["Temp_C"].to_numpy()
+        risk = np.where(
+            (temps > 15) | (pred_days < 0.5), "critical",
+            np.where((temps > 8) | (pred_days < 2.0), "warning", "safe"),
+        )
+        stress = df["Stress_Index"].to_numpy()
+
+        results = []
+        for i in range(len(df)):
+            best_center = str(centers[i])
+            days = float(pred_days[i])
+            results.append({
+                "predicted_shelf_life_days": days,
+                "predicted_shelf_life_hours": days * 24.0,
+                "recommended_center": best_center,
+                "survival_margins": {
+                    "SM_Original": float(sm_original[i]),
+                    "SM_A": float(sm_a[i]),
+                    "SM_B": float(sm_b[i]),
+                },
+                "stress_index": float(stress[i]),
+                # Market pivot = not sending to original destination and not dumping
+                "market_pivot_trigger": best_center not in ("Original", "Dump"),
+                "risk_level": str(risk[i]),
+            })
+        return results
 
 
 # ── Singleton ──────────────────────────────────────────────────────────────────
@@ -0,0 +1,286 @@
+"""
+Local stand-in for the OpenAI chat-completions API.
+
+``create_mock_llm_app`` returns a FastAPI app serving
+``POST /v1/chat/completions`` with the function-calling protocol the
+copilot uses — tool calls and text, blocking or streamed as SSE chunks,
+with ``usage`` (also as the final chunk when ``stream_options.include_usage``
+is set). Point ``OPENAI_BASE_URL`` at it, or talk to it in-process with
+``in_process_client`` (an ``AsyncOpenAI`` over ``httpx.ASGITransport``) as the
+agent benchmark and the fleet simulator do.
+
+Replies follow a *script*: a list of steps, each either a set of tool calls
+or a text answer. The step is chosen by how many tool-call rounds the
+current turn has already had (assistant tool-call messages after the last
+user message). A step with ``"if_temp_above"`` only applies when the
+telemetry in the conversation is hotter than that; ``run_ml_prediction``
+calls without ``arguments`` are filled from the telemetry snapshot and the
+``key=value`` conditions in the prompt. Text answers may use ``{temp}``,
+``{action}``, ``{severity}`` and ``{severity_upper}``.
+
+Latency per call is ``latency_s`` ± ``jitter_s`` before the first byte,
+plus ``token_delay_s`` between streamed text chunks.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+_REPORT = (
+    "1. Status: {severity_upper}: cargo at {temp:.1f}°C.\n"
+    "2. Action: {action}\n"
+    "3. Cargo recovery: see rescue points if a pivot is required.\n"
+    "4. Severity: {severity}"
+)
+
+SCRIPTS: Dict[str, List[dict]] = {
+    # What the copilot typically does for /analyze: predict, look for rescue
+    # options and log a recommendation only when the cargo is warm, then report
+    "analyze": [
+        {"tool_calls": [{"name": "run_ml_prediction"}]},
+        {"if_temp_above": 8.0, "tool_calls": [
+            {"name": "get_rescue_points", "arguments": {"available_only": True}},
+            {"name": "log_recommendation"},
+        ]},
+        {"content": _REPORT},
+    ],
+    # Answer straight away — isolates HTTP / streaming overhead
+    "direct": [{"content": _REPORT}],
+    # Every tool over several rounds — worst case for a turn
+    "deep": [
+        {"tool_calls": [{"name": "run_ml_prediction"}]},
+        {"tool_calls": [
+            {"name": "get_rescue_points", "arguments": {"available_only": False}},
+            {"name": "get_facility_status", "arguments": {}},
+            {"name": "get_active_routes", "arguments": {}},
+        ]},
+        {"tool_calls": [{"name": "log_recommendation"}]},
+        {"content": _REPORT},
+    ],
+}
+
+_CONDITION = re.compile(r"\b(distance_km|dist_a_km|dist_b_km|road_a|road_b|cap_a_pct|cap_b_pct)=('?)([\w.]+)\2")
+
+
+def _text(messages: List[dict]) -> str:
+    """The telemetry snapshot and the latest user message (not the summary or system prompt)."""
+    parts = [
+        m["content"] for m in messages
+        if m.get("role") == "system" and (m.get("content") or "").startswith("Current telemetry")
+    ]
+    users = [m.get("content") or "" for m in messages if m.get("role") == "user"]
+    return "\n".join(parts + users[-1:])
+
+
+def _reading(text: str, label: str, default: float) -> float:
+    match = re.search(label + r"\s*:?\s*(-?[\d.]+)", text)
+    return float(match.group(1)) if match else default
+
+
+def _telemetry(messages: List[dict]) -> dict:
+    text = _text(messages)
+    return {
+        "temp_c": _reading(text, r"Temperature", 4.0),
+        "humidity_pct": _reading(text, r"Humidity", 85.0),
+        "vibration_g": _reading(text, r"Vibration", 0.3),
+    }
+
+
+def _severity(temp: float) -> tuple:
+    if temp > 15:
+        return "critical", "CRISIS — trigger an immediate market pivot."
+    if temp > 8:
+        return "medium", "Reroute to the nearest cold centre."
+    return "low", "Maintain current route and optimise speed."
+
+
+def _auto_arguments(name: str, messages: List[dict], telemetry: dict) -> dict:
+    if name == "run_ml_prediction":
+        args = {**telemetry, "distance_km": 250.0}
+        for key, _quote, value in _CONDITION.findall(_text(messages)):
+            args[key] = value if key.startswith("road_") else float(value)
+        return args
+    if name == "log_recommendation":
+        severity, action = _severity(telemetry["temp_c"])
+        kind = {"low": "alert", "medium": "reroute", "critical": "market-pivot"}[severity]
+        return {"type": kind, "severity": severity, "message": action}
+    return {}
+
+
+def _estimate_tokens(obj) -> int:
+    return (len(json.dumps(obj, default=str)) + 3) // 4
+
+
+class MockLLM:
+    def __init__(
+        self,
+        script: List[dict],
+        latency_s: float = 0.15,
+        jitter_s: float = 0.0,
+        token_delay_s: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.script = script
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.token_delay_s = token_delay_s
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def respond(self, messages: List[dict]) -> dict:
+        """The next scripted step for this conversation → {content, tool_calls}."""
+        last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+        rounds = sum(
+            1 for m in messages[last_user + 1:] if m.get("role") == "assistant" and m.get("tool_calls")
+        )
+        telemetry = _telemetry(messages)
+        steps = [
+            s for s in self.script
+            if "if_temp_above" not in s or telemetry["temp_c"] > s["if_temp_above"]
+        ]
+        step = steps[min(rounds, len(steps) - 1)]
+
+        if "tool_calls" in step:
+            calls = [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {
+                        "name": c["name"],
+                        "arguments": json.dumps(
+                            c["arguments"] if "arguments" in c
+                            else _auto_arguments(c["name"], messages, telemetry)
+                        ),
+                    },
+                }
+                for c in step["tool_calls"]
+            ]
+            return {"content": None, "tool_calls": calls}
+        severity, action = _severity(telemetry["temp_c"])
+        content = step["content"].format(
+            temp=telemetry["temp_c"], action=action,
+            severity=severity, severity_upper=severity.upper(),
+        )
+        return {"content": content, "tool_calls": None}
+
+    async def wait(self) -> None:
+        delay = self.latency_s + self.rng.uniform(-self.jitter_s, self.jitter_s)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def create_mock_llm_app(
+    script: Optional[List[dict]] = None,
+    latency_s: float = 0.15,
+    jitter_s: float = 0.0,
+    token_delay_s: float = 0.0,
+    seed: Optional[int] = None,
+) -> FastAPI:
+    llm = MockLLM(script or SCRIPTS["analyze"], latency_s, jitter_s, token_delay_s, seed)
+    app = FastAPI(title="Mock chat completions")
+    app.state.llm = llm
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "mock"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        llm.calls += 1
+        messages = body.get("messages", [])
+        reply = llm.respond(messages)
+        usage = {
+            "prompt_tokens": _estimate_tokens(messages) + _estimate_tokens(body.get("tools", [])),
+            "completion_tokens": _estimate_tokens(reply),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "gpt-4o-mini")
+        finish = "tool_calls" if reply["tool_calls"] else "stop"
+        await llm.wait()
+
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", **reply},
+                    "finish_reason": finish,
+                }],
+                "usage": usage,
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(delta: Optional[dict], finish_reason: Optional[str] = None, **extra) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [] if delta is None else [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+                **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": None if reply["tool_calls"] else ""})
+            if reply["tool_calls"]:
+                for i, call in enumerate(reply["tool_calls"]):
+                    yield chunk({"tool_calls": [{
+                        "index": i, "id": call["id"], "type": "function",
+                        "function": {"name": call["function"]["name"], "arguments": ""},
+                    }]})
+                    args = call["function"]["arguments"]
+                    for j in range(0, len(args), 16):
+                        yield chunk({"tool_calls": [{"index": i, "function": {"arguments": args[j:j + 16]}}]})
+            else:
+                for piece in re.findall(r"\S+\s*", reply["content"]):
+                    if llm.token_delay_s:
+                        await asyncio.sleep(llm.token_delay_s)
+                    yield chunk({"content": piece})
+            yield chunk({}, finish)
+            if include_usage:
+                yield chunk(None, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def in_process_client(app: FastAPI):
+    """An ``AsyncOpenAI`` client that reaches ``app`` without a socket."""
+    import httpx
+    from openai import AsyncOpenAI
+
+    base_url = "http://mock-llm/v1"
+    return AsyncOpenAI(
+        api_key="sk-mock",
+        base_url=base_url,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=base_url),
+    )
+
+
+def load_script(name_or_path: str) -> List[dict]:
+    """A built-in script name, or a JSON file holding a list of steps (or {"steps": [...]})."""
+    if name_or_path in SCRIPTS:
+        return SCRIPTS[name_or_path]
+    with open(name_or_path, encoding="utf-8") as f:
+        data = json.load(f)
+    steps = data["steps"] if isinstance(data, dict) else data
+    if not steps or not any("content" in s for s in steps):
+        raise ValueError("A script needs at least one step with a text 'content' answer")
+    return steps
@@ -0,0 +1,91 @@
+"""
+Keyset pagination and streaming export helpers for the history endpoints.
+
+A cursor is an opaque token holding the sort-key values of the last row of a
+page, e.g. (created_at, id). The next page is fetched with a
+``(created_at, id) < cursor`` predicate so every page is an index range scan
+instead of an ever-growing OFFSET.
+"""
+import base64
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+Cursor = Tuple[Any, ...]
+FetchPage = Callable[[int, Optional[Cursor]], Awaitable[List[dict]]]
+
+EXPORT_PAGE_SIZE = 500
+
+
+def encode_cursor(row: dict, keys: Sequence[str]) -> str:
+    raw = json.dumps([row.get(k) for k in keys], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, keys: Sequence[str]) -> Cursor:
+    """Decode a cursor token; raises ValueError when it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as exc:
+        raise ValueError(f"Invalid cursor: {exc}") from exc
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError("Invalid cursor: wrong number of keys")
+    return tuple(values)
+
+
+def next_cursor(rows: List[dict], limit: int, keys: Sequence[str]) -> Optional[str]:
+    """Cursor for the page after ``rows``, or None when this was the last page."""
+    if len(rows) < limit or not rows:
+        return None
+    return encode_cursor(rows[-1], keys)
+
+
+async def iter_rows(
+    fetch_page: FetchPage, keys: Sequence[str], page_size: int = EXPORT_PAGE_SIZE
+) -> AsyncIterator[dict]:
+    """
+    Walk a keyset-paginated source page by page, holding one page in memory.
+    ``fetch_page`` must raise on failure: an empty page ends the walk, so a
+    swallowed error would silently truncate the export. Errors propagate and
+    abort the streamed response rather than ending it cleanly.
+    """
+    cursor: Optional[Cursor] = None
+    while True:
+        rows = await fetch_page(page_size, cursor)
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        cursor = tuple(rows[-1].get(k) for k in keys)
+
+
+async def export_ndjson(rows: AsyncIterator[dict]) -> AsyncIterator[str]:
+    async for row in rows:
+        yield json.dumps(row, default=str) + "\n"
+
+
+async def export_csv(rows: AsyncIterator[dict]) -> AsyncIterator[str]:
+    buf = io.StringIO()
+    writer: Optional[csv.DictWriter] = None
+    async for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buf, fieldnames=list(row), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow(
+            {k: json.dumps(v) if isinstance(v, (dict, list)) else v for k, v in row.items()}
+        )
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def export_stream(rows: AsyncIterator[dict], fmt: str) -> AsyncIterator[str]:
+    return export_csv(rows) if fmt == "csv" else export_ndjson(rows)
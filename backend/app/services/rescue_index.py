@@ -0,0 +1,204 @@
+"""
+Spatial index for "which rescue point should this truck head for?".
+
+Rescue points (and optionally facilities) with coordinates are projected
+onto the unit sphere and held in a KD-tree (``scipy.spatial.cKDTree``), so
+straight-line chord order equals great-circle order with no lat/lon
+distortion. Candidates are ranked by *distance-adjusted recovery*:
+
+    recovery_chance × 0.5 ** (distance_km / half_km)
+
+— the recovery chance halves for every ``half_km`` travelled. The query is
+exact: it pulls the nearest few candidates, and widens the search only
+while a point further out could still beat the current k-th best (its
+score is at most the index's best recovery chance at that distance).
+
+``RescueIndex`` keeps the built tree and rebuilds it from the database when
+a write endpoint invalidates it, or after ``refresh_s`` to pick up changes
+made elsewhere. Unavailable points and points without coordinates are not
+indexed.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .ml_service import AVG_SPEED_KMPH
+from .route_optimizer import FACILITY_RECOVERY
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _chord_to_km(chord) -> np.ndarray:
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.asarray(chord) / 2.0, 1.0))
+
+
+def index_entries(rescue_points: List[dict], facilities: List[dict] = ()) -> List[dict]:
+    """Indexable sites: available points and facilities that have coordinates."""
+    entries = []
+    for p in rescue_points:
+        if p.get("available", True) and p.get("lat") is not None and p.get("lon") is not None:
+            entries.append({
+                "name": p["name"],
+                "kind": "rescue",
+                "type": p.get("type"),
+                "lat": float(p["lat"]),
+                "lon": float(p["lon"]),
+                "recovery_chance": float(p.get("recovery_chance", 0)),
+            })
+    for f in facilities:
+        if f.get("lat") is not None and f.get("lon") is not None:
+            entries.append({
+                "name": f["name"],
+                "kind": "facility",
+                "type": "facility",
+                "lat": float(f["lat"]),
+                "lon": float(f["lon"]),
+                "recovery_chance": 100.0 * FACILITY_RECOVERY.get(f.get("power_status", "normal"), 0.9),
+            })
+    return entries
+
+
+class SpatialIndex:
+    """Immutable KD-tree over a snapshot of sites."""
+
+    def __init__(self, entries: List[dict]):
+        self.entries = entries
+        self.built_at = time.time()
+        self._recovery = np.array([e["recovery_chance"] for e in entries], dtype=float)
+        self._is_rescue = np.array([e["kind"] == "rescue" for e in entries], dtype=bool)
+        self._tree = (
+            cKDTree(_unit_vectors([e["lat"] for e in entries], [e["lon"] for e in entries]))
+            if entries else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 5,
+        half_km: float = 25.0,
+        include_facilities: bool = False,
+    ) -> List[dict]:
+        """The ``k`` best sites by distance-adjusted recovery, best first."""
+        n = len(self.entries)
+        if n == 0 or k <= 0:
+            return []
+        point = _unit_vectors(lat, lon)
+        allowed = None if include_facilities else self._is_rescue
+        best_possible = float(self._recovery.max())
+        fetch = min(n, max(4 * k, 16))
+        while True:
+            chord, idx = self._tree.query(point, k=fetch)
+            idx, km = np.atleast_1d(idx), _chord_to_km(np.atleast_1d(chord))
+            if allowed is not None:
+                keep = allowed[idx]
+                idx, km_kept = idx[keep], km[keep]
+            else:
+                km_kept = km
+            score = self._recovery[idx] * 0.5 ** (km_kept / half_km)
+            order = np.argsort(-score, kind="stable")[:k]
+            if fetch == n:
+                break
+            # Anything not fetched is at least km[-1] away
+            bound = best_possible * 0.5 ** (km[-1] / half_km)
+            if len(order) == k and score[order[-1]] >= bound:
+                break
+            fetch = min(n, fetch * 4)
+
+        out = []
+        for j in order:
+            entry = self.entries[int(idx[j])]
+            distance = float(km_kept[j])
+            out.append({
+                **entry,
+                "distance_km": round(distance, 3),
+                "eta_min": round(distance / AVG_SPEED_KMPH * 60.0, 1),
+                "adjusted_recovery": round(float(score[j]), 2),
+            })
+        return out
+
+
+class RescueIndex:
+    """The current ``SpatialIndex``, rebuilt on invalidation or every ``refresh_s``."""
+
+    def __init__(self, refresh_s: float = 60.0, half_km: float = 25.0):
+        self.refresh_s = refresh_s
+        self.half_km = half_km
+        self._index: Optional[SpatialIndex] = None
+        self._stale = True
+        self._lock: Optional[asyncio.Lock] = None
+        self.builds = 0
+        self.last_build_ms = 0.0
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    async def get(self, loader: Callable[[], Awaitable[Tuple[List[dict], List[dict]]]]) -> SpatialIndex:
+        """The index, first rebuilding it from ``loader() → (rescue_points, facilities)`` if due."""
+        if not self._due():
+            return self._index
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._due():  # a concurrent request may have just rebuilt it
+                self._stale = False
+                try:
+                    points, facilities = await loader()
+                    started = time.perf_counter()
+                    self._index = await asyncio.to_thread(SpatialIndex, index_entries(points, facilities))
+                except Exception:
+                    self._stale = True
+                    raise
+                self.last_build_ms = round((time.perf_counter() - started) * 1000, 3)
+                self.builds += 1
+                logger.debug("Rescue index rebuilt: %d sites in %.1f ms", len(self._index), self.last_build_ms)
+        return self._index
+
+    def _due(self) -> bool:
+        return (
+            self._index is None
+            or self._stale
+            or (self.refresh_s > 0 and time.time() - self._index.built_at > self.refresh_s)
+        )
+
+    def stats(self) -> dict:
+        return {
+            "sites": len(self._index) if self._index is not None else 0,
+            "builds": self.builds,
+            "last_build_ms": self.last_build_ms,
+            "built_at": self._index.built_at if self._index is not None else None,
+            "stale": self._stale,
+        }
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_rescue_index: Optional[RescueIndex] = None
+
+
+def get_rescue_index() -> RescueIndex:
+    global _rescue_index
+    if _rescue_index is None:
+        from ..config import get_settings
+
+        settings = get_settings()
+        _rescue_index = RescueIndex(
+            refresh_s=settings.rescue_index_refresh_s,
+            half_km=settings.rescue_distance_half_km,
+        )
+    return _rescue_index
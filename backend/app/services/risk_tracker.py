@@ -0,0 +1,271 @@
+"""
+Event-driven risk tracking — an ingest stage that re-scores a session with
+ColdChainMLService only when its telemetry has materially changed.
+
+Per session we keep an EWMA of temperature, humidity and vibration plus an
+EWMA of the temperature rate of change (°C/min). A reading is scored when
+
+  * the session has never been scored,
+  * an EWMA moves further than its configured delta from the values at the
+    last scoring, or
+  * the raw reading crosses a risk boundary: the 8 °C / 15 °C temperature
+    bands of the decision table or the 0.5 G vibration flag, or
+  * the trend does: the EWMA temperature projected ``trend_horizon_min``
+    ahead at the EWMA rate lands in a worse band than at the last scoring.
+
+Every other tick is skipped. The triggered readings of one ingest batch are
+scored together in a single ``predict_batch`` call. Scored results are logged
+to ml_predictions in the background and published on the telemetry broker as
+"prediction" events.
+Sessions are dropped when their trip closes, or after ``idle_ttl_s``
+without readings.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from .ml_service import VIBRATION_FLAG_G
+
+logger = logging.getLogger(__name__)
+
+TEMP_BANDS = (8.0, 15.0)
+
+
+def temperature_band(temp_c: float) -> int:
+    return sum(temp_c > b for b in TEMP_BANDS)
+
+
+def _value(record: dict, key: str, default: float) -> float:
+    value = record.get(key)
+    return default if value is None else float(value)
+
+
+def _epoch(value) -> float:
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class SessionRiskState:
+    __slots__ = (
+        "ewma", "temp_rate_per_min", "last_ts", "last_temp",
+        "scored_values", "band", "trend_band", "vib_flag",
+        "prediction", "readings", "scored", "last_reason", "touched",
+    )
+
+    def __init__(self):
+        self.ewma: Dict[str, float] = {}
+        self.temp_rate_per_min = 0.0
+        self.last_ts: Optional[float] = None
+        self.last_temp: Optional[float] = None
+        self.scored_values: Dict[str, float] = {}
+        self.band: Optional[int] = None
+        self.trend_band: Optional[int] = None
+        self.vib_flag: Optional[bool] = None
+        self.prediction: Optional[dict] = None
+        self.readings = 0
+        self.scored = 0
+        self.last_reason: Optional[str] = None
+        self.touched = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {
+            "ewma": {k: round(v, 4) for k, v in self.ewma.items()},
+            "temp_rate_per_min": round(self.temp_rate_per_min, 4),
+            "readings": self.readings,
+            "scored": self.scored,
+            "skipped": self.readings - self.scored,
+            "last_trigger": self.last_reason,
+            "prediction": self.prediction,
+        }
+
+
+class RiskTracker:
+    FIELDS = ("temperature", "humidity", "vibration")
+
+    def __init__(
+        self,
+        ml_service,
+        alpha: float = 0.3,
+        deltas: Optional[Dict[str, float]] = None,
+        distance_km: float = 250.0,
+        trend_horizon_min: float = 30.0,
+        idle_ttl_s: float = 86400.0,
+    ):
+        self.ml = ml_service
+        self.alpha = alpha
+        self.deltas = deltas or {"temperature": 0.5, "humidity": 5.0, "vibration": 0.2}
+        self.distance_km = distance_km
+        self.trend_horizon_min = trend_horizon_min
+        self.idle_ttl_s = idle_ttl_s
+        self._sessions: "OrderedDict[str, SessionRiskState]" = OrderedDict()
+        self._background: Set[asyncio.Task] = set()
+
+    # ── Ingest stage ───────────────────────────────────────────────────────────
+    async def __call__(self, record: dict, result: dict, svc) -> None:
+        await self.batch([record], [result], svc)
+
+    async def batch(self, records: List[dict], results: List[dict], svc) -> None:
+        """Update every session, then score all triggered readings in one model call."""
+        triggered = []
+        for record, result in zip(records, results):
+            session_id = record.get("session_id")
+            if not session_id or record.get("temperature") is None:
+                continue
+            state = self._sessions.get(session_id)
+            if state is None:
+                self._evict()
+                state = self._sessions[session_id] = SessionRiskState()
+            else:
+                self._sessions.move_to_end(session_id)
+                state.touched = time.monotonic()
+            self._update_stats(state, record)
+            reason = self._trigger(state, record)
+            if reason is None:
+                continue
+            inputs = {
+                "temp_c": float(record["temperature"]),
+                "humidity_pct": _value(record, "humidity", 85.0),
+                "vibration_g": _value(record, "vibration", 0.3),
+                "distance_km": self.distance_km,
+            }
+            # Move the baselines now so later readings of the same session in
+            # this batch are compared with this one, not with the previous scoring
+            previous = self._mark_scored(state, inputs, reason)
+            triggered.append((record, result, state, inputs, reason, previous))
+        if not triggered:
+            return
+
+        try:
+            raws = await asyncio.to_thread(self.ml.predict_batch, [t[3] for t in triggered])
+        except Exception:
+            for _, _, state, _, _, previous in reversed(triggered):
+                self._restore(state, previous)
+            raise
+
+        for (record, result, state, inputs, reason, _), raw in zip(triggered, raws):
+            session_id = record["session_id"]
+            prediction = {
+                "session_id": session_id,
+                "trigger": reason,
+                "reading_at": record.get("created_at"),
+                **raw,
+            }
+            state.prediction = prediction
+            result["prediction"] = prediction
+            self._publish(prediction)
+            task = asyncio.create_task(svc.log_prediction({**inputs, "session_id": session_id}, raw))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    def _mark_scored(self, state: SessionRiskState, inputs: dict, reason: str) -> tuple:
+        previous = (
+            state.scored_values, state.band, state.trend_band, state.vib_flag,
+            state.scored, state.last_reason,
+        )
+        state.scored += 1
+        state.last_reason = reason
+        state.scored_values = dict(state.ewma)
+        state.band = temperature_band(inputs["temp_c"])
+        state.trend_band = self._trend_band(state)
+        state.vib_flag = inputs["vibration_g"] > VIBRATION_FLAG_G
+        return previous
+
+    @staticmethod
+    def _restore(state: SessionRiskState, previous: tuple) -> None:
+        (
+            state.scored_values, state.band, state.trend_band, state.vib_flag,
+            state.scored, state.last_reason,
+        ) = previous
+
+    def _update_stats(self, state: SessionRiskState, record: dict) -> None:
+        ts = _epoch(record.get("created_at"))
+        temp = float(record["temperature"])
+        for f in self.FIELDS:
+            v = record.get(f)
+            if v is None:
+                continue
+            prev = state.ewma.get(f)
+            state.ewma[f] = float(v) if prev is None else prev + self.alpha * (float(v) - prev)
+        if state.last_ts is not None and ts > state.last_ts:
+            slope = (temp - state.last_temp) / ((ts - state.last_ts) / 60.0)
+            state.temp_rate_per_min += self.alpha * (slope - state.temp_rate_per_min)
+        state.last_ts, state.last_temp = ts, temp
+        state.readings += 1
+
+    def _trigger(self, state: SessionRiskState, record: dict) -> Optional[str]:
+        if state.band is None:
+            return "first_reading"
+        if temperature_band(float(record["temperature"])) != state.band:
+            return "temperature_band"
+        trend = self._trend_band(state)
+        if trend is not None and state.trend_band is not None and trend > state.trend_band:
+            return "temperature_trend"
+        vib = record.get("vibration")
+        if vib is not None and (float(vib) > VIBRATION_FLAG_G) != state.vib_flag:
+            return "vibration_flag"
+        for f, delta in self.deltas.items():
+            now, then = state.ewma.get(f), state.scored_values.get(f)
+            if now is not None and then is not None and abs(now - then) > delta:
+                return f"{f}_delta"
+        return None
+
+    def _trend_band(self, state: SessionRiskState) -> Optional[int]:
+        """Band of the EWMA temperature projected ``trend_horizon_min`` ahead."""
+        temp = state.ewma.get("temperature")
+        if temp is None or self.trend_horizon_min <= 0:
+            return None
+        return temperature_band(temp + state.temp_rate_per_min * self.trend_horizon_min)
+
+    def _evict(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl_s
+        while self._sessions:
+            sid, state = next(iter(self._sessions.items()))
+            if state.touched >= cutoff:
+                break
+            del self._sessions[sid]
+
+    def _publish(self, prediction: dict) -> None:
+        from .telemetry_broker import get_telemetry_broker
+
+        get_telemetry_broker().publish(
+            "prediction", prediction, session_id=prediction["session_id"]
+        )
+
+    # ── Queries ────────────────────────────────────────────────────────────────
+    def state(self, session_id: str) -> Optional[dict]:
+        st = self._sessions.get(session_id)
+        return {"session_id": session_id, **st.snapshot()} if st else None
+
+    def forget(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_tracker: Optional[RiskTracker] = None
+
+
+def get_risk_tracker() -> RiskTracker:
+    global _tracker
+    if _tracker is None:
+        from ..config import get_settings
+        from .ml_service import get_ml_service
+
+        settings = get_settings()
+        _tracker = RiskTracker(
+            get_ml_service(settings.models_dir),
+            alpha=settings.risk_ewma_alpha,
+            deltas={
+                "temperature": settings.risk_temp_delta_c,
+                "humidity": settings.risk_humidity_delta_pct,
+                "vibration": settings.risk_vibration_delta_g,
+            },
+            distance_km=settings.risk_default_distance_km,
+            trend_horizon_min=settings.risk_trend_horizon_min,
+            idle_ttl_s=settings.risk_session_idle_h * 3600,
+        )
+    return _tracker
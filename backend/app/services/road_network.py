@@ -0,0 +1,315 @@
+"""
+Road network — condition-aware shortest paths to centres and rescue points.
+
+The graph is a local JSON file (``road_network_path``): nodes with an id,
+name and kind (``hub``, ``junction``, ``facility`` or ``rescue``; facilities
+may carry ``center: "A" | "B"``) and undirected edges with a length in km
+and a road condition. An edge's weight is its *effective* length,
+``km × ROAD_MAPPING[road]`` — the distance the ML model's travel-time
+formula charges for it. Parallel edges between the same two nodes are
+allowed (a highway and a service road); paths use whichever currently
+weighs least.
+
+For every destination (facility or rescue node) a shortest-path tree is
+built once with Dijkstra from the destination and cached: distance and next
+hop towards it from every node, so any truck position is a dictionary
+lookup. When an edge's road condition changes the cached trees are repaired
+in place rather than rebuilt:
+
+* weight went down — relax from the edge's ends, propagating only through
+  nodes that actually get closer;
+* weight went up — nothing changes unless the edge is in the tree; if it
+  is, only the subtree hanging below it is re-settled, seeded from its
+  neighbours outside the subtree.
+
+``prediction_conditions`` turns a truck's node into the ``dist_a_km`` /
+``road_a`` / ``dist_b_km`` / ``road_b`` the ML model takes: physical km of
+the best path and the ``ROAD_MAPPING`` label nearest its average multiplier.
+"""
+import heapq
+import json
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from .ml_service import AVG_SPEED_KMPH, ROAD_MAPPING
+
+logger = logging.getLogger(__name__)
+
+_INF = math.inf
+_EPS = 1e-9
+DESTINATION_KINDS = ("facility", "rescue")
+
+
+def road_label(multiplier: float) -> str:
+    """The ``ROAD_MAPPING`` condition whose multiplier is nearest."""
+    return min(ROAD_MAPPING, key=lambda road: abs(ROAD_MAPPING[road] - multiplier))
+
+
+class _Tree:
+    """Shortest-path tree rooted at one destination."""
+
+    __slots__ = ("root", "dist", "parent", "children")
+
+    def __init__(self, root: str):
+        self.root = root
+        self.dist: Dict[str, float] = {}
+        self.parent: Dict[str, Optional[str]] = {}
+        self.children: Dict[str, Set[str]] = {}
+
+    def reparent(self, node: str, parent: Optional[str]) -> None:
+        old = self.parent.get(node)
+        if old is not None:
+            self.children[old].discard(node)
+        self.parent[node] = parent
+        if parent is not None:
+            self.children.setdefault(parent, set()).add(node)
+
+
+class RoadNetwork:
+    def __init__(self, nodes: List[dict], edges: List[dict], name: str = ""):
+        self.name = name
+        self.nodes: Dict[str, dict] = {n["id"]: n for n in nodes}
+        self.edges: Dict[str, dict] = {}
+        # adjacency: node → {neighbour: ids of the edges joining them}
+        self._adj: Dict[str, Dict[str, List[str]]] = {node_id: {} for node_id in self.nodes}
+        for e in edges:
+            edge_id = e.get("id") or f"{e['from']}-{e['to']}"
+            if e["from"] not in self.nodes or e["to"] not in self.nodes:
+                raise ValueError(f"Edge {edge_id} references an unknown node")
+            if e["from"] == e["to"]:
+                raise ValueError(f"Edge {edge_id} is a loop")
+            if edge_id in self.edges:
+                raise ValueError(f"Duplicate edge id {edge_id}")
+            if e.get("road", "Clear") not in ROAD_MAPPING:
+                raise ValueError(f"Edge {edge_id} has unknown road condition {e.get('road')!r}")
+            self.edges[edge_id] = {
+                "id": edge_id,
+                "from": e["from"],
+                "to": e["to"],
+                "km": float(e["km"]),
+                "road": e.get("road", "Clear"),
+            }
+            self._adj[e["from"]].setdefault(e["to"], []).append(edge_id)
+            self._adj[e["to"]].setdefault(e["from"], []).append(edge_id)
+        self.destinations = [
+            node_id for node_id, n in self.nodes.items() if n.get("kind") in DESTINATION_KINDS
+        ]
+        self.centers = {
+            n["center"]: node_id for node_id, n in self.nodes.items() if n.get("center")
+        }
+        self._trees: Dict[str, _Tree] = {}
+        self.version = 0
+        self.full_builds = 0
+        self.incremental_updates = 0
+        self.nodes_resettled = 0
+
+    @classmethod
+    def load(cls, path: str) -> "RoadNetwork":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        network = cls(data.get("nodes", []), data.get("edges", []), data.get("name", ""))
+        logger.info(
+            "Road network loaded from %s: %d nodes, %d edges",
+            path, len(network.nodes), len(network.edges),
+        )
+        return network
+
+    # ── Weights ────────────────────────────────────────────────────────────────
+    def weight(self, edge_id: str) -> float:
+        edge = self.edges[edge_id]
+        return edge["km"] * ROAD_MAPPING[edge["road"]]
+
+    def _best_edge(self, u: str, v: str) -> str:
+        """The lightest of the edges joining ``u`` and ``v``."""
+        return min(self._adj[u][v], key=self.weight)
+
+    def _neighbours(self, node: str):
+        for other, edge_ids in self._adj[node].items():
+            yield other, min(self.weight(edge_id) for edge_id in edge_ids)
+
+    # ── Shortest-path trees ────────────────────────────────────────────────────
+    def _tree(self, root: str) -> _Tree:
+        tree = self._trees.get(root)
+        if tree is None:
+            tree = self._trees[root] = self._build(root)
+        return tree
+
+    def _build(self, root: str) -> _Tree:
+        tree = _Tree(root)
+        for node in self.nodes:
+            tree.dist[node] = _INF
+            tree.parent[node] = None
+        tree.dist[root] = 0.0
+        self._settle(tree, [(0.0, root)])
+        self.full_builds += 1
+        return tree
+
+    def _settle(self, tree: _Tree, heap: list, within: Optional[Set[str]] = None) -> int:
+        """Dijkstra from the seeded heap, optionally only relaxing into ``within``."""
+        heapq.heapify(heap)
+        settled = 0
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > tree.dist[node] + _EPS:
+                continue
+            settled += 1
+            for other, w in self._neighbours(node):
+                if within is not None and other not in within:
+                    continue
+                if d + w < tree.dist[other] - _EPS:
+                    tree.dist[other] = d + w
+                    tree.reparent(other, node)
+                    heapq.heappush(heap, (d + w, other))
+        return settled
+
+    def _subtree(self, tree: _Tree, node: str) -> Set[str]:
+        out, stack = {node}, [node]
+        while stack:
+            for child in tree.children.get(stack.pop(), ()):
+                out.add(child)
+                stack.append(child)
+        return out
+
+    def _repair(self, tree: _Tree, u: str, v: str, old_w: float, new_w: float) -> int:
+        if new_w < old_w:
+            heap = []
+            for a, b in ((u, v), (v, u)):
+                if tree.dist[b] + new_w < tree.dist[a] - _EPS:
+                    tree.dist[a] = tree.dist[b] + new_w
+                    tree.reparent(a, b)
+                    heap.append((tree.dist[a], a))
+            return self._settle(tree, heap) if heap else 0
+
+        if tree.parent.get(u) == v:
+            child = u
+        elif tree.parent.get(v) == u:
+            child = v
+        else:
+            return 0  # not a tree edge: no best path used it
+        affected = self._subtree(tree, child)
+        for node in affected:
+            tree.dist[node] = _INF
+            tree.reparent(node, None)
+        heap = []
+        for node in affected:
+            best, via = _INF, None
+            for other, w in self._neighbours(node):
+                if other not in affected and tree.dist[other] + w < best:
+                    best, via = tree.dist[other] + w, other
+            if via is not None:
+                tree.dist[node] = best
+                tree.reparent(node, via)
+                heap.append((best, node))
+        self._settle(tree, heap, within=affected)
+        return len(affected)
+
+    def set_road_condition(self, edge_id: str, road: str) -> dict:
+        """Change one edge's condition and repair every cached tree."""
+        if edge_id not in self.edges:
+            raise KeyError(edge_id)
+        if road not in ROAD_MAPPING:
+            raise ValueError(f"Unknown road condition {road!r}")
+        started = time.perf_counter()
+        edge = self.edges[edge_id]
+        previous = edge["road"]
+        # Trees only see the lightest edge per node pair
+        old_w = self.weight(self._best_edge(edge["from"], edge["to"]))
+        edge["road"] = road
+        new_w = self.weight(self._best_edge(edge["from"], edge["to"]))
+        resettled = 0
+        if new_w != old_w:
+            self.version += 1
+            for tree in self._trees.values():
+                resettled += self._repair(tree, edge["from"], edge["to"], old_w, new_w)
+            self.incremental_updates += 1
+            self.nodes_resettled += resettled
+        return {
+            "edge": dict(edge),
+            "previous_road": previous,
+            "trees_repaired": len(self._trees),
+            "nodes_resettled": resettled,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    # ── Queries ────────────────────────────────────────────────────────────────
+    def _require(self, node: str) -> None:
+        if node not in self.nodes:
+            raise KeyError(node)
+
+    def path(self, node: str, destination: str) -> Optional[dict]:
+        """Best path from ``node`` to ``destination``; None when unreachable."""
+        self._require(node)
+        self._require(destination)
+        tree = self._tree(destination)
+        if tree.dist[node] == _INF:
+            return None
+        hops, km, current = [node], 0.0, node
+        while current != destination:
+            nxt = tree.parent[current]
+            km += self.edges[self._best_edge(current, nxt)]["km"]
+            hops.append(nxt)
+            current = nxt
+        effective = tree.dist[node]
+        return {
+            "destination": self.nodes[destination]["name"],
+            "destination_id": destination,
+            "kind": self.nodes[destination].get("kind"),
+            "km": round(km, 2),
+            "effective_km": round(effective, 2),
+            "road": road_label(effective / km) if km else "Clear",
+            "travel_hours": round(effective / AVG_SPEED_KMPH, 3),
+            "path": hops,
+        }
+
+    def paths_from(self, node: str) -> List[dict]:
+        """Best paths from ``node`` to every reachable destination, nearest first."""
+        paths = [self.path(node, dest) for dest in self.destinations]
+        return sorted((p for p in paths if p is not None), key=lambda p: p["effective_km"])
+
+    def prediction_conditions(self, node: str) -> dict:
+        """``dist_a_km`` / ``road_a`` / ``dist_b_km`` / ``road_b`` for a truck at ``node``."""
+        self._require(node)
+        out = {}
+        for center, dest in self.centers.items():
+            p = self.path(node, dest)
+            if p is None or center not in ("A", "B"):
+                continue
+            suffix = center.lower()
+            out[f"dist_{suffix}_km"] = p["km"]
+            out[f"road_{suffix}"] = p["road"]
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "nodes": len(self.nodes),
+            "edges": len(self.edges),
+            "destinations": len(self.destinations),
+            "cached_trees": len(self._trees),
+            "version": self.version,
+            "full_builds": self.full_builds,
+            "incremental_updates": self.incremental_updates,
+            "nodes_resettled": self.nodes_resettled,
+        }
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_network: Optional[RoadNetwork] = None
+
+
+def get_road_network() -> RoadNetwork:
+    """The configured network; an empty one when the file is missing."""
+    global _network
+    if _network is None:
+        from ..config import get_settings
+
+        path = get_settings().road_network_path
+        if Path(path).exists():
+            _network = RoadNetwork.load(path)
+        else:
+            logger.warning("Road network file %s not found — node positions are unavailable", path)
+            _network = RoadNetwork([], [])
+    return _network
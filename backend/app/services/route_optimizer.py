@@ -0,0 +1,184 @@
+"""
+Capacity-aware assignment of at-risk trucks to facilities and rescue points.
+
+The routing classifier picks a centre per truck from static capacities, so
+when many trucks pivot together they all pick the same centre and overflow
+it. Here the choice is made jointly:
+
+* every destination has ``slots`` — the trucks it can still take (facility:
+  spare storage ÷ units per truck; rescue point: the given or default slot
+  count);
+* a truck may be left unassigned (score 0) rather than forced into a slot
+  that does it no good;
+* score(truck, destination) = −recovery × min(1, margin / target margin),
+  where margin is the predicted shelf life left on arrival (shelf life −
+  travel days at ``AVG_SPEED_KMPH`` × the road multiplier). Destinations
+  the cargo cannot reach alive score 0, like staying unassigned. A small
+  urgency term breaks ties in favour of the trucks with the least shelf life;
+* the problem is a transportation LP over the (truck, destination) pairs
+  with a positive score: each truck takes at most one destination and each
+  destination at most its slots. Its constraint matrix is a bipartite
+  incidence matrix (totally unimodular), so the basic optimum that dual
+  simplex (``scipy.optimize.linprog``, HiGHS) returns is integral — the same
+  optimum as expanding destinations into one column per slot for the
+  Hungarian algorithm, without the n × (Σ slots + n) cost matrix.
+
+Thousands of trucks against tens of destinations solve in tens of milliseconds.
+"""
+import math
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import coo_matrix
+
+from .ml_service import AVG_SPEED_KMPH, ROAD_MAPPING
+
+# Recovery odds at a facility by power state (rescue points carry their own)
+FACILITY_RECOVERY = {"normal": 0.98, "backup": 0.9, "critical": 0.6}
+_URGENCY_WEIGHT = 1e-3
+
+
+def build_destinations(
+    facilities: List[dict],
+    rescue_points: List[dict],
+    units_per_truck: float,
+    rescue_slots: int,
+    capacities: Optional[Dict[str, int]] = None,
+    default_facility_distance_km: float = 100.0,
+) -> List[dict]:
+    """Facilities and available rescue points with their remaining truck slots."""
+    capacities = capacities or {}
+    out = []
+    for f in facilities:
+        spare = max(0.0, float(f.get("storage_capacity", 0)) - float(f.get("current_load", 0)))
+        out.append({
+            "name": f["name"],
+            "type": "facility",
+            "slots": int(capacities.get(f["name"], math.floor(spare / units_per_truck))),
+            "recovery": FACILITY_RECOVERY.get(f.get("power_status", "normal"), 0.9),
+            "distance_km": default_facility_distance_km,
+        })
+    for p in rescue_points:
+        if not p.get("available", True):
+            continue
+        out.append({
+            "name": p["name"],
+            "type": p.get("type", "rescue"),
+            "slots": int(capacities.get(p["name"], rescue_slots)),
+            "recovery": float(p.get("recovery_chance", 50)) / 100.0,
+            "distance_km": float(p.get("distance", 0.0)),
+        })
+    return out
+
+
+def _solve(objective: np.ndarray, slots: List[int]) -> np.ndarray:
+    """Destination index per truck (−1: unassigned) maximising the total objective."""
+    n, m = objective.shape
+    caps = np.clip(np.asarray(slots, dtype=float), 0, n)
+    chosen = np.full(n, -1)
+    ti, dj = np.nonzero((objective > 0.0) & (caps[None, :] > 0))
+    k = len(ti)
+    if k == 0:
+        return chosen
+    # Rows 0..n-1: one destination per truck; rows n..n+m-1: destination slots
+    a_ub = coo_matrix(
+        (np.ones(2 * k), (np.concatenate([ti, n + dj]), np.tile(np.arange(k), 2))),
+        shape=(n + m, k),
+    )
+    res = linprog(
+        -objective[ti, dj],
+        A_ub=a_ub.tocsr(),
+        b_ub=np.concatenate([np.ones(n), caps]),
+        bounds=(0, 1),
+        method="highs-ds",
+    )
+    if not res.success:
+        raise RuntimeError(f"Assignment LP failed: {res.message}")
+    picked = res.x > 0.5
+    chosen[ti[picked]] = dj[picked]
+    return chosen
+
+
+def optimize_assignments(
+    trucks: List[dict],
+    shelf_life_days: List[float],
+    destinations: List[dict],
+    target_margin_days: float = 1.0,
+) -> dict:
+    """
+    ``trucks[i]`` may carry ``distances_km`` / ``roads`` keyed by destination
+    name (defaults: the destination's own distance, "Clear").
+    """
+    started = time.perf_counter()
+    n, m = len(trucks), len(destinations)
+
+    # margin[i, j]: shelf life left on arrival (days)
+    margin = np.empty((n, m))
+    dist = np.empty((n, m))
+    for i, truck in enumerate(trucks):
+        distances = truck.get("distances_km") or {}
+        roads = truck.get("roads") or {}
+        for j, dest in enumerate(destinations):
+            km = float(distances.get(dest["name"], dest["distance_km"]))
+            mult = ROAD_MAPPING.get(roads.get(dest["name"], "Clear"), 1.0)
+            dist[i, j] = km
+            margin[i, j] = shelf_life_days[i] - km / AVG_SPEED_KMPH * mult / 24.0
+    recovery = np.array([d["recovery"] for d in destinations])
+    utility = recovery[None, :] * np.clip(margin / target_margin_days, 0.0, 1.0)
+    # Tie-break: when slots are short, the trucks with the least shelf life go first
+    urgency = 1.0 / (1.0 + np.asarray(shelf_life_days, dtype=float))
+    objective = np.where(utility > 0.0, utility + _URGENCY_WEIGHT * urgency[:, None], 0.0)
+
+    chosen = _solve(objective, [d["slots"] for d in destinations])
+
+    assignments, unassigned = [], []
+    assigned_count = np.zeros(m, dtype=int)
+    for i, truck in enumerate(trucks):
+        truck_id = truck["truck_id"]
+        j = int(chosen[i])
+        if j < 0 or utility[i, j] <= 0.0:
+            reachable = bool((margin[i] > 0).any())
+            unassigned.append({
+                "truck_id": truck_id,
+                "predicted_shelf_life_days": round(shelf_life_days[i], 3),
+                "reason": "no capacity left at a reachable destination" if reachable
+                else "cargo spoils before reaching any destination",
+            })
+            continue
+        assigned_count[j] += 1
+        dest = destinations[j]
+        assignments.append({
+            "truck_id": truck_id,
+            "destination": dest["name"],
+            "destination_type": dest["type"],
+            "distance_km": round(float(dist[i, j]), 2),
+            "predicted_shelf_life_days": round(shelf_life_days[i], 3),
+            "survival_margin_days": round(float(margin[i, j]), 3),
+            "recovery_chance": round(float(dest["recovery"]), 3),
+            "score": round(float(utility[i, j]), 4),
+        })
+
+    # What each truck would pick on its own, ignoring everyone else
+    solo = np.argmax(utility, axis=1)
+    solo_demand = np.bincount(solo[utility[np.arange(n), solo] > 0], minlength=m)
+    overflow = int(sum(max(0, int(solo_demand[j]) - destinations[j]["slots"]) for j in range(m)))
+
+    return {
+        "assignments": assignments,
+        "unassigned": unassigned,
+        "destinations": [
+            {
+                "name": d["name"],
+                "type": d["type"],
+                "capacity_slots": d["slots"],
+                "assigned": int(assigned_count[j]),
+                "independent_demand": int(solo_demand[j]),
+            }
+            for j, d in enumerate(destinations)
+        ],
+        "total_score": round(float(sum(a["score"] for a in assignments)), 4),
+        "independent_choice_overflow": overflow,
+        "solve_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
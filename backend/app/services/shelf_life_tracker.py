@@ -0,0 +1,155 @@
+"""
+Cumulative shelf-life consumption per session (trip).
+
+Spoilage follows the model's own Q10 stress (``ml_service.stress_index``, also
+used by ``_engineer_features``):
+
+    rate(T, vib) = 2 ** ((T - 4) / 10) * (1 + 0.5 * [vib > 0.5])
+
+i.e. 1.0 at the 4 °C reference, doubling every 10 °C. Between two readings
+the cargo is assumed to have aged at the earlier reading's rate, so each
+reading adds ``rate * dt / reference_life`` to the consumed fraction — O(1)
+work and O(1) state per session. The remaining life at the current rate is
+the unconsumed fraction divided by that rate.
+
+The tracker also keeps the min/max temperature and first/last timestamps so
+a trip log can be written straight from it when the trip closes. Sessions
+that stop reporting without being closed are dropped after ``idle_ttl_s``.
+"""
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+from .ml_service import stress_index
+
+logger = logging.getLogger(__name__)
+
+
+def _epoch(value) -> float:
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class ShelfLifeState:
+    __slots__ = (
+        "used", "rate", "first_ts", "last_ts",
+        "temp_min", "temp_max", "readings", "published_pct", "touched",
+    )
+
+    def __init__(self, ts: float, temp: float):
+        self.used = 0.0
+        self.rate = 1.0
+        self.first_ts = ts
+        self.last_ts = ts
+        self.temp_min = temp
+        self.temp_max = temp
+        self.readings = 0
+        self.published_pct: Optional[int] = None
+        self.touched = time.monotonic()
+
+
+class ShelfLifeTracker:
+    def __init__(self, reference_life_h: float = 240.0, idle_ttl_s: float = 86400.0):
+        self.reference_life_h = reference_life_h
+        self.idle_ttl_s = idle_ttl_s
+        self._sessions: "OrderedDict[str, ShelfLifeState]" = OrderedDict()
+
+    # ── Ingest stage ───────────────────────────────────────────────────────────
+    async def __call__(self, record: dict, result: dict, svc) -> None:
+        session_id = record.get("session_id")
+        if not session_id or record.get("temperature") is None:
+            return
+        estimate = self.add(
+            session_id,
+            _epoch(record.get("created_at")),
+            float(record["temperature"]),
+            float(record.get("vibration") or 0.0),
+        )
+        result["shelf_life"] = estimate
+        state = self._sessions[session_id]
+        pct = int(estimate["used_pct"])
+        if pct != state.published_pct:
+            # one event per whole percent consumed keeps the stream quiet
+            state.published_pct = pct
+            from .telemetry_broker import get_telemetry_broker
+
+            get_telemetry_broker().publish("shelf_life", estimate, session_id=session_id)
+
+    def add(self, session_id: str, ts: float, temp_c: float, vibration_g: float = 0.0) -> dict:
+        state = self._sessions.get(session_id)
+        if state is None:
+            self._evict()
+            state = self._sessions[session_id] = ShelfLifeState(ts, temp_c)
+        else:
+            self._sessions.move_to_end(session_id)
+            state.touched = time.monotonic()
+        if ts > state.last_ts:
+            state.used += state.rate * (ts - state.last_ts) / 3600.0 / self.reference_life_h
+            state.last_ts = ts
+        state.rate = stress_index(temp_c, vibration_g)
+        state.temp_min = min(state.temp_min, temp_c)
+        state.temp_max = max(state.temp_max, temp_c)
+        state.readings += 1
+        return self._estimate(session_id, state)
+
+    def _estimate(self, session_id: str, state: ShelfLifeState) -> dict:
+        remaining = max(0.0, 1.0 - state.used)
+        return {
+            "session_id": session_id,
+            "used_pct": round(min(state.used, 1.0) * 100.0, 2),
+            "remaining_pct": round(remaining * 100.0, 2),
+            "remaining_hours": round(remaining * self.reference_life_h / state.rate, 2),
+            "current_rate": round(state.rate, 4),
+            "elapsed_hours": round((state.last_ts - state.first_ts) / 3600.0, 3),
+            "readings": state.readings,
+        }
+
+    # ── Queries ────────────────────────────────────────────────────────────────
+    def estimate(self, session_id: str) -> Optional[dict]:
+        state = self._sessions.get(session_id)
+        return self._estimate(session_id, state) if state else None
+
+    def summary(self, session_id: str) -> Optional[dict]:
+        """Final summary for a finishing trip; ``forget`` it once persisted."""
+        state = self._sessions.get(session_id)
+        if state is None:
+            return None
+        summary = self._estimate(session_id, state)
+        minutes = int((state.last_ts - state.first_ts) // 60)
+        summary["duration"] = f"{minutes // 60}h {minutes % 60:02d}m"
+        summary["temp_range"] = f"{state.temp_min:.1f}°C – {state.temp_max:.1f}°C"
+        summary["started_at"] = datetime.fromtimestamp(state.first_ts, timezone.utc).date().isoformat()
+        return summary
+
+    def forget(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def _evict(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl_s
+        while self._sessions:
+            sid, state = next(iter(self._sessions.items()))
+            if state.touched >= cutoff:
+                break
+            del self._sessions[sid]
+            logger.info("Shelf-life tracking for idle session %s dropped (never closed)", sid)
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_tracker: Optional[ShelfLifeTracker] = None
+
+
+def get_shelf_life_tracker() -> ShelfLifeTracker:
+    global _tracker
+    if _tracker is None:
+        from ..config import get_settings
+
+        settings = get_settings()
+        _tracker = ShelfLifeTracker(
+            settings.shelf_life_reference_hours,
+            idle_ttl_s=settings.shelf_life_idle_h * 3600,
+        )
+    return _tracker
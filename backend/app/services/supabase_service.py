@@ -1,196 +1,426 @@
 """
 Supabase data layer — all DB operations go through this service.
 Falls back to in-memory defaults when tables are empty or unreachable.
+
+Every call runs under a per-operation deadline and a shared circuit breaker.
+While the breaker is open, reads are answered from the last-known-good
+result of the same query (or an empty result, which makes the routers use
+their defaults) without touching the network.
 """
+import asyncio
 import logging
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from postgrest.exceptions import APIError
 from supabase import Client
 
+from .circuit_breaker import CircuitBreaker
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_OP_TIMEOUT_S = 3.0
+_LAST_GOOD_MAX_ENTRIES = 256
+
+# Process-wide state shared by the per-request SupabaseService instances
+# (the breaker is database.get_db_breaker())
+_last_good: "OrderedDict[tuple, list]" = OrderedDict()
+
+# (column, op, value) predicate pushed down to PostgREST
+Filter = Tuple[str, str, Any]
+FILTER_OPS = ("eq", "neq", "gt", "gte", "lt", "lte", "in")
+
+
+def _apply_filters(q, filters: Optional[Sequence[Filter]]):
+    for column, op, value in filters or ():
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unsupported filter op: {op}")
+        q = q.in_(column, list(value)) if op == "in" else getattr(q, op)(column, value)
+    return q
+
+
+def _pg_quote(value) -> str:
+    """Quote a value for a PostgREST logic-tree filter (handles , . : in timestamps)."""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _keyset(q, keys: Sequence[str], before: Optional[Tuple]):
+    """Apply a descending ``(k1, k2) < before`` keyset predicate."""
+    if before is None:
+        return q
+    (k1, k2), (v1, v2) = keys, before
+    return q.or_(
+        f"{k1}.lt.{_pg_quote(v1)},and({k1}.eq.{_pg_quote(v1)},{k2}.lt.{_pg_quote(v2)})"
+    )
+
 
 class SupabaseService:
-    def __init__(self, client: Client):
+    def __init__(
+        self,
+        client: Client,
+        breaker: Optional[CircuitBreaker] = None,
+        op_timeout_s: float = DEFAULT_OP_TIMEOUT_S,
+    ):
+        if breaker is None:
+            from ..database import get_db_breaker
+
+            breaker = get_db_breaker()
         self.db = client
+        self.breaker = breaker
+        self.op_timeout_s = op_timeout_s
 
-    # ── Telemetry ──────────────────────────────────────────────────────────────
-    async def log_telemetry(self, data: dict) -> dict:
+    # ── Guarded execution ──────────────────────────────────────────────────────
+    async def _run(
+        self,
+        op: str,
+        query: Callable[[], Any],
+        cache_key: Optional[tuple] = None,
+        strict: bool = False,
+    ) -> List[dict]:
+        """
+        Execute ``query`` (a blocking PostgREST call returning a response) off the
+        event loop under the operation deadline. Returns the response rows, or the
+        last-known-good rows for ``cache_key`` / [] on failure or open breaker.
+        With ``strict`` a failure or open breaker raises instead.
+        """
+        if not self.breaker.allow():
+            if strict:
+                raise ConnectionError(f"{op}: database circuit open")
+            return self._fallback(op, cache_key)
         try:
-            res = self.db.table("telemetry_sessions").insert(data).execute()
-            return res.data[0] if res.data else {}
+            res = await asyncio.wait_for(
+                asyncio.to_thread(query), timeout=self.op_timeout_s
+            )
+        except APIError as exc:
+            # The database answered — a bad request is not an outage
+            self.breaker.record_success()
+            logger.error("%s error: %s", op, exc)
+            if strict:
+                raise
+            return []
         except Exception as exc:
-            logger.error("log_telemetry error: %s", exc)
-            return {}
+            if isinstance(exc, asyncio.TimeoutError):
+                exc = TimeoutError(f"no response within {self.op_timeout_s}s")
+            self.breaker.record_failure(f"{op}: {exc}")
+            logger.error("%s error: %s", op, exc)
+            if strict:
+                raise exc
+            return self._fallback(op, cache_key)
+        self.breaker.record_success()
+        rows = res.data or []
+        if cache_key is not None:
+            _last_good[cache_key] = rows
+            _last_good.move_to_end(cache_key)
+            while len(_last_good) > _LAST_GOOD_MAX_ENTRIES:
+                _last_good.popitem(last=False)
+        return rows
 
-    async def get_latest_telemetry(self, limit: int = 20) -> List[dict]:
-        try:
-            res = (
-                self.db.table("telemetry_sessions")
-                .select("*")
-                .order("created_at", desc=True)
+    async def _rpc(self, fn: str, params: dict, strict: bool = False) -> Any:
+        """Call a Postgres function through ``_run`` (same deadline and breaker accounting)."""
+        return await self._run(
+            f"rpc({fn})", lambda: self.db.rpc(fn, params).execute(), strict=strict
+        )
+
+    def _fallback(self, op: str, cache_key: Optional[tuple]) -> List[dict]:
+        if cache_key is not None and cache_key in _last_good:
+            logger.debug("%s served from last-known-good cache", op)
+            return _last_good[cache_key]
+        return []
+
+    # ── Generic reads ──────────────────────────────────────────────────────────
+    async def select(
+        self,
+        table: str,
+        filters: Optional[Sequence[Filter]] = None,
+        columns: str = "*",
+        order_by: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Filtered, projected read evaluated server-side so indexes apply."""
+        def query():
+            q = _apply_filters(self.db.table(table).select(columns), filters)
+            if order_by:
+                q = q.order(order_by, desc=desc)
+            if limit is not None:
+                q = q.limit(limit)
+            return q.execute()
+
+        key = ("select", table, repr(filters), columns, order_by, desc, limit)
+        return await self._run(f"select({table})", query, key)
+
+    async def select_one(
+        self,
+        table: str,
+        filters: Optional[Sequence[Filter]] = None,
+        columns: str = "*",
+    ) -> Optional[dict]:
+        """Single-row lookup; returns None when nothing matches."""
+        rows = await self.select(table, filters, columns=columns, limit=1)
+        return rows[0] if rows else None
+
+    async def bulk_insert(
+        self, table: str, rows: List[dict], conflict_col: Optional[str] = None
+    ) -> List[dict]:
+        """Insert (or upsert on ``conflict_col``) many rows in one request."""
+        if not rows:
+            return []
+
+        def query():
+            q = self.db.table(table)
+            if conflict_col:
+                return q.upsert(rows, on_conflict=conflict_col).execute()
+            return q.insert(rows).execute()
+
+        return await self._run(f"bulk_insert({table})", query)
+
+    # ── Telemetry ──────────────────────────────────────────────────────────────
+    async def log_telemetry(self, data: dict) -> dict:
+        rows = await self._run(
+            "log_telemetry",
+            lambda: self.db.table("telemetry_sessions").insert(data).execute(),
+        )
+        return rows[0] if rows else {}
+
+    async def get_latest_telemetry(
+        self,
+        limit: int = 20,
+        before: Optional[Tuple] = None,
+        session_id: Optional[str] = None,
+        strict: bool = False,
+    ) -> List[dict]:
+        """Newest first; ``before`` is a (created_at, id) keyset cursor; ``strict`` raises on failure."""
+        def query():
+            q = self.db.table("telemetry_sessions").select("*")
+            if session_id:
+                q = q.eq("session_id", session_id)
+            q = _keyset(q, ("created_at", "id"), before)
+            return (
+                q.order("created_at", desc=True)
+                .order("id", desc=True)
                 .limit(limit)
                 .execute()
             )
-            return res.data or []
-        except Exception as exc:
-            logger.error("get_latest_telemetry error: %s", exc)
-            return []
+
+        key = ("get_latest_telemetry", limit, before, session_id)
+        return await self._run("get_latest_telemetry", query, key, strict=strict)
+
+    async def get_latest_reading_per_session(self, since: str, strict: bool = False) -> List[dict]:
+        """Each session's newest reading at or after ``since`` (ISO timestamp)."""
+        return await self._rpc("latest_telemetry_per_session", {"since": since}, strict=strict)
+
+    async def merge_telemetry_rollups(self, rows: List[dict], batch_id: str) -> bool:
+        """Additively merge rollup deltas via the merge_telemetry_rollups() RPC (once per batch id)."""
+        if not rows:
+            return True
+        try:
+            # FALSE (batch already applied) is a success too
+            await self._rpc("merge_telemetry_rollups", {"batch": batch_id, "rows": rows}, strict=True)
+        except Exception:
+            return False
+        return True
+
+    async def delete_rolled_up_telemetry_before(self, cutoff: str) -> int:
+        """Delete raw rows older than ``cutoff`` in hours the hourly rollup fully covers."""
+        return int(await self._rpc("compact_telemetry", {"cutoff": cutoff}) or 0)
 
     # ── ML Predictions ─────────────────────────────────────────────────────────
     async def log_prediction(self, input_data: dict, result: dict) -> dict:
-        try:
-            record = {
-                "input_data": input_data,
-                "predicted_shelf_life": result.get("predicted_shelf_life_days"),
-                "recommended_center": result.get("recommended_center"),
-                "survival_margins": result.get("survival_margins"),
-                "stress_index": result.get("stress_index"),
-                "market_pivot_trigger": result.get("market_pivot_trigger"),
-            }
-            res = self.db.table("ml_predictions").insert(record).execute()
-            return res.data[0] if res.data else {}
-        except Exception as exc:
-            logger.error("log_prediction error: %s", exc)
-            return {}
+        record = {
+            "input_data": input_data,
+            "predicted_shelf_life": result.get("predicted_shelf_life_days"),
+            "recommended_center": result.get("recommended_center"),
+            "survival_margins": result.get("survival_margins"),
+            "stress_index": result.get("stress_index"),
+            "market_pivot_trigger": result.get("market_pivot_trigger"),
+        }
+        rows = await self._run(
+            "log_prediction",
+            lambda: self.db.table("ml_predictions").insert(record).execute(),
+        )
+        return rows[0] if rows else {}
 
     # ── Routes ─────────────────────────────────────────────────────────────────
     async def get_routes(self) -> List[dict]:
-        try:
-            res = self.db.table("routes").select("*").execute()
-            return res.data or []
-        except Exception as exc:
-            logger.error("get_routes error: %s", exc)
-            return []
+        return await self._run(
+            "get_routes",
+            lambda: self.db.table("routes").select("*").execute(),
+            ("get_routes",),
+        )
+
+    async def get_route(self, route_id: str) -> Optional[dict]:
+        return await self.select_one("routes", [("route_id", "eq", route_id)])
 
     async def upsert_route(self, route: dict) -> dict:
-        try:
-            res = self.db.table("routes").upsert(route).execute()
-            return res.data[0] if res.data else {}
-        except Exception as exc:
-            logger.error("upsert_route error: %s", exc)
-            return {}
+        rows = await self._run(
+            "upsert_route",
+            lambda: self.db.table("routes").upsert(route).execute(),
+        )
+        return rows[0] if rows else {}
 
     # ── Facilities ─────────────────────────────────────────────────────────────
     async def get_facilities(self) -> List[dict]:
-        try:
-            res = self.db.table("facilities").select("*").execute()
-            return res.data or []
-        except Exception as exc:
-            logger.error("get_facilities error: %s", exc)
-            return []
+        return await self._run(
+            "get_facilities",
+            lambda: self.db.table("facilities").select("*").execute(),
+            ("get_facilities",),
+        )
 
     async def update_facility(self, name: str, updates: dict) -> dict:
-        try:
-            res = (
+        rows = await self._run(
+            "update_facility",
+            lambda: (
                 self.db.table("facilities")
                 .update(updates)
                 .eq("name", name)
                 .execute()
-            )
-            return res.data[0] if res.data else {}
-        except Exception as exc:
-            logger.error("update_facility error: %s", exc)
-            return {}
+            ),
+        )
+        return rows[0] if rows else {}
 
     # ── Trip Logs ──────────────────────────────────────────────────────────────
-    async def get_trip_logs(self, limit: int = 50) -> List[dict]:
-        try:
-            res = (
-                self.db.table("trip_logs")
-                .select("*")
-                .order("date", desc=True)
+    async def get_trip_logs(
+        self,
+        limit: int = 50,
+        before: Optional[Tuple] = None,
+        status: Optional[str] = None,
+        strict: bool = False,
+    ) -> List[dict]:
+        """Newest first; ``before`` is a (date, id) keyset cursor; ``strict`` raises on failure."""
+        def query():
+            q = self.db.table("trip_logs").select("*")
+            if status:
+                q = q.eq("status", status)
+            q = _keyset(q, ("date", "id"), before)
+            return (
+                q.order("date", desc=True)
+                .order("id", desc=True)
                 .limit(limit)
                 .execute()
             )
-            return res.data or []
-        except Exception as exc:
-            logger.error("get_trip_logs error: %s", exc)
-            return []
+
+        key = ("get_trip_logs", limit, before, status)
+        return await self._run("get_trip_logs", query, key, strict=strict)
 
     async def add_trip_log(self, trip: dict) -> dict:
-        try:
-            res = self.db.table("trip_logs").insert(trip).execute()
-            return res.data[0] if res.data else {}
-        except Exception as exc:
-            logger.error("add_trip_log error: %s", exc)
-            return {}
+        rows = await self._run(
+            "add_trip_log",
+            lambda: self.db.table("trip_logs").insert(trip).execute(),
+        )
+        return rows[0] if rows else {}
 
     # ── Rescue Points ──────────────────────────────────────────────────────────
     async def get_rescue_points(self, available_only: bool = False) -> List[dict]:
-        try:
+        def query():
             q = self.db.table("rescue_points").select("*")
             if available_only:
                 q = q.eq("available", True)
-            res = q.order("recovery_chance", desc=True).execute()
-            return res.data or []
-        except Exception as exc:
-            logger.error("get_rescue_points error: %s", exc)
-            return []
+            return q.order("recovery_chance", desc=True).execute()
+
+        key = ("get_rescue_points", available_only)
+        return await self._run("get_rescue_points", query, key)
+
+    async def update_rescue_point(self, name: str, updates: dict) -> dict:
+        rows = await self._run(
+            "update_rescue_point",
+            lambda: (
+                self.db.table("rescue_points")
+                .update(updates)
+                .eq("name", name)
+                .execute()
+            ),
+        )
+        return rows[0] if rows else {}
 
     # ── AI Recommendations ─────────────────────────────────────────────────────
     async def save_recommendation(self, rec: dict) -> dict:
-        try:
-            res = self.db.table("ai_recommendations").insert(rec).execute()
-            return res.data[0] if res.data else {}
-        except Exception as exc:
-            logger.error("save_recommendation error: %s", exc)
-            return {}
+        rows = await self._run(
+            "save_recommendation",
+            lambda: self.db.table("ai_recommendations").insert(rec).execute(),
+        )
+        return rows[0] if rows else {}
 
-    async def get_recommendations(self, limit: int = 20) -> List[dict]:
-        try:
-            res = (
-                self.db.table("ai_recommendations")
-                .select("*")
-                .order("created_at", desc=True)
+    async def get_recommendations(
+        self, limit: int = 20, before: Optional[Tuple] = None, strict: bool = False
+    ) -> List[dict]:
+        """Newest first; ``before`` is a (created_at, id) keyset cursor; ``strict`` raises on failure."""
+        def query():
+            q = _keyset(
+                self.db.table("ai_recommendations").select("*"),
+                ("created_at", "id"),
+                before,
+            )
+            return (
+                q.order("created_at", desc=True)
+                .order("id", desc=True)
                 .limit(limit)
                 .execute()
             )
-            return res.data or []
-        except Exception as exc:
-            logger.error("get_recommendations error: %s", exc)
-            return []
+
+        key = ("get_recommendations", limit, before)
+        return await self._run("get_recommendations", query, key, strict=strict)
 
     async def update_recommendation_status(self, rec_id: str, status: str) -> dict:
-        try:
-            res = (
+        rows = await self._run(
+            "update_recommendation_status",
+            lambda: (
                 self.db.table("ai_recommendations")
                 .update({"status": status, "resolved_at": datetime.utcnow().isoformat()})
                 .eq("rec_id", rec_id)
                 .execute()
-            )
-            return res.data[0] if res.data else {}
-        except Exception as exc:
-            logger.error("update_recommendation_status error: %s", exc)
-            return {}
+            ),
+        )
+        return rows[0] if rows else {}
 
     # ── Agent Conversations ────────────────────────────────────────────────────
     async def save_conversation_turn(
         self, session_id: str, role: str, content: str
     ) -> dict:
-        try:
-            res = (
+        rows = await self._run(
+            "save_conversation_turn",
+            lambda: (
                 self.db.table("agent_conversations")
                 .insert(
                     {"session_id": session_id, "role": role, "content": content}
                 )
                 .execute()
-            )
-            return res.data[0] if res.data else {}
-        except Exception as exc:
-            logger.error("save_conversation_turn error: %s", exc)
-            return {}
+            ),
+        )
+        return rows[0] if rows else {}
 
-    async def get_conversation_history(self, session_id: str) -> List[dict]:
-        try:
-            res = (
+    async def save_conversation_turns(self, rows: List[dict]) -> int:
+        """Bulk upsert (on id) of transcript rows in one request; returns rows written."""
+        if not rows:
+            return 0
+        written = await self._run(
+            "save_conversation_turns",
+            lambda: self.db.table("agent_conversations").upsert(rows, on_conflict="id").execute(),
+        )
+        return len(written)
+
+    async def get_conversation_history(
+        self, session_id: str, limit: Optional[int] = None, include_tools: bool = False
+    ) -> List[dict]:
+        """Turns oldest-first; with ``limit`` only the most recent ``limit``."""
+
+        def query():
+            q = (
                 self.db.table("agent_conversations")
                 .select("*")
                 .eq("session_id", session_id)
-                .order("created_at")
-                .execute()
             )
-            return res.data or []
-        except Exception as exc:
-            logger.error("get_conversation_history error: %s", exc)
-            return []
+            if not include_tools:
+                q = q.neq("role", "tool")
+            if limit is None:
+                return q.order("created_at").order("seq").execute()
+            return (
+                q.order("created_at", desc=True).order("seq", desc=True).limit(limit).execute()
+            )
+
+        rows = await self._run(
+            "get_conversation_history",
+            query,
+            ("get_conversation_history", session_id, limit, include_tools),
+        )
+        return rows if limit is None else rows[::-1]
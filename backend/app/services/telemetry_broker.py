@@ -0,0 +1,134 @@
+"""
+In-process pub/sub broker for the telemetry SSE stream.
+
+Ingest publishes each event once: it is serialised a single time, stamped with
+a monotonically increasing id, kept in a bounded replay buffer and pushed to
+every matching subscriber's bounded queue. A subscriber that falls behind
+loses its oldest queued events (and its drop counter goes up) instead of
+slowing ingest or growing memory. Clients reconnecting with Last-Event-ID
+are replayed whatever is still in the buffer after that id.
+"""
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (event_id, event_name, session_id, serialised data)
+Event = Tuple[int, str, Optional[str], str]
+
+
+class Subscription:
+    __slots__ = ("queue", "session_ids", "dropped")
+
+    def __init__(self, maxsize: int, session_ids: Optional[Set[str]]):
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=maxsize)
+        self.session_ids = session_ids
+        self.dropped = 0
+
+    def offer(self, event: Event) -> None:
+        """Enqueue without blocking; on overflow drop the oldest queued event."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.queue.put_nowait(event)
+            self.dropped += 1
+
+
+class TelemetryBroker:
+    def __init__(self, queue_size: int = 256, replay_size: int = 2048):
+        self.queue_size = queue_size
+        self._replay: Deque[Event] = deque(maxlen=replay_size)
+        self._next_id = 1
+        self._all: Set[Subscription] = set()
+        self._by_session: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+
+    # ── Ingest stage ───────────────────────────────────────────────────────────
+    async def __call__(self, record: dict, result: dict, svc) -> None:
+        self.publish("telemetry", record, session_id=record.get("session_id"))
+
+    # ── Publishing ─────────────────────────────────────────────────────────────
+    def publish(self, event: str, data: dict, session_id: Optional[str] = None) -> int:
+        event_id = self._next_id
+        self._next_id += 1
+        item: Event = (event_id, event, session_id, json.dumps(data, default=str))
+        self._replay.append(item)
+        self.published += 1
+        for sub in self._all:
+            sub.offer(item)
+        if session_id is not None:
+            for sub in self._by_session.get(session_id, ()):
+                sub.offer(item)
+        return event_id
+
+    # ── Subscribing ────────────────────────────────────────────────────────────
+    def subscribe(
+        self,
+        session_ids: Optional[Iterable[str]] = None,
+        last_event_id: Optional[int] = None,
+    ) -> Subscription:
+        wanted = set(session_ids) if session_ids else None
+        sub = Subscription(self.queue_size, wanted)
+        if last_event_id is not None:
+            for item in self._replay:
+                if item[0] > last_event_id and (wanted is None or item[2] in wanted):
+                    sub.offer(item)
+        if wanted is None:
+            self._all.add(sub)
+        else:
+            for sid in wanted:
+                self._by_session.setdefault(sid, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        if sub.session_ids is None:
+            self._all.discard(sub)
+            return
+        for sid in sub.session_ids:
+            subs = self._by_session.get(sid)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_session[sid]
+
+    async def stream(self, sub: Subscription) -> AsyncIterator[dict]:
+        """SSE-ready events for one subscriber; unsubscribes when the client leaves."""
+        try:
+            while True:
+                event_id, event, _sid, data = await sub.queue.get()
+                yield {"id": str(event_id), "event": event, "data": data}
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self) -> dict:
+        filtered = {s for subs in self._by_session.values() for s in subs}
+        return {
+            "subscribers": len(self._all) + len(filtered),
+            "published": self.published,
+            "last_event_id": self._next_id - 1,
+            "replay_buffered": len(self._replay),
+        }
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_broker: Optional[TelemetryBroker] = None
+
+
+def get_telemetry_broker() -> TelemetryBroker:
+    global _broker
+    if _broker is None:
+        from ..config import get_settings
+
+        settings = get_settings()
+        _broker = TelemetryBroker(
+            queue_size=settings.telemetry_stream_queue_size,
+            replay_size=settings.telemetry_stream_replay_size,
+        )
+    return _broker
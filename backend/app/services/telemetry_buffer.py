@@ -0,0 +1,219 @@
+"""
+Per-session telemetry ring buffers — answer "latest N" and "last few minutes"
+queries from memory instead of the database.
+
+Each session owns a fixed-size NumPy ring (timestamps + one float column per
+field), filled by the ingest pipeline. The store enforces a global memory cap
+by evicting the least recently written session, and drops sessions that have
+been idle longer than ``idle_ttl_s``.
+"""
+import time
+import warnings
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+FIELDS = (
+    "temperature",
+    "humidity",
+    "vibration",
+    "ethylene",
+    "co2",
+    "battery_level",
+    "signal_strength",
+    "door_open",
+)
+_FIELD_INDEX = {f: i for i, f in enumerate(FIELDS)}
+
+
+def _epoch(value) -> float:
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class SessionRingBuffer:
+    __slots__ = ("capacity", "ts", "values", "head", "size", "last_write")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.values = np.full((capacity, len(FIELDS)), np.nan, dtype=np.float64)
+        self.head = 0  # next write position
+        self.size = 0
+        self.last_write = time.monotonic()
+
+    @staticmethod
+    def nbytes_for(capacity: int) -> int:
+        return capacity * 8 * (1 + len(FIELDS))
+
+    def append(self, ts: float, row: np.ndarray) -> None:
+        self.ts[self.head] = ts
+        self.values[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.last_write = time.monotonic()
+
+    def _order(self, n: int) -> np.ndarray:
+        """Indices of the newest ``n`` samples, newest first."""
+        n = min(n, self.size)
+        return (self.head - 1 - np.arange(n)) % self.capacity
+
+    def latest(self, n: int):
+        idx = self._order(n)
+        return self.ts[idx], self.values[idx]
+
+    def since(self, cutoff_ts: float):
+        idx = self._order(self.size)
+        mask = self.ts[idx] >= cutoff_ts
+        return self.ts[idx][mask], self.values[idx][mask]
+
+
+def _row_to_dict(ts: float, row: np.ndarray) -> dict:
+    out = {"created_at": datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()}
+    for name, v in zip(FIELDS, row):
+        out[name] = None if np.isnan(v) else float(v)
+    out["door_status"] = "open" if out.pop("door_open") else "closed"
+    return out
+
+
+class TelemetryBufferStore:
+    """Process-wide map of session_id → ring buffer with a memory cap."""
+
+    def __init__(
+        self,
+        capacity: int = 600,
+        max_bytes: int = 64 * 1024 * 1024,
+        idle_ttl_s: float = 1800.0,
+    ):
+        self.capacity = max(1, capacity)
+        self.max_bytes = max_bytes
+        self.idle_ttl_s = idle_ttl_s
+        self.max_sessions = max(1, max_bytes // SessionRingBuffer.nbytes_for(self.capacity))
+        self._buffers: "OrderedDict[str, SessionRingBuffer]" = OrderedDict()
+        self.evictions = 0
+
+    # ── Ingest stage ───────────────────────────────────────────────────────────
+    async def __call__(self, record: dict, result: dict, svc) -> None:
+        self.append(record)
+
+    def append(self, record: dict) -> None:
+        session_id = record.get("session_id")
+        if not session_id:
+            return
+        buf = self._buffers.get(session_id)
+        if buf is None:
+            self.evict_idle()
+            while len(self._buffers) >= self.max_sessions:
+                self._buffers.popitem(last=False)
+                self.evictions += 1
+            buf = self._buffers[session_id] = SessionRingBuffer(self.capacity)
+        else:
+            self._buffers.move_to_end(session_id)
+        row = np.array(
+            [
+                np.nan if record.get(f) is None else float(record[f])
+                for f in FIELDS[:-1]
+            ]
+            + [1.0 if record.get("door_status") == "open" else 0.0],
+            dtype=np.float64,
+        )
+        buf.append(_epoch(record.get("created_at")), row)
+
+    def evict_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_ttl_s
+        stale = [sid for sid, b in self._buffers.items() if b.last_write < cutoff]
+        for sid in stale:
+            del self._buffers[sid]
+        self.evictions += len(stale)
+        return len(stale)
+
+    # ── Queries ────────────────────────────────────────────────────────────────
+    def has(self, session_id: str) -> bool:
+        return session_id in self._buffers
+
+    def latest(self, session_id: str, n: int = 20) -> List[dict]:
+        buf = self._buffers.get(session_id)
+        if buf is None:
+            return []
+        ts, values = buf.latest(n)
+        return [_row_to_dict(t, v) for t, v in zip(ts, values)]
+
+    def latest_reading(self, session_id: str) -> Optional[dict]:
+        rows = self.latest(session_id, 1)
+        return rows[0] if rows else None
+
+    def window_stats(self, session_id: str, window_s: float = 300.0) -> Optional[dict]:
+        """min/max/mean/std and rate of change (per minute) over the last ``window_s``."""
+        buf = self._buffers.get(session_id)
+        if buf is None:
+            return None
+        ts, values = buf.since(time.time() - window_s)
+        stats: Dict[str, dict] = {}
+        if len(ts):
+            span_min = (ts[0] - ts[-1]) / 60.0  # newest first
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                mins = np.nanmin(values, axis=0)
+                maxs = np.nanmax(values, axis=0)
+                means = np.nanmean(values, axis=0)
+                stds = np.nanstd(values, axis=0)
+            slopes = (values[0] - values[-1]) / span_min if span_min > 0 else np.zeros(len(FIELDS))
+            for name, i in _FIELD_INDEX.items():
+                stats[name] = {
+                    "min": _f(mins[i]),
+                    "max": _f(maxs[i]),
+                    "mean": _f(means[i]),
+                    "std": _f(stds[i]),
+                    "rate_per_min": _f(slopes[i]),
+                }
+        return {
+            "session_id": session_id,
+            "window_s": window_s,
+            "count": int(len(ts)),
+            "fields": stats,
+        }
+
+    def session_ids(self) -> List[str]:
+        return list(self._buffers)
+
+    def stats(self) -> dict:
+        per = SessionRingBuffer.nbytes_for(self.capacity)
+        return {
+            "sessions": len(self._buffers),
+            "max_sessions": self.max_sessions,
+            "capacity_per_session": self.capacity,
+            "bytes_used": per * len(self._buffers),
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+def _f(v) -> Optional[float]:
+    v = float(v)
+    return None if np.isnan(v) else round(v, 4)
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_buffers: Optional[TelemetryBufferStore] = None
+
+
+def get_telemetry_buffers() -> TelemetryBufferStore:
+    global _buffers
+    if _buffers is None:
+        from ..config import get_settings
+
+        settings = get_settings()
+        _buffers = TelemetryBufferStore(
+            capacity=settings.telemetry_buffer_capacity,
+            max_bytes=int(settings.telemetry_buffer_max_mb * 1024 * 1024),
+            idle_ttl_s=settings.telemetry_buffer_idle_s,
+        )
+    return _buffers
@@ -0,0 +1,193 @@
+"""
+Compact binary encoding for TelemetryInput batches (WebSocket channel).
+
+Frame layout (little-endian):
+
+    header   <BBHqB   magic 0xAE, kind, count, base_ts_ms, session_id length
+    session  utf-8 bytes (may be empty → connection default)
+    body     kind 1 (absolute): ``count`` × RECORD_DTYPE            (17 B each)
+             kind 2 (delta):    1 × RECORD_DTYPE, then
+                                ``count - 1`` × DELTA_DTYPE           (10 B each)
+
+Values are fixed-point integers (see SCALES). In a delta frame every record
+after the first stores the int8 difference from the previous one; the flags
+byte is always absolute. Decoding is a single ``np.frombuffer`` plus a
+``cumsum`` per frame — no per-field Python work.
+"""
+import struct
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import numpy as np
+
+MAGIC = 0xAE
+KIND_ABSOLUTE = 1
+KIND_DELTA = 2
+
+_HEADER = struct.Struct("<BBHqB")
+
+# Scaled numeric fields in wire order, with their fixed-point scale
+SCALES = (
+    ("temperature", 100),   # centi-°C
+    ("humidity", 100),      # centi-%
+    ("vibration", 1000),    # milli-G
+    ("ethylene", 10),       # deci-ppm
+    ("co2", 1),             # ppm
+    ("battery_level", 1),
+    ("signal_strength", 1),
+)
+_FLAG_DOOR_OPEN = 0x01
+# TelemetryInput defaults for fields a gateway may omit
+_DEFAULTS = {"ethylene": 12.0, "co2": 450.0, "battery_level": 100, "signal_strength": 100}
+
+RECORD_DTYPE = np.dtype([
+    ("dt_ms", "<u4"),
+    ("temperature", "<i2"),
+    ("humidity", "<u2"),
+    ("vibration", "<u2"),
+    ("ethylene", "<u2"),
+    ("co2", "<u2"),
+    ("battery_level", "u1"),
+    ("signal_strength", "u1"),
+    ("flags", "u1"),
+])
+DELTA_DTYPE = np.dtype([
+    ("dt_ms", "<u2"),
+    ("temperature", "i1"),
+    ("humidity", "i1"),
+    ("vibration", "i1"),
+    ("ethylene", "i1"),
+    ("co2", "i1"),
+    ("battery_level", "i1"),
+    ("signal_strength", "i1"),
+    ("flags", "u1"),
+])
+
+# Same bounds as TelemetryInput, applied to the decoded columns
+_BOUNDS = {
+    "temperature": (-10, 60),
+    "humidity": (0, 100),
+    "vibration": (0, 5),
+    "battery_level": (0, 100),
+    "signal_strength": (0, 100),
+}
+
+_COLUMNS = ("dt_ms",) + tuple(name for name, _ in SCALES)
+
+
+class FrameError(ValueError):
+    """Malformed or out-of-range binary frame."""
+
+
+def decode_frame(frame: bytes, default_session: Optional[str] = None) -> List[dict]:
+    """Decode one binary frame into TelemetryInput-shaped dicts (plus created_at)."""
+    if len(frame) < _HEADER.size:
+        raise FrameError("frame shorter than header")
+    magic, kind, count, base_ts_ms, sid_len = _HEADER.unpack_from(frame)
+    if magic != MAGIC:
+        raise FrameError("bad magic byte")
+    offset = _HEADER.size
+    session_id = frame[offset:offset + sid_len].decode() or default_session
+    offset += sid_len
+    if count == 0:
+        return []
+
+    first = np.frombuffer(frame, dtype=RECORD_DTYPE, count=1, offset=offset)
+    offset += RECORD_DTYPE.itemsize
+    if kind == KIND_ABSOLUTE:
+        rest = np.frombuffer(frame, dtype=RECORD_DTYPE, count=count - 1, offset=offset)
+        offset += RECORD_DTYPE.itemsize * (count - 1)
+        ints = np.column_stack(
+            [np.concatenate([first[c], rest[c]]).astype(np.int64) for c in _COLUMNS]
+        )
+        flags = np.concatenate([first["flags"], rest["flags"]])
+    elif kind == KIND_DELTA:
+        deltas = np.frombuffer(frame, dtype=DELTA_DTYPE, count=count - 1, offset=offset)
+        offset += DELTA_DTYPE.itemsize * (count - 1)
+        ints = np.cumsum(
+            np.column_stack(
+                [np.concatenate([first[c].astype(np.int64), deltas[c].astype(np.int64)])
+                 for c in _COLUMNS]
+            ),
+            axis=0,
+        )
+        flags = np.concatenate([first["flags"], deltas["flags"]])
+    else:
+        raise FrameError(f"unknown frame kind {kind}")
+    if offset != len(frame):
+        raise FrameError("frame length does not match record count")
+
+    scales = np.array([1.0] + [float(s) for _, s in SCALES])
+    values = ints / scales
+    for name, (lo, hi) in _BOUNDS.items():
+        col = values[:, _COLUMNS.index(name)]
+        if col.min() < lo or col.max() > hi:
+            raise FrameError(f"{name} out of range [{lo}, {hi}]")
+
+    ts_ms = base_ts_ms + ints[:, 0]
+    created = [
+        datetime.fromtimestamp(t / 1000.0, tz=timezone.utc).isoformat()
+        for t in ts_ms.tolist()
+    ]
+    door = np.where(flags & _FLAG_DOOR_OPEN, "open", "closed").tolist()
+    names = _COLUMNS[1:]
+    out = []
+    for row, ts, d in zip(values[:, 1:].tolist(), created, door):
+        rec = dict(zip(names, row))
+        rec["battery_level"] = int(rec["battery_level"])
+        rec["signal_strength"] = int(rec["signal_strength"])
+        rec["door_status"] = d
+        rec["session_id"] = session_id
+        rec["created_at"] = ts
+        out.append(rec)
+    return out
+
+
+def encode_batch(
+    readings: List[dict], session_id: str = "", base_ts_ms: Optional[int] = None
+) -> bytes:
+    """
+    Reference encoder (what a truck gateway sends). ``readings`` carry the
+    TelemetryInput fields and an optional ``ts_ms``; ``base_ts_ms`` defaults
+    to the earliest of them. Uses a delta frame when every step fits in
+    int8, otherwise an absolute frame. Raises ``ValueError`` when a reading
+    predates ``base_ts_ms`` or a value does not fit its wire field.
+    """
+    n = len(readings)
+    if base_ts_ms is None:
+        stamps = [int(r["ts_ms"]) for r in readings if r.get("ts_ms") is not None]
+        base_ts_ms = min(stamps) if stamps else int(datetime.now(timezone.utc).timestamp() * 1000)
+    ints = np.zeros((n, len(_COLUMNS)), dtype=np.int64)
+    flags = np.zeros(n, dtype=np.uint8)
+    for i, r in enumerate(readings):
+        ints[i, 0] = int(r.get("ts_ms", base_ts_ms)) - base_ts_ms
+        for j, (name, scale) in enumerate(SCALES, start=1):
+            ints[i, j] = int(round(float(r.get(name, _DEFAULTS.get(name, 0))) * scale))
+        flags[i] = _FLAG_DOOR_OPEN if r.get("door_status") == "open" else 0
+    if n:
+        for j, c in enumerate(_COLUMNS):
+            info = np.iinfo(RECORD_DTYPE[c])
+            if ints[:, j].min() < info.min or ints[:, j].max() > info.max:
+                raise ValueError(f"{c} does not fit {RECORD_DTYPE[c].str} (base_ts_ms={base_ts_ms})")
+
+    sid = session_id.encode()
+    diffs = np.diff(ints, axis=0)
+    use_delta = n > 1 and (
+        diffs[:, 1:].min(initial=0) >= -128 and diffs[:, 1:].max(initial=0) <= 127
+        and diffs[:, 0].min(initial=0) >= 0 and diffs[:, 0].max(initial=0) <= 0xFFFF
+    )
+    header = _HEADER.pack(MAGIC, KIND_DELTA if use_delta else KIND_ABSOLUTE, n, base_ts_ms, len(sid))
+    if n == 0:
+        return header + sid
+
+    def pack(dtype, rows, flag_rows):
+        arr = np.zeros(len(rows), dtype=dtype)
+        for j, c in enumerate(_COLUMNS):
+            arr[c] = rows[:, j]
+        arr["flags"] = flag_rows
+        return arr.tobytes()
+
+    body = pack(RECORD_DTYPE, ints[:1], flags[:1])
+    body += pack(DELTA_DTYPE, diffs, flags[1:]) if use_delta else pack(RECORD_DTYPE, ints[1:], flags[1:])
+    return header + sid + body
+
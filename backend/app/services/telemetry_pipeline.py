@@ -0,0 +1,97 @@
+"""
+Telemetry ingest pipeline — one entry point for every reading, whatever the
+transport. The reading is persisted first, then each registered in-process
+stage sees the stored record. Stages must be cheap (memory only) or hand work
+off to a background task; a failing stage is logged and never fails ingest.
+
+A stage may also define ``batch(records, results, svc)``. ``ingest_batch``
+then hands it the whole batch in one call (so it can amortise work such as
+model inference); other stages still see the readings one by one, in order.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# stage(record, result, svc) — may add keys to ``result`` for the caller
+Stage = Callable[[dict, dict, object], Awaitable[None]]
+
+
+class TelemetryPipeline:
+    def __init__(self):
+        self._stages: List[Stage] = []
+
+    def add_stage(self, stage: Stage) -> None:
+        self._stages.append(stage)
+
+    async def ingest(self, data: dict, svc) -> dict:
+        saved = await svc.log_telemetry(data)
+        return await self._run_stages(data, saved, svc)
+
+    async def ingest_batch(self, rows: List[dict], svc) -> List[dict]:
+        """Persist many readings in one insert, then run each stage over the batch."""
+        if not rows:
+            return []
+        saved = await svc.bulk_insert("telemetry_sessions", rows)
+        if len(saved) != len(rows):
+            saved = [{} for _ in rows]
+        records = [_record(d, s) for d, s in zip(rows, saved)]
+        results = [{"record": s} for s in saved]
+        for stage in self._stages:
+            batch = getattr(stage, "batch", None)
+            if batch is not None:
+                await _guarded(stage, batch(records, results, svc))
+                continue
+            for record, result in zip(records, results):
+                await _guarded(stage, stage(record, result, svc))
+        return results
+
+    async def _run_stages(self, data: dict, saved: dict, svc) -> dict:
+        record = _record(data, saved)
+        result = {"record": saved}
+        for stage in self._stages:
+            await _guarded(stage, stage(record, result, svc))
+        return result
+
+
+def _record(data: dict, saved: dict) -> dict:
+    record = {**data, **saved}
+    if not record.get("created_at"):
+        record["created_at"] = datetime.now(timezone.utc).isoformat()
+    return record
+
+
+async def _guarded(stage: Stage, call: Awaitable[None]) -> None:
+    try:
+        await call
+    except Exception as exc:
+        logger.error("Telemetry stage %s failed: %s", _stage_name(stage), exc)
+
+
+def _stage_name(stage: Stage) -> str:
+    return getattr(stage, "__name__", type(stage).__name__)
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_pipeline: Optional[TelemetryPipeline] = None
+
+
+def get_telemetry_pipeline() -> TelemetryPipeline:
+    global _pipeline
+    if _pipeline is None:
+        from .fleet_risk import get_fleet_risk_cache
+        from .risk_tracker import get_risk_tracker
+        from .shelf_life_tracker import get_shelf_life_tracker
+        from .telemetry_broker import get_telemetry_broker
+        from .telemetry_buffer import get_telemetry_buffers
+        from .telemetry_rollup import get_telemetry_rollup
+
+        _pipeline = TelemetryPipeline()
+        _pipeline.add_stage(get_telemetry_rollup())
+        _pipeline.add_stage(get_telemetry_buffers())
+        _pipeline.add_stage(get_telemetry_broker())
+        _pipeline.add_stage(get_risk_tracker())
+        _pipeline.add_stage(get_shelf_life_tracker())
+        _pipeline.add_stage(get_fleet_risk_cache())
+    return _pipeline
@@ -0,0 +1,201 @@
+"""
+Telemetry rollups — per-session min/max/mean aggregates at several resolutions.
+
+Readings are folded into in-memory *delta* buckets at ingest (O(1) per
+reading). ``flush`` merges the deltas into ``telemetry_rollups`` additively
+(count and sums add, min/max combine) and a crash loses at most one flush
+interval. Each flushed batch carries an id that the merge records and
+dedupes on: a batch whose write timed out after the database committed it
+is retried with the same id and not counted twice. Range queries read the
+aggregates plus the not-yet-flushed deltas, never the raw rows.
+
+``compact`` flushes and then deletes raw readings older than the retention
+window, but only in hourly buckets whose rollup row already counts at least
+as many readings — rows from before rollups existed, or that the rollup
+missed, are kept.
+"""
+import logging
+import math
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("temperature", "humidity", "vibration", "ethylene", "co2")
+RESOLUTIONS_S = (60, 3600, 86400)
+
+BucketKey = Tuple[str, int, str]  # (session_id, resolution_s, bucket_start)
+
+
+def _parse_ts(value) -> datetime:
+    if isinstance(value, datetime):
+        ts = value
+    else:
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def bucket_start(ts: datetime, resolution_s: int) -> str:
+    epoch = math.floor(ts.timestamp() / resolution_s) * resolution_s
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+def _empty_row(key: BucketKey) -> dict:
+    session_id, resolution_s, start = key
+    row = {
+        "session_id": session_id,
+        "resolution_s": resolution_s,
+        "bucket_start": start,
+        "sample_count": 0,
+    }
+    for m in METRICS:
+        row[f"{m}_min"] = None
+        row[f"{m}_max"] = None
+        row[f"{m}_sum"] = 0.0
+    return row
+
+
+def _key(row: dict) -> BucketKey:
+    return (row["session_id"], row["resolution_s"], row["bucket_start"])
+
+
+def merge_rows(into: dict, other: dict) -> dict:
+    """Combine two aggregate rows for the same bucket (the DB does the same)."""
+    into["sample_count"] += other["sample_count"]
+    for m in METRICS:
+        for suffix, pick in (("_min", min), ("_max", max)):
+            a, b = into[m + suffix], other[m + suffix]
+            into[m + suffix] = b if a is None else a if b is None else pick(a, b)
+        into[f"{m}_sum"] = (into[f"{m}_sum"] or 0.0) + (other[f"{m}_sum"] or 0.0)
+    return into
+
+
+def summarize(row: dict) -> dict:
+    """Public shape of one bucket: count plus min/max/mean per metric."""
+    n = row["sample_count"]
+    out = {
+        "session_id": row["session_id"] or None,
+        "resolution_s": row["resolution_s"],
+        "bucket_start": row["bucket_start"],
+        "count": n,
+    }
+    for m in METRICS:
+        out[m] = {
+            "min": row[f"{m}_min"],
+            "max": row[f"{m}_max"],
+            "mean": round(row[f"{m}_sum"] / n, 4) if n else None,
+        }
+    return out
+
+
+class TelemetryRollup:
+    """Ingest stage that maintains rollup deltas and flushes them to the DB."""
+
+    def __init__(self, resolutions_s=RESOLUTIONS_S, max_unsent_batches: int = 1000):
+        self.resolutions_s = tuple(sorted(resolutions_s))
+        self._pending: Dict[BucketKey, dict] = {}
+        # Flushed but not acknowledged: (batch id, rows), retried in order as-is
+        self._unsent: Deque[Tuple[str, List[dict]]] = deque()
+        self.max_unsent_batches = max_unsent_batches
+        self.dropped_batches = 0
+
+    # ── Ingest stage ───────────────────────────────────────────────────────────
+    async def __call__(self, record: dict, result: dict, svc) -> None:
+        self.add(record)
+
+    def add(self, record: dict) -> None:
+        ts = _parse_ts(record["created_at"])
+        session_id = record.get("session_id") or ""
+        for res in self.resolutions_s:
+            key = (session_id, res, bucket_start(ts, res))
+            row = self._pending.get(key)
+            if row is None:
+                row = self._pending[key] = _empty_row(key)
+            row["sample_count"] += 1
+            for m in METRICS:
+                v = record.get(m)
+                if v is None:
+                    continue
+                v = float(v)
+                lo, hi = row[f"{m}_min"], row[f"{m}_max"]
+                row[f"{m}_min"] = v if lo is None else min(lo, v)
+                row[f"{m}_max"] = v if hi is None else max(hi, v)
+                row[f"{m}_sum"] += v
+
+    # ── Persistence ────────────────────────────────────────────────────────────
+    async def flush(self, svc) -> int:
+        """
+        Merge pending deltas into the DB; returns buckets written. A failed
+        batch is kept unchanged (never merged with newer deltas) and resent
+        with its id, so a retry of a batch that did commit is a no-op.
+        """
+        if self._pending:
+            self._unsent.append((uuid.uuid4().hex, list(self._pending.values())))
+            self._pending = {}
+            while len(self._unsent) > self.max_unsent_batches:
+                _, rows = self._unsent.popleft()
+                self.dropped_batches += 1
+                logger.error("Rollup backlog full — dropped a batch of %d buckets", len(rows))
+        written = 0
+        while self._unsent:
+            batch_id, rows = self._unsent[0]
+            if not await svc.merge_telemetry_rollups(rows, batch_id):
+                logger.warning("Rollup flush failed; %d batches kept for retry", len(self._unsent))
+                break
+            self._unsent.popleft()
+            written += len(rows)
+        return written
+
+    async def compact(self, svc, retention_s: float) -> int:
+        """Flush, then drop rolled-up raw readings older than ``retention_s``."""
+        await self.flush(svc)
+        if self._pending or self._unsent:
+            return 0  # never delete raw rows whose aggregates are not stored
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=retention_s)
+        return await svc.delete_rolled_up_telemetry_before(cutoff.isoformat())
+
+    # ── Queries ────────────────────────────────────────────────────────────────
+    async def query(
+        self,
+        svc,
+        resolution_s: int,
+        start: datetime,
+        end: datetime,
+        session_id: Optional[str] = None,
+    ) -> List[dict]:
+        lo = bucket_start(start, resolution_s)
+        filters = [
+            ("resolution_s", "eq", resolution_s),
+            ("bucket_start", "gte", lo),
+            ("bucket_start", "lt", end.isoformat()),
+        ]
+        if session_id is not None:
+            filters.append(("session_id", "eq", session_id))
+        rows = await svc.select("telemetry_rollups", filters, order_by="bucket_start")
+
+        merged: Dict[BucketKey, dict] = {}
+        for row in rows:
+            key = (row["session_id"], row["resolution_s"], _parse_ts(row["bucket_start"]).isoformat())
+            merged[key] = merge_rows(_empty_row(key), row)
+        unflushed = [(_key(row), row) for _, rows in self._unsent for row in rows]
+        for key, row in unflushed + list(self._pending.items()):
+            sid, res, start_iso = key
+            if res != resolution_s or not (lo <= start_iso < end.isoformat()):
+                continue
+            if session_id is not None and sid != session_id:
+                continue
+            merged[key] = merge_rows(merged.get(key) or _empty_row(key), row)
+        return [summarize(merged[k]) for k in sorted(merged, key=lambda k: (k[2], k[0]))]
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_rollup: Optional[TelemetryRollup] = None
+
+
+def get_telemetry_rollup() -> TelemetryRollup:
+    global _rollup
+    if _rollup is None:
+        _rollup = TelemetryRollup()
+    return _rollup
@@ -0,0 +1,207 @@
+"""
+Background, batched persistence of agent transcripts.
+
+An agent turn used to end with two awaited ``save_conversation_turn``
+inserts and dropped its tool calls. Now the turn hands its whole
+transcript — the user message, every tool call with its arguments,
+result and timing, and the assistant reply — to ``enqueue``, which returns
+immediately. A single writer task drains the buffer with one bulk
+``save_conversation_turns`` insert per ``flush_interval_s`` (sooner once
+``max_batch`` rows are waiting).
+
+Rows of one turn share a ``turn_id`` and are ordered by ``seq``, which is
+what the replay endpoint groups on. Every row gets its ``id`` when buffered
+and is upserted on it, so retrying a batch whose write did land (e.g. a
+timeout after commit) does not duplicate it. When the database is
+unreachable the batch is retried on later flushes (dropped after
+``max_retries``); beyond
+``max_pending`` buffered rows the oldest are dropped. Drops are counted.
+"""
+import asyncio
+import logging
+import uuid
+from collections import deque
+from typing import Deque, List, Optional
+
+from .agent_tracing import detach_span, get_tracer
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptWriter:
+    def __init__(
+        self,
+        db_factory,
+        flush_interval_s: float = 0.5,
+        max_batch: int = 500,
+        max_pending: int = 20000,
+        max_retries: int = 5,
+    ):
+        self.db_factory = db_factory
+        self.flush_interval_s = flush_interval_s
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._retries = 0
+        self._pending: Deque[dict] = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failures = 0
+
+    # ── Producer side ──────────────────────────────────────────────────────────
+    def enqueue(self, rows: List[dict]) -> None:
+        """Buffer a turn's rows; never blocks the caller."""
+        self._ensure_started()
+        for row in rows:
+            row.setdefault("id", str(uuid.uuid4()))
+        self._pending.extend(rows)
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            for _ in range(overflow):
+                self._pending.popleft()
+            self.dropped += overflow
+            logger.warning("Transcript buffer full — dropped %d oldest rows", overflow)
+        if len(self._pending) >= self.max_batch:
+            self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    # ── Writer task ────────────────────────────────────────────────────────────
+    def _ensure_started(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run(), name="transcript-writer")
+
+    async def _run(self) -> None:
+        # Started from inside an agent turn; flush spans are their own traces
+        detach_span()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as exc:
+                logger.error("Transcript flush failed: %s", exc)
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns rows written."""
+        if not self._pending or self._flush_lock is None:
+            return 0
+        written = 0
+        async with self._flush_lock:
+            while self._pending:
+                batch = [
+                    self._pending.popleft()
+                    for _ in range(min(self.max_batch, len(self._pending)))
+                ]
+                with get_tracer().span("save_conversation_turns", "db", rows=len(batch)):
+                    n = await self.db_factory().save_conversation_turns(batch)
+                if n < len(batch):
+                    self.failures += 1
+                    self._retries += 1
+                    if self._retries >= self.max_retries:
+                        logger.error("Dropping %d transcript rows after %d failed writes",
+                                     len(batch), self._retries)
+                        self.dropped += len(batch)
+                        self._retries = 0
+                        continue
+                    # Keep order: failed rows go back to the front for the next flush
+                    self._pending.extendleft(reversed(batch))
+                    break
+                self._retries = 0
+                written += n
+                self.batches += 1
+        self.written += written
+        return written
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as exc:
+            logger.warning("Transcript flush on shutdown failed: %s", exc)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed_flushes": self.failures,
+            "running": self._task is not None and not self._task.done(),
+        }
+
+
+def replay_turns(rows: List[dict]) -> List[dict]:
+    """
+    Group stored rows (oldest first) back into turns:
+    ``{turn_id, started_at, user, tools: [...], assistant}``. Rows written
+    before transcripts carried a ``turn_id`` start a new turn at each user row.
+    """
+    turns: List[dict] = []
+    current: Optional[dict] = None
+    for row in rows:
+        turn_id = row.get("turn_id")
+        new_turn = (
+            current is None
+            or (turn_id is not None and turn_id != current["turn_id"])
+            or (turn_id is None and row["role"] == "user")
+        )
+        if new_turn:
+            current = {
+                "turn_id": turn_id,
+                "started_at": row.get("created_at"),
+                "user": None,
+                "tools": [],
+                "assistant": None,
+            }
+            turns.append(current)
+        if row["role"] == "tool":
+            current["tools"].append({
+                "id": row.get("tool_call_id"),
+                "name": row.get("tool_name"),
+                "arguments": row.get("tool_args"),
+                "result": row.get("content"),
+                "duration_ms": row.get("duration_ms"),
+            })
+        else:
+            current[row["role"]] = row.get("content")
+    return turns
+
+
+# ── Singleton ──────────────────────────────────────────────────────────────────
+_writer: Optional[TranscriptWriter] = None
+
+
+def get_transcript_writer() -> TranscriptWriter:
+    global _writer
+    if _writer is None:
+        from ..config import get_settings
+        from ..database import get_db_service
+
+        settings = get_settings()
+        _writer = TranscriptWriter(
+            get_db_service,
+            flush_interval_s=settings.transcript_flush_interval_s,
+            max_batch=settings.transcript_max_batch,
+            max_pending=settings.transcript_max_pending,
+        )
+    return _writer
+
+
+async def stop_transcript_writer() -> None:
+    if _writer is not None:
+        await _writer.stop()
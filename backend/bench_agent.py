@@ -0,0 +1,77 @@
+"""
+bench_agent.py — load-test the copilot endpoints without the OpenAI API.
+
+Fully local by default (in-process app, SQLite :memory:, in-process mock LLM):
+    python bench_agent.py --requests 200 --concurrency 16 --latency 0.15
+
+Against a running backend (start it with OPENAI_BASE_URL pointing at
+mock_llm_server.py):
+    python bench_agent.py --base-url http://localhost:8000 --requests 100
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--chat-share", type=float, default=0.3, help="fraction of requests sent to /chat (rest /analyze)")
+    parser.add_argument("--sessions", type=int, default=20, help="distinct session ids the requests spread over")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.15, help="mock LLM seconds per call (local mode)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--script", default="analyze", help="mock LLM script: analyze, direct, deep or a JSON file")
+    parser.add_argument("--no-cache", action="store_true", help="disable the analyze cache (local mode)")
+    parser.add_argument("--llm-url", default=None, help="local mode: use this chat-completions server instead of the in-process mock")
+    parser.add_argument("--base-url", default=None, help="target a running server instead of the in-process app")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    bench_kwargs = dict(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        chat_share=args.chat_share,
+        sessions=args.sessions,
+        seed=args.seed,
+    )
+
+    if args.base_url:
+        import httpx
+
+        from app.services.agent_bench import AgentBenchmark
+
+        async def remote():
+            async with httpx.AsyncClient(base_url=args.base_url, timeout=120.0) as client:
+                report = await AgentBenchmark(client, **bench_kwargs).run(monitor_loop=True)
+            report["event_loop_measured"] = "client only"
+            return report
+
+        report = asyncio.run(remote())
+    else:
+        # Must be set before the app (and its settings) are imported
+        os.environ["STORAGE_BACKEND"] = "sqlite"
+        os.environ["SQLITE_PATH"] = ":memory:"
+        os.environ.setdefault("OPENAI_API_KEY", "sk-local-bench")
+        if args.no_cache:
+            os.environ["AGENT_CACHE_TTL_S"] = "0"
+        from app.services.agent_bench import run_local_bench
+
+        report = asyncio.run(run_local_bench(
+            script=args.script,
+            latency_s=args.latency,
+            jitter_s=args.jitter,
+            token_delay_s=args.token_delay,
+            llm_url=args.llm_url,
+            **bench_kwargs,
+        ))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,53 @@
 """
-init_db.py — seeds the Supabase database with initial data.
+init_db.py — seeds the database with initial data.
 Run once: python init_db.py
+
+Seeds Supabase by default; set STORAGE_BACKEND=sqlite (and optionally
+SQLITE_PATH) to create and seed the embedded local store instead.
 """
 import os
 from pathlib import Path
 
 from dotenv import load_dotenv
-from supabase import create_client
 
 load_dotenv(Path(__file__).parent / ".env")
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+
+if STORAGE_BACKEND == "sqlite":
+    from app.services.local_store_service import LocalStoreService
+
+    store = LocalStoreService(os.getenv("SQLITE_PATH", "./aegis_local.db"))
+    client = None
+else:
+    from supabase import create_client
+
+    SUPABASE_URL = os.getenv("SUPABASE_URL")
+    SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
-client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+    store = None
+    client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
 
 FACILITIES = [
     {"name": "Center A – Metro Cold Hub", "temperature": 3.1, "humidity": 88,
-     "power_status": "normal", "storage_capacity": 5000, "current_load": 3200},
+     "power_status": "normal", "storage_capacity": 5000, "current_load": 3200,
+     "lat": 13.083, "lon": 80.236},
     {"name": "Center B – Regional Depot", "temperature": 4.8, "humidity": 82,
-     "power_status": "normal", "storage_capacity": 3000, "current_load": 2100},
+     "power_status": "normal", "storage_capacity": 3000, "current_load": 2100,
+     "lat": 13.312, "lon": 79.962},
 ]
 
 RESCUE_POINTS = [
     {"name": "QuickFreeze Depot",  "distance": 12, "recovery_chance": 92,
-     "type": "cold-storage", "available": True,  "eta": 18},
+     "type": "cold-storage", "available": True,  "eta": 18, "lat": 13.012, "lon": 80.018},
     {"name": "FreshMart Outlet",   "distance": 8,  "recovery_chance": 78,
-     "type": "market",       "available": True,  "eta": 12},
+     "type": "market",       "available": True,  "eta": 12, "lat": 12.951, "lon": 80.141},
     {"name": "AgriProcess Plant",  "distance": 22, "recovery_chance": 65,
-     "type": "processing",   "available": True,  "eta": 30},
+     "type": "processing",   "available": True,  "eta": 30, "lat": 13.213, "lon": 79.985},
     {"name": "ColdChain Hub B2",   "distance": 35, "recovery_chance": 88,
-     "type": "cold-storage", "available": False, "eta": 45},
+     "type": "cold-storage", "available": False, "eta": 45, "lat": 13.29, "lon": 80.05},
     {"name": "Metro Fresh Market", "distance": 5,  "recovery_chance": 71,
-     "type": "market",       "available": True,  "eta": 8},
+     "type": "market",       "available": True,  "eta": 8,  "lat": 13.069, "lon": 80.213},
 ]
 
 ROUTES = [
@@ -75,6 +90,9 @@ TRIP_LOGS = [
 def seed_table(table: str, data: list, conflict_col: str = None):
     print(f"Seeding {table}…", end=" ")
     try:
+        if store is not None:
+            print(f"OK ({store.seed_rows(table, data, conflict_col)} rows)")
+            return
         if conflict_col:
             res = client.table(table).upsert(data).execute()
         else:
@@ -85,7 +103,7 @@ def seed_table(table: str, data: list, conflict_col: str = None):
 
 
 if __name__ == "__main__":
-    print("=== Aegis Harvest — Database Initialisation ===")
+    print(f"=== Aegis Harvest — Database Initialisation ({STORAGE_BACKEND}) ===")
     seed_table("facilities",    FACILITIES,   conflict_col="name")
     seed_table("rescue_points", RESCUE_POINTS)
     seed_table("routes",        ROUTES,       conflict_col="route_id")
@@ -0,0 +1,39 @@
+"""
+mock_llm_server.py — serve a scripted stand-in for the OpenAI chat-completions API.
+
+    python mock_llm_server.py --port 8822 --latency 0.15 --jitter 0.05 --script analyze
+
+then start the backend with OPENAI_BASE_URL=http://127.0.0.1:8822/v1.
+Built-in scripts: analyze (default), direct, deep — or pass a JSON file of steps
+(see app/services/mock_llm.py).
+"""
+import argparse
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8822)
+    parser.add_argument("--latency", type=float, default=0.15, help="seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± seconds added to --latency")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed text chunks")
+    parser.add_argument("--script", default="analyze", help="built-in script name or JSON file")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    from app.services.mock_llm import create_mock_llm_app, load_script
+
+    app = create_mock_llm_app(
+        load_script(args.script),
+        latency_s=args.latency,
+        jitter_s=args.jitter,
+        token_delay_s=args.token_delay,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+simulate_fleet.py — drive virtual trucks against the API and report load figures.
+
+Fully local by default (in-process app, SQLite :memory:, in-process mock LLM):
+    python simulate_fleet.py --trucks 50 --rate 2 --duration 30
+
+Against a running server (listens for predictions over SSE):
+    python simulate_fleet.py --base-url http://localhost:8000 --trucks 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trucks", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=1.0, help="readings per second per truck")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--predict-every", type=int, default=10, help="ticks between /api/predict calls (0 = off)")
+    parser.add_argument("--analyze-every", type=int, default=0, help="ticks between /api/agent/analyze calls (0 = off)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="mock LLM seconds per call (local mode)")
+    parser.add_argument("--base-url", default=None, help="target a running server instead of the in-process app")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    sim_kwargs = dict(
+        trucks=args.trucks,
+        rate_hz=args.rate,
+        duration_s=args.duration,
+        predict_every=args.predict_every,
+        analyze_every=args.analyze_every,
+        seed=args.seed,
+    )
+
+    if args.base_url:
+        import httpx
+
+        from app.services.fleet_simulator import FleetSimulator
+
+        async def remote():
+            async with httpx.AsyncClient(base_url=args.base_url, timeout=30.0) as client:
+                return await FleetSimulator(client, **sim_kwargs).run(listen="sse")
+
+        report = asyncio.run(remote())
+    else:
+        # Must be set before the app (and its settings) are imported
+        os.environ["STORAGE_BACKEND"] = "sqlite"
+        os.environ["SQLITE_PATH"] = ":memory:"
+        os.environ.setdefault("OPENAI_API_KEY", "sk-local-simulator")
+        from app.services.fleet_simulator import run_local
+
+        report = asyncio.run(run_local(llm_latency_s=args.llm_latency, **sim_kwargs))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
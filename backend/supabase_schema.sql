@@ -55,8 +55,12 @@ CREATE TABLE IF NOT EXISTS facilities (
     power_status     TEXT DEFAULT 'normal',
     storage_capacity INT,
     current_load     INT,
-    last_updated     TIMESTAMPTZ DEFAULT NOW()
+    last_updated     TIMESTAMPTZ DEFAULT NOW(),
+    lat              FLOAT,
+    lon              FLOAT
 );
+ALTER TABLE facilities ADD COLUMN IF NOT EXISTS lat FLOAT;
+ALTER TABLE facilities ADD COLUMN IF NOT EXISTS lon FLOAT;
 
 -- ── Trip Logs ─────────────────────────────────────────────────────────────────
 CREATE TABLE IF NOT EXISTS trip_logs (
@@ -81,8 +85,12 @@ CREATE TABLE IF NOT EXISTS rescue_points (
     type            TEXT,         -- cold-storage | market | processing
     available       BOOLEAN DEFAULT TRUE,
     eta             INT,          -- minutes
-    created_at      TIMESTAMPTZ DEFAULT NOW()
+    created_at      TIMESTAMPTZ DEFAULT NOW(),
+    lat             FLOAT,        -- degrees; indexed in memory for /api/rescue/nearest
+    lon             FLOAT
 );
+ALTER TABLE rescue_points ADD COLUMN IF NOT EXISTS lat FLOAT;
+ALTER TABLE rescue_points ADD COLUMN IF NOT EXISTS lon FLOAT;
 
 -- ── AI Recommendations ────────────────────────────────────────────────────────
 CREATE TABLE IF NOT EXISTS ai_recommendations (
@@ -98,37 +106,171 @@ CREATE TABLE IF NOT EXISTS ai_recommendations (
 
 -- ── Agent Conversations ───────────────────────────────────────────────────────
 CREATE TABLE IF NOT EXISTS agent_conversations (
-    id          UUID DEFAULT gen_random_uuid() PRIMARY KEY,
-    session_id  TEXT NOT NULL,
-    role        TEXT NOT NULL,    -- user | assistant
-    content     TEXT,
-    created_at  TIMESTAMPTZ DEFAULT NOW()
+    id           UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    session_id   TEXT NOT NULL,
+    role         TEXT NOT NULL,   -- user | assistant | tool
+    content      TEXT,            -- message text, or the tool result the model saw
+    created_at   TIMESTAMPTZ DEFAULT NOW(),
+    turn_id      TEXT,            -- rows of one agent turn, ordered by seq
+    seq          INT,
+    tool_name    TEXT,
+    tool_call_id TEXT,
+    tool_args    JSONB,
+    duration_ms  FLOAT
+);
+-- Existing deployments: add the transcript columns in place
+ALTER TABLE agent_conversations ADD COLUMN IF NOT EXISTS turn_id      TEXT;
+ALTER TABLE agent_conversations ADD COLUMN IF NOT EXISTS seq          INT;
+ALTER TABLE agent_conversations ADD COLUMN IF NOT EXISTS tool_name    TEXT;
+ALTER TABLE agent_conversations ADD COLUMN IF NOT EXISTS tool_call_id TEXT;
+ALTER TABLE agent_conversations ADD COLUMN IF NOT EXISTS tool_args    JSONB;
+ALTER TABLE agent_conversations ADD COLUMN IF NOT EXISTS duration_ms  FLOAT;
+
+-- ── Telemetry Rollups (per-session aggregates) ────────────────────────────────
+CREATE TABLE IF NOT EXISTS telemetry_rollups (
+    session_id       TEXT NOT NULL,         -- '' for readings without a session
+    resolution_s     INT NOT NULL,          -- 60 | 3600 | 86400
+    bucket_start     TIMESTAMPTZ NOT NULL,
+    sample_count     INT NOT NULL DEFAULT 0,
+    temperature_min  FLOAT, temperature_max FLOAT, temperature_sum FLOAT DEFAULT 0,
+    humidity_min     FLOAT, humidity_max    FLOAT, humidity_sum    FLOAT DEFAULT 0,
+    vibration_min    FLOAT, vibration_max   FLOAT, vibration_sum   FLOAT DEFAULT 0,
+    ethylene_min     FLOAT, ethylene_max    FLOAT, ethylene_sum    FLOAT DEFAULT 0,
+    co2_min          FLOAT, co2_max         FLOAT, co2_sum         FLOAT DEFAULT 0,
+    updated_at       TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (session_id, resolution_s, bucket_start)
+);
+
+-- Rollup batches already merged: a flush retried after a timeout that did
+-- commit carries the same batch id and is skipped
+CREATE TABLE IF NOT EXISTS telemetry_rollup_batches (
+    batch_id   TEXT PRIMARY KEY,
+    applied_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Additive merge of rollup deltas: counts/sums add, min/max combine.
+-- Returns FALSE (and changes nothing) when the batch was already applied.
+DROP FUNCTION IF EXISTS merge_telemetry_rollups(JSONB);
+CREATE OR REPLACE FUNCTION merge_telemetry_rollups(batch TEXT, rows JSONB)
+RETURNS BOOLEAN LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO telemetry_rollup_batches (batch_id) VALUES (batch) ON CONFLICT DO NOTHING;
+    IF NOT FOUND THEN
+        RETURN FALSE;
+    END IF;
+    DELETE FROM telemetry_rollup_batches WHERE applied_at < NOW() - INTERVAL '7 days';
+
+    INSERT INTO telemetry_rollups AS t (
+        session_id, resolution_s, bucket_start, sample_count,
+        temperature_min, temperature_max, temperature_sum,
+        humidity_min, humidity_max, humidity_sum,
+        vibration_min, vibration_max, vibration_sum,
+        ethylene_min, ethylene_max, ethylene_sum,
+        co2_min, co2_max, co2_sum
+    )
+    SELECT
+        r.session_id, r.resolution_s, r.bucket_start, r.sample_count,
+        r.temperature_min, r.temperature_max, r.temperature_sum,
+        r.humidity_min, r.humidity_max, r.humidity_sum,
+        r.vibration_min, r.vibration_max, r.vibration_sum,
+        r.ethylene_min, r.ethylene_max, r.ethylene_sum,
+        r.co2_min, r.co2_max, r.co2_sum
+    FROM jsonb_to_recordset(rows) AS r (
+        session_id TEXT, resolution_s INT, bucket_start TIMESTAMPTZ, sample_count INT,
+        temperature_min FLOAT, temperature_max FLOAT, temperature_sum FLOAT,
+        humidity_min FLOAT, humidity_max FLOAT, humidity_sum FLOAT,
+        vibration_min FLOAT, vibration_max FLOAT, vibration_sum FLOAT,
+        ethylene_min FLOAT, ethylene_max FLOAT, ethylene_sum FLOAT,
+        co2_min FLOAT, co2_max FLOAT, co2_sum FLOAT
+    )
+    ON CONFLICT (session_id, resolution_s, bucket_start) DO UPDATE SET
+        sample_count    = t.sample_count + EXCLUDED.sample_count,
+        temperature_min = LEAST(t.temperature_min, EXCLUDED.temperature_min),
+        temperature_max = GREATEST(t.temperature_max, EXCLUDED.temperature_max),
+        temperature_sum = COALESCE(t.temperature_sum, 0) + COALESCE(EXCLUDED.temperature_sum, 0),
+        humidity_min    = LEAST(t.humidity_min, EXCLUDED.humidity_min),
+        humidity_max    = GREATEST(t.humidity_max, EXCLUDED.humidity_max),
+        humidity_sum    = COALESCE(t.humidity_sum, 0) + COALESCE(EXCLUDED.humidity_sum, 0),
+        vibration_min   = LEAST(t.vibration_min, EXCLUDED.vibration_min),
+        vibration_max   = GREATEST(t.vibration_max, EXCLUDED.vibration_max),
+        vibration_sum   = COALESCE(t.vibration_sum, 0) + COALESCE(EXCLUDED.vibration_sum, 0),
+        ethylene_min    = LEAST(t.ethylene_min, EXCLUDED.ethylene_min),
+        ethylene_max    = GREATEST(t.ethylene_max, EXCLUDED.ethylene_max),
+        ethylene_sum    = COALESCE(t.ethylene_sum, 0) + COALESCE(EXCLUDED.ethylene_sum, 0),
+        co2_min         = LEAST(t.co2_min, EXCLUDED.co2_min),
+        co2_max         = GREATEST(t.co2_max, EXCLUDED.co2_max),
+        co2_sum         = COALESCE(t.co2_sum, 0) + COALESCE(EXCLUDED.co2_sum, 0),
+        updated_at      = NOW();
+    RETURN TRUE;
+END;
+$$;
+
+-- Compaction: delete raw readings older than the cutoff, but only in
+-- (session, hour) buckets whose hourly rollup counts at least as many readings
+CREATE OR REPLACE FUNCTION compact_telemetry(cutoff TIMESTAMPTZ)
+RETURNS INT LANGUAGE SQL AS $$
+    WITH old AS (
+        SELECT COALESCE(session_id, '') AS sid,
+               date_trunc('hour', created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS hb,
+               COUNT(*) AS n
+        FROM telemetry_sessions WHERE created_at < cutoff GROUP BY 1, 2
+    ),
+    covered AS (
+        SELECT o.sid, o.hb FROM old o
+        JOIN telemetry_rollups r
+          ON r.resolution_s = 3600 AND r.session_id = o.sid AND r.bucket_start = o.hb
+        WHERE r.sample_count >= o.n
+    ),
+    deleted AS (
+        DELETE FROM telemetry_sessions s USING covered c
+        WHERE s.created_at < cutoff
+          AND COALESCE(s.session_id, '') = c.sid
+          AND date_trunc('hour', s.created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' = c.hb
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INT FROM deleted;
+$$;
+
+-- Fleet risk warm-up: each session's newest reading since the cutoff
+CREATE OR REPLACE FUNCTION latest_telemetry_per_session(since TIMESTAMPTZ)
+RETURNS SETOF telemetry_sessions LANGUAGE SQL STABLE AS $$
+    SELECT DISTINCT ON (session_id) *
+    FROM telemetry_sessions
+    WHERE created_at >= since AND session_id IS NOT NULL
+    ORDER BY session_id, created_at DESC, id DESC;
+$$;
+
 -- ── Indexes ───────────────────────────────────────────────────────────────────
 CREATE INDEX IF NOT EXISTS idx_telemetry_session ON telemetry_sessions (session_id);
 CREATE INDEX IF NOT EXISTS idx_telemetry_created ON telemetry_sessions (created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_ai_recs_status    ON ai_recommendations (status);
-CREATE INDEX IF NOT EXISTS idx_conversations_sid ON agent_conversations (session_id);
+CREATE INDEX IF NOT EXISTS idx_conversations_sid ON agent_conversations (session_id, created_at, seq);
 CREATE INDEX IF NOT EXISTS idx_trips_status      ON trip_logs (status);
 
+-- Keyset pagination: (sort key, id) DESC so "(k, id) < cursor" is a range scan
+CREATE INDEX IF NOT EXISTS idx_telemetry_keyset  ON telemetry_sessions (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_ai_recs_keyset    ON ai_recommendations (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_trips_keyset      ON trip_logs (date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_trips_status_keyset ON trip_logs (status, date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_rollups_range     ON telemetry_rollups (resolution_s, bucket_start);
+
 -- ── Seed Data ─────────────────────────────────────────────────────────────────
 
 -- Facilities
-INSERT INTO facilities (name, temperature, humidity, power_status, storage_capacity, current_load)
+INSERT INTO facilities (name, temperature, humidity, power_status, storage_capacity, current_load, lat, lon)
 VALUES
-    ('Center A – Metro Cold Hub', 3.1, 88, 'normal', 5000, 3200),
-    ('Center B – Regional Depot', 4.8, 82, 'normal', 3000, 2100)
+    ('Center A – Metro Cold Hub', 3.1, 88, 'normal', 5000, 3200, 13.083, 80.236),
+    ('Center B – Regional Depot', 4.8, 82, 'normal', 3000, 2100, 13.312, 79.962)
 ON CONFLICT (name) DO NOTHING;
 
 -- Rescue Points
-INSERT INTO rescue_points (name, distance, recovery_chance, type, available, eta)
+INSERT INTO rescue_points (name, distance, recovery_chance, type, available, eta, lat, lon)
 VALUES
-    ('QuickFreeze Depot',  12,  92, 'cold-storage', TRUE,  18),
-    ('FreshMart Outlet',    8,  78, 'market',        TRUE,  12),
-    ('AgriProcess Plant',  22,  65, 'processing',    TRUE,  30),
-    ('ColdChain Hub B2',   35,  88, 'cold-storage',  FALSE, 45),
-    ('Metro Fresh Market',  5,  71, 'market',        TRUE,   8)
+    ('QuickFreeze Depot',  12,  92, 'cold-storage', TRUE,  18, 13.012, 80.018),
+    ('FreshMart Outlet',    8,  78, 'market',        TRUE,  12, 12.951, 80.141),
+    ('AgriProcess Plant',  22,  65, 'processing',    TRUE,  30, 13.213, 79.985),
+    ('ColdChain Hub B2',   35,  88, 'cold-storage',  FALSE, 45, 13.290, 80.050),
+    ('Metro Fresh Market',  5,  71, 'market',        TRUE,   8, 13.069, 80.213)
 ON CONFLICT DO NOTHING;
 
 -- Routes
@@ -0,0 +1,87 @@
+"""
+Incrementally repaired shortest-path trees must match trees built from scratch.
+
+Run from backend/:  python -m pytest -q tests
+"""
+import json
+import random
+from pathlib import Path
+
+from app.services.ml_service import ROAD_MAPPING
+from app.services.road_network import RoadNetwork
+
+ROADS = list(ROAD_MAPPING)
+NETWORK_JSON = Path(__file__).resolve().parents[1] / "models" / "road_network.json"
+
+
+def _random_network(rng: random.Random, n_nodes: int, n_edges: int, parallel: int) -> RoadNetwork:
+    nodes = [
+        {"id": f"N{i}", "name": f"N{i}", "kind": "rescue" if i % 7 == 0 else "junction"}
+        for i in range(n_nodes)
+    ]
+    edges = [  # a spanning chain keeps the graph connected
+        {"id": f"C{i}", "from": f"N{i}", "to": f"N{i + 1}",
+         "km": rng.uniform(1, 50), "road": rng.choice(ROADS)}
+        for i in range(n_nodes - 1)
+    ]
+    pairs = [tuple(rng.sample(range(n_nodes), 2)) for _ in range(n_edges)]
+    pairs += [(int(e["from"][1:]), int(e["to"][1:])) for e in rng.sample(edges, parallel)]
+    for k, (a, b) in enumerate(pairs):
+        edges.append({"id": f"E{k}", "from": f"N{a}", "to": f"N{b}",
+                      "km": rng.uniform(1, 50), "road": rng.choice(ROADS)})
+    return RoadNetwork(nodes, edges)
+
+
+def _assert_matches_rebuild(network: RoadNetwork) -> None:
+    fresh = RoadNetwork(
+        list(network.nodes.values()), [dict(e) for e in network.edges.values()]
+    )
+    for dest in network.destinations:
+        repaired, rebuilt = network._tree(dest), fresh._tree(dest)
+        for node in network.nodes:
+            assert abs(repaired.dist[node] - rebuilt.dist[node]) < 1e-6, (dest, node)
+            parent = repaired.parent[node]
+            if parent is not None:  # the parent pointer must realise the distance
+                w = network.weight(network._best_edge(node, parent))
+                assert abs(repaired.dist[parent] + w - repaired.dist[node]) < 1e-6
+
+
+def test_repairs_match_rebuilds_on_random_graphs():
+    rng = random.Random(7)
+    for _ in range(20):
+        network = _random_network(rng, n_nodes=60, n_edges=90, parallel=15)
+        for dest in network.destinations:
+            network._tree(dest)
+        edge_ids = list(network.edges)
+        for _ in range(40):
+            network.set_road_condition(rng.choice(edge_ids), rng.choice(ROADS))
+            _assert_matches_rebuild(network)
+
+
+def test_parallel_edges_use_the_lighter_road():
+    nodes = [
+        {"id": "T", "name": "Truck", "kind": "hub"},
+        {"id": "C", "name": "Centre", "kind": "facility", "center": "A"},
+    ]
+    network = RoadNetwork(nodes, [
+        {"id": "HWY", "from": "T", "to": "C", "km": 10, "road": "Clear"},
+        {"id": "SVC", "from": "T", "to": "C", "km": 30, "road": "Clear"},
+    ])
+    assert network.path("T", "C")["km"] == 10
+    network.set_road_condition("SVC", "Blocked")  # the unused road: nothing changes
+    assert network.path("T", "C")["km"] == 10
+    network.set_road_condition("SVC", "Clear")
+    network.set_road_condition("HWY", "Blocked")  # 50 effective km > 30 via the service road
+    assert network.path("T", "C")["km"] == 30
+    _assert_matches_rebuild(network)
+
+
+def test_shipped_network_repairs_match_rebuilds():
+    data = json.loads(NETWORK_JSON.read_text(encoding="utf-8"))
+    network = RoadNetwork(data["nodes"], data["edges"])
+    for dest in network.destinations:
+        network._tree(dest)
+    rng = random.Random(3)
+    for _ in range(200):
+        network.set_road_condition(rng.choice(list(network.edges)), rng.choice(ROADS))
+        _assert_matches_rebuild(network)